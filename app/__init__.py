@@ -1,11 +1,9 @@
 
-from flask import Flask
+import click
+from flask import Flask, current_app
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from flask_migrate import Migrate
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flasgger import Swagger # type: ignore
 from app.db import db
 from app.config import Config
 from app.models.user import User
@@ -13,44 +11,39 @@ from app.models.deck import Deck
 from app.models.collection import Collection
 from app.routes import register_routes
 from app.routes.chat import chat_bp
-from authlib.integrations.flask_client import OAuth
+from app.routes.metrics import metrics_bp
+from app.services.metrics_service import init_metrics
+from app.services.rate_limit_service import rate_limit_key
 
-oauth = OAuth()
+class MigrateCommands(click.Group):
+    """`flask db`, importing Flask-Migrate (and Alembic) only when the command is used"""
 
-def create_app(config_class=Config):
-    app = Flask(__name__)
-    app.config.from_object(config_class)
-    
-    oauth.init_app(app)
-    oauth.register(
-        name='auth0',
-        client_id=app.config['AUTH0_CLIENT_ID'],
-        client_secret=app.config['AUTH0_CLIENT_SECRET'],
-        server_metadata_url=(
-            f"https://{app.config['AUTH0_DOMAIN']}/.well-known/openid-configuration"
-        ),
-        client_kwargs={
-            'scope':    'openid profile email',
-            'audience': app.config['AUTH0_AUDIENCE']
-        }
-    )
-    
-    db.init_app(app)
-    migrate = Migrate(app, db)
-    jwt = JWTManager(app)
-    cors = CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["Authorization"], supports_credentials=True)
-    limiter = Limiter(get_remote_address, app=app, default_limits=["5 per minute"])
-    
-    
-    User.collections = db.relationship("Collection", back_populates="user", cascade="all, delete-orphan")
-    User.decks = db.relationship("Deck", back_populates="user")
-    
-    # Register blueprints
-    
-    register_routes(app)
-    app.register_blueprint(chat_bp, url_prefix='/chat')
-    
-    swagger = Swagger(app, config={
+    def _commands(self):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_cli_group
+
+        if "migrate" not in current_app.extensions:
+            Migrate(current_app._get_current_object(), db)
+        return db_cli_group
+
+    def get_params(self, ctx):
+        return self._commands().get_params(ctx)
+
+    def invoke(self, ctx):
+        self.callback = self._commands().callback
+        return super().invoke(ctx)
+
+    def list_commands(self, ctx):
+        return self._commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._commands().get_command(ctx, name)
+
+def init_swagger(app):
+    """Serve the API docs; the spec itself is only built on the first request to it"""
+    from flasgger import Swagger # type: ignore
+
+    return Swagger(app, config={
     "headers": [],
     "specs": [
         {
@@ -73,6 +66,43 @@ def create_app(config_class=Config):
     },
     "security": [{"Bearer": []}],
 })
+
+def create_app(config_class=Config):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    
+    db.init_app(app)
+    app.cli.add_command(MigrateCommands("db", help="Perform database migrations."))
+    jwt = JWTManager(app)
+    cors = CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=["Authorization", "ETag", "X-Next-Offset"], supports_credentials=True)
+    limiter = Limiter(rate_limit_key, app=app, default_limits=[app.config.get("RATELIMIT_DEFAULT", "5 per minute")])
+    
+    
+    User.collections = db.relationship("Collection", back_populates="user", cascade="all, delete-orphan")
+    User.decks = db.relationship("Deck", back_populates="user")
+    
+    # Register blueprints
+    
+    register_routes(app)
+    app.register_blueprint(chat_bp, url_prefix='/chat')
+
+    # per-blueprint ("cards") or per-endpoint ("decks.batch_edit_deck") budgets replacing the default;
+    # a disabled limiter is not kept by the app, so its wrappers would outlive it
+    route_limits = app.config.get("RATELIMIT_ROUTE_LIMITS", {}) if app.config.get("RATELIMIT_ENABLED", True) else {}
+    for name, limit in route_limits.items():
+        if name in app.blueprints:
+            limiter.limit(limit)(app.blueprints[name])
+        else:
+            app.view_functions[name] = limiter.limit(limit)(app.view_functions[name])
+
+    if app.config.get("METRICS_ENABLED", True):
+        with app.app_context():
+            init_metrics(app, db.engine)
+        app.register_blueprint(metrics_bp)
+        limiter.exempt(metrics_bp)
+    
+    if app.config.get("SWAGGER_ENABLED", True):
+        init_swagger(app)
     
     @app.route('/')
     def index():
@@ -1,5 +1,6 @@
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv("data/.env")
@@ -18,3 +19,49 @@ class Config:
     AUTH0_CLIENT_SECRET = os.getenv('AUTH0_CLIENT_SECRET')
     AUTH0_CALLBACK_URL  = os.getenv('AUTH0_CALLBACK_URL')
     AUTH0_AUDIENCE      = os.getenv('AUTH0_AUDIENCE')
+    CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", 1000))
+    CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", 1800))
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 2000))
+    CHAT_SUMMARY_TOKEN_BUDGET = int(os.getenv("CHAT_SUMMARY_TOKEN_BUDGET", 400))
+    AI_MAX_IN_FLIGHT = int(os.getenv("AI_MAX_IN_FLIGHT", 4))
+    AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", 8))
+    AI_CALL_TIMEOUT = float(os.getenv("AI_CALL_TIMEOUT", 30))
+    AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", 2))
+    # Lock files limiting AI calls host-wide (AI_MAX_IN_FLIGHT across all workers); set empty to limit per process
+    AI_SLOT_DIR = os.getenv("AI_SLOT_DIR", os.path.join(tempfile.gettempdir(), "pokemon-tcg-ai-slots")) or None
+    CHAT_ANSWER_CACHE_ENABLED = os.getenv("CHAT_ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    CHAT_ANSWER_CACHE_SIZE = int(os.getenv("CHAT_ANSWER_CACHE_SIZE", 1000))
+    CHAT_ANSWER_CACHE_TTL = int(os.getenv("CHAT_ANSWER_CACHE_TTL", 86400))
+    CHAT_ANSWER_SIMILARITY = float(os.getenv("CHAT_ANSWER_SIMILARITY", 0.8))
+    CHAT_USER_CONTEXT = os.getenv("CHAT_USER_CONTEXT", "true").lower() == "true"
+    CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 600))
+    SWAGGER_ENABLED = os.getenv("SWAGGER_ENABLED", "true").lower() == "true"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Bearer token required to scrape /metrics; without one only loopback clients may scrape
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+    METRICS_PROFILING = os.getenv("METRICS_PROFILING", "false").lower() == "true"
+    METRICS_PROFILE_DIR = os.getenv("METRICS_PROFILE_DIR", "profiles")
+    # Pool processes per web worker (so the host runs web workers x this many); 0 = one per CPU, 1 = inline
+    SIMULATION_WORKERS = int(os.getenv("SIMULATION_WORKERS", 2))
+    SIMULATION_START_METHOD = os.getenv("SIMULATION_START_METHOD", "spawn")
+    SIMULATION_MAX_TRIALS = int(os.getenv("SIMULATION_MAX_TRIALS", 5_000_000))
+    # A card without a price in this many days before the requested date counts as unpriced
+    PRICE_LOOKBACK_DAYS = int(os.getenv("PRICE_LOOKBACK_DAYS", 30))
+    PRICE_MAX_HISTORY_DAYS = int(os.getenv("PRICE_MAX_HISTORY_DAYS", 1096))
+    # Counters live in a SQLite file so every worker process on the host shares them
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'pokemon-tcg-ratelimit.db')}"
+    )
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter")
+    RATELIMIT_HEADERS_ENABLED = True
+    RATELIMIT_DEFAULT = os.getenv("RATELIMIT_DEFAULT", "5 per minute")
+    RATELIMIT_ROUTE_LIMITS = {
+        "cards": os.getenv("RATELIMIT_CARDS", "300 per minute"),
+        "collections": os.getenv("RATELIMIT_COLLECTIONS", "120 per minute"),
+        "decks": os.getenv("RATELIMIT_DECKS", "120 per minute"),
+        "collections.import_collection_entries": os.getenv("RATELIMIT_BULK", "30 per minute"),
+        "decks.batch_edit_deck": os.getenv("RATELIMIT_BULK", "30 per minute"),
+        "decks.simulate_deck": os.getenv("RATELIMIT_SIMULATION", "10 per minute"),
+        "chat": os.getenv("RATELIMIT_CHAT", "3 per minute;30 per hour"),
+    }
\ No newline at end of file
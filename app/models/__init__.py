@@ -3,5 +3,8 @@ from app.models.user import User
 from app.models.card import Card
 from app.models.collection import Collection
 from app.models.deck import Deck, DeckCard
+from app.models.cache_version import CacheVersion
+from app.models.set_progress import SetProgress
+from app.models.price import PriceKey, PriceSnapshot
 
-__all__ = ['User', 'Card', 'Collection', 'Deck', 'DeckCard']
\ No newline at end of file
+__all__ = ['User', 'Card', 'Collection', 'Deck', 'DeckCard', 'CacheVersion', 'SetProgress', 'PriceKey', 'PriceSnapshot']
\ No newline at end of file
@@ -0,0 +1,10 @@
+
+from sqlalchemy import Column, String, Integer
+from app.db import db
+
+class CacheVersion(db.Model):
+    """Version counters shared by all workers, bumped by writes to invalidate caches"""
+    __tablename__ = 'cache_versions'
+
+    key = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
\ No newline at end of file
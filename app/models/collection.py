@@ -1,10 +1,17 @@
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship, validates
 from app.db import db
 
+VALID_CONDITIONS = ['Near Mint', 'Lightly Played', 'Moderately Played', 'Heavily Played', 'Damaged']
+
 class Collection(db.Model):
     __tablename__ = 'collections'
+    __table_args__ = (
+        # one row per card and condition; also serves lookups by (user_id) and (user_id, card_id)
+        Index('uq_collections_user_card_condition', 'user_id', 'card_id', 'card_condition', unique=True),
+        Index('ix_collections_card_id', 'card_id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
@@ -25,7 +32,6 @@ class Collection(db.Model):
 
     @validates('card_condition')
     def validate_card_condition(self, key, condition):
-        valid_conditions = ['Near Mint', 'Lightly Played', 'Moderately Played', 'Heavily Played', 'Damaged']
-        if condition not in valid_conditions:
-            raise ValueError(f'Invalid card condition. Must be one of: {", ".join(valid_conditions)}')
+        if condition not in VALID_CONDITIONS:
+            raise ValueError(f'Invalid card condition. Must be one of: {", ".join(VALID_CONDITIONS)}')
         return condition
\ No newline at end of file
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.db import db
 
 class Deck(db.Model):
     __tablename__ = 'decks'
+    __table_args__ = (
+        Index('ix_decks_user_id', 'user_id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -32,6 +35,10 @@ class Deck(db.Model):
 
 class DeckCard(db.Model):
     __tablename__ = 'deck_cards'
+    __table_args__ = (
+        Index('uq_deck_cards_deck_card', 'deck_id', 'card_id', unique=True),
+        Index('ix_deck_cards_card_id', 'card_id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     deck_id = Column(Integer, ForeignKey('decks.id'), nullable=False)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, LargeBinary, Index, func
+from app.db import db
+
+class PriceKey(db.Model):
+    """Column index of a (card, condition) in the price snapshots"""
+    __tablename__ = 'price_keys'
+    __table_args__ = (
+        Index('uq_price_keys_card_condition', 'card_id', 'card_condition', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    card_id = Column(String, nullable=False)
+    card_condition = Column(String, nullable=False)
+
+
+class PriceSnapshot(db.Model):
+    """All prices of one day as two parallel arrays; one row per day, replaced only by re-ingesting that day"""
+    __tablename__ = 'price_snapshots'
+
+    price_date = Column(Date, primary_key=True)
+    # little-endian int32 PriceKey ids in ascending order
+    key_ids = Column(LargeBinary, nullable=False)
+    # little-endian float32 prices, aligned with key_ids
+    prices = Column(LargeBinary, nullable=False)
+    entries = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=func.current_timestamp())
\ No newline at end of file
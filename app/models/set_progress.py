@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.db import db
+
+class SetProgress(db.Model):
+    """Distinct cards and copies a user owns per set, kept up to date by the collection writes"""
+    __tablename__ = 'set_progress'
+
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True)
+    set_name = Column(String, primary_key=True)
+    distinct_cards = Column(Integer, nullable=False, default=0)
+    total_copies = Column(Integer, nullable=False, default=0)
\ No newline at end of file
@@ -4,8 +4,10 @@ def register_routes(app):
     from app.routes.cards import cards_bp
     from app.routes.collections import collections_bp
     from app.routes.decks import decks_bp
+    from app.routes.cache import cache_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(cards_bp)
     app.register_blueprint(collections_bp)
-    app.register_blueprint(decks_bp)
\ No newline at end of file
+    app.register_blueprint(decks_bp)
+    app.register_blueprint(cache_bp)
\ No newline at end of file
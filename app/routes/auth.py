@@ -5,23 +5,44 @@ from flask import Blueprint, redirect, url_for, session, current_app, jsonify
 from flask_jwt_extended import create_access_token
 from werkzeug.security import generate_password_hash
 
-from app import oauth
 from app.db import db
 from app.models.user import User
 
 auth_bp = Blueprint('auth0', __name__, url_prefix='/auth')
 
 
+def get_auth0():
+    """Auth0 OAuth client, registered on first use so startup needs neither authlib nor the network"""
+    oauth = current_app.extensions.get('authlib.integrations.flask_client')
+    if oauth is None:
+        from authlib.integrations.flask_client import OAuth
+        oauth = OAuth(current_app._get_current_object())
+        oauth.register(
+            name='auth0',
+            client_id=current_app.config['AUTH0_CLIENT_ID'],
+            client_secret=current_app.config['AUTH0_CLIENT_SECRET'],
+            server_metadata_url=(
+                f"https://{current_app.config['AUTH0_DOMAIN']}/.well-known/openid-configuration"
+            ),
+            client_kwargs={
+                'scope':    'openid profile email',
+                'audience': current_app.config['AUTH0_AUDIENCE']
+            }
+        )
+    return oauth.auth0
+
+
 @auth_bp.route('/login')
 def login():
     redirect_uri = url_for('auth0.callback', _external=True)
-    return oauth.auth0.authorize_redirect(redirect_uri)
+    return get_auth0().authorize_redirect(redirect_uri)
 
 
 @auth_bp.route('/callback')
 def callback():
-    token = oauth.auth0.authorize_access_token()
-    userinfo = token.get('userinfo') or oauth.auth0.parse_id_token(token)
+    auth0 = get_auth0()
+    token = auth0.authorize_access_token()
+    userinfo = token.get('userinfo') or auth0.parse_id_token(token)
     email = userinfo['email']
     username = userinfo.get('nickname') or email.split('@')[0]
 
@@ -0,0 +1,33 @@
+
+from flask import Blueprint, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from app.services.cache_service import catalog_cache, user_cache
+from app.services.legality_service import legality_cache
+from app.services.analytics_service import analytics_cache
+from app.services.price_service import snapshot_cache
+
+cache_bp = Blueprint('cache', __name__, url_prefix='')
+
+@cache_bp.route('/cache/stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    """
+    Response cache statistics for this worker
+    ---
+    tags:
+      - Cache
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Entry counts and hit/miss counters of the catalog, per-user, deck legality, deck analytics, price snapshot and chat answer caches
+    """
+    answer_cache = current_app.extensions.get("answer_cache")
+    return jsonify({
+        "catalog": catalog_cache.stats(),
+        "user": user_cache.stats(),
+        "legality": legality_cache.stats(),
+        "analytics": analytics_cache.stats(),
+        "price_snapshots": snapshot_cache.stats(),
+        "answers": answer_cache.stats() if answer_cache else None
+    }), 200
\ No newline at end of file
@@ -1,41 +1,295 @@
 
-from flask import Blueprint, jsonify
+import json
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required
+from sqlalchemy import select
 from app.models import Card
 from app.db import db
+from app.services.cache_service import catalog_response, catalog_version, bump_catalog_version, make_etag, not_modified
+from app.services.facet_service import facet_index, FACET_DIMENSIONS, RANGE_DIMENSIONS
+from app.services.search_service import search_index
+from app.services.set_progress_service import remove_card_progress
+from app.utils import parse_limit, parse_offset, is_truthy
 
 cards_bp = Blueprint('cards', __name__, url_prefix='')
 
+CARD_FIELDS = (
+    "id", "name", "set_name", "card_type", "rarity", "energy_type", "hp",
+    "attack_names", "description", "evolution_stage", "weakness",
+    "resistance", "retreat_cost", "created_at"
+)
+DEFAULT_CARD_FIELDS = ("id", "name", "set_name", "card_type", "rarity", "energy_type", "hp", "description")
+STREAM_BATCH_SIZE = 500
+
+
+def parse_fields(value):
+    """Resolve a comma separated `fields` argument, `id` is always included"""
+    if not value:
+        return DEFAULT_CARD_FIELDS
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in CARD_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ("id",) + tuple(dict.fromkeys(f for f in fields if f != "id"))
+
+
+def card_query(fields, cursor=None, limit=None):
+    """Keyset query over `cards` ordered by id, selecting only `fields`"""
+    stmt = select(*(Card.__table__.c[f] for f in fields)).order_by(Card.id)
+    if cursor:
+        stmt = stmt.where(Card.id > cursor)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def serialize_row(row, fields):
+    data = dict(zip(fields, row))
+    if data.get("created_at") is not None:
+        data["created_at"] = data["created_at"].isoformat()
+    return data
+
+
+def stream_cards(stmt, fields):
+    """Yield a `{"cards": [...]}` document row by row off the DB cursor"""
+    yield '{"cards": ['
+    last_id = None
+    result = db.session.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    for i, row in enumerate(result):
+        yield ("," if i else "") + json.dumps(serialize_row(row, fields))
+        last_id = row[0]
+    yield '], "last_id": ' + json.dumps(last_id) + '}'
+
 @cards_bp.route('/cards', methods=['GET'])
 @jwt_required()
 def get_cards():
     """
-    Get all cards
+    Get cards, paginated by card id
     ---
     tags:
       - Cards
     security:
       - Bearer: []
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        description: Page size (default 100, max 1000)
+      - in: query
+        name: cursor
+        type: string
+        description: Return cards with an id after this one (the previous page's `next_cursor`)
+      - in: query
+        name: fields
+        type: string
+        description: Comma separated list of card columns to return, e.g. "name,set_name"
+      - in: query
+        name: stream
+        type: boolean
+        description: Stream the result as it is read from the database. Without `limit` the rest of the catalog is streamed.
     responses:
       200:
         description: List of cards
+      304:
+        description: Not modified, the client's ETag matches the current catalog version
+      400:
+        description: Invalid limit or fields
     """
     try:
-        cards = Card.query.all()
-        
-        return jsonify({
-            "cards": [{
-                "id": card.id,
-                "name": card.name,
-                "set_name": card.set_name,
-                "card_type": card.card_type,
-                "rarity": card.rarity,
-                "energy_type": card.energy_type,
-                "hp": card.hp,
-                "description": card.description
-            } for card in cards]
-        }), 200
+        fields = parse_fields(request.args.get("fields"))
+        cursor = request.args.get("cursor")
+
+        if is_truthy(request.args.get("stream")):
+            limit = parse_limit(request.args.get("limit"), default=None, maximum=None)
+            etag = make_etag("cards", catalog_version(), request.args)
+            if etag in request.if_none_match:
+                return not_modified(etag)
+            stmt = card_query(fields, cursor, limit)
+            response = Response(
+                stream_with_context(stream_cards(stmt, fields)),
+                mimetype="application/json"
+            )
+            response.set_etag(etag)
+            return response
+
+        limit = parse_limit(request.args.get("limit"))
+
+        def render(version):
+            rows = db.session.execute(card_query(fields, cursor, limit + 1)).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            return {
+                "cards": [serialize_row(row, fields) for row in rows],
+                "next_cursor": rows[-1][0] if has_more else None
+            }
+
+        return catalog_response("cards", render)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@cards_bp.route('/cards/search', methods=['GET'])
+@jwt_required()
+def search_cards():
+    """
+    Search cards by name, attack names and description
+    ---
+    tags:
+      - Cards
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: q
+        type: string
+        required: true
+        description: Search text, e.g. "char" or "fire spin"
+      - in: query
+        name: limit
+        type: integer
+        description: Maximum number of results (default 20, max 100)
+      - in: query
+        name: prefix
+        type: boolean
+        description: Treat the last word as a prefix for typeahead (default true)
+    responses:
+      200:
+        description: Matching cards ordered by relevance
+      304:
+        description: Not modified, the client's ETag matches the current catalog version
+      400:
+        description: Missing query or invalid limit
+    """
+    try:
+        query = request.args.get("q", "").strip()
+        if not query:
+            return jsonify({"error": "Query parameter 'q' is required"}), 400
+        limit = parse_limit(request.args.get("limit"), default=20, maximum=100)
+        prefix = is_truthy(request.args.get("prefix", "true"))
+
+        def render(version):
+            search_index.ensure_built(version)
+            return {"cards": search_index.search(query, limit=limit, prefix=prefix)}
+
+        return catalog_response("search", render)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def parse_facet_filters(args):
+    """Collect facet filters from query args; repeat a key to OR values"""
+    filters = {}
+    for dimension in FACET_DIMENSIONS:
+        values = [v for v in args.getlist(dimension) if v != ""]
+        if dimension in RANGE_DIMENSIONS:
+            values = [int(v) for v in values]
+            low, high = args.get(f"{dimension}_min"), args.get(f"{dimension}_max")
+            if low or high:
+                if values:
+                    raise ValueError(f"Use either {dimension} or {dimension}_min/{dimension}_max")
+                filters[dimension] = (int(low) if low else None, int(high) if high else None)
+                continue
+        if values:
+            filters[dimension] = values
+    return filters
+
+
+@cards_bp.route('/cards/filter', methods=['GET'])
+@jwt_required()
+def filter_cards():
+    """
+    Filter cards by attributes and get facet counts
+    ---
+    tags:
+      - Cards
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: set_name
+        type: string
+        description: Repeat a filter to accept any of several values, e.g. energy_type=Fire&energy_type=Water
+      - in: query
+        name: rarity
+        type: string
+      - in: query
+        name: energy_type
+        type: string
+      - in: query
+        name: card_type
+        type: string
+      - in: query
+        name: evolution_stage
+        type: string
+      - in: query
+        name: weakness
+        type: string
+      - in: query
+        name: resistance
+        type: string
+      - in: query
+        name: hp
+        type: integer
+      - in: query
+        name: hp_min
+        type: integer
+      - in: query
+        name: hp_max
+        type: integer
+      - in: query
+        name: retreat_cost
+        type: integer
+      - in: query
+        name: retreat_cost_min
+        type: integer
+      - in: query
+        name: retreat_cost_max
+        type: integer
+      - in: query
+        name: limit
+        type: integer
+        description: Page size (default 50, max 500)
+      - in: query
+        name: offset
+        type: integer
+    responses:
+      200:
+        description: Matching cards, total match count and per-dimension facet counts
+      304:
+        description: Not modified, the client's ETag matches the current catalog version
+      400:
+        description: Invalid filter or pagination
+    """
+    try:
+        filters = parse_facet_filters(request.args)
+        limit = parse_limit(request.args.get("limit"), default=50, maximum=500)
+        offset = parse_offset(request.args.get("offset"))
+
+        def render(version):
+            facet_index.ensure_built(version)
+            card_ids, total, facets = facet_index.query(filters, limit=limit, offset=offset)
+
+            cards = {}
+            if card_ids:
+                rows = db.session.execute(
+                    card_query(DEFAULT_CARD_FIELDS).where(Card.id.in_(card_ids))
+                )
+                cards = {row[0]: serialize_row(row, DEFAULT_CARD_FIELDS) for row in rows}
+
+            return {
+                "cards": [cards[card_id] for card_id in card_ids if card_id in cards],
+                "total": total,
+                "facets": facets
+            }
+
+        return catalog_response("filter", render)
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -76,8 +330,12 @@ def delete_card(id):
         if not card:
             return jsonify({"message": f"Card with id '{id}' not found."}), 404
 
+        remove_card_progress(card)
         db.session.delete(card)
+        version = bump_catalog_version()
         db.session.commit()
+        search_index.remove_card(id, version)
+        facet_index.invalidate()
         return jsonify({"message": f"Card with id '{id}' and related entries in collections/decks have been deleted."}), 200
 
     except Exception as e:
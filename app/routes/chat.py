@@ -1,11 +1,102 @@
 
-from flask import Blueprint, request, jsonify, session
+import hashlib
+import json
+import uuid
+from flask import Blueprint, Response, request, jsonify, session, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app.services.ai_executor import AIExecutor, AIOverloadedError, AITimeoutError
 from app.services.ai_service import PokemonAIService
+from app.services.answer_cache import AnswerCache
+from app.services.chat_sessions import ChatSessionManager
+from app.services.context_service import get_user_digest
 
 chat_bp = Blueprint('chat', __name__)
 
-# Shared AI service instance
-ai_service = PokemonAIService()
+def get_ai_service():
+    """Per-app AI service, created on the first chat request so workers start without the AI client"""
+    if "ai_service" not in current_app.extensions:
+        current_app.extensions["ai_service"] = PokemonAIService()
+    return current_app.extensions["ai_service"]
+
+def get_session_manager():
+    """Per-app chat session manager, created on first use from the app config"""
+    if "chat_sessions" not in current_app.extensions:
+        current_app.extensions["chat_sessions"] = ChatSessionManager.from_config(current_app.config)
+    return current_app.extensions["chat_sessions"]
+
+def get_ai_executor():
+    """Per-app bounded executor for AI calls, created on first use from the app config"""
+    if "ai_executor" not in current_app.extensions:
+        current_app.extensions["ai_executor"] = AIExecutor.from_config(current_app.config)
+    return current_app.extensions["ai_executor"]
+
+def get_answer_cache():
+    """Per-app cache of answers to standalone questions"""
+    if "answer_cache" not in current_app.extensions:
+        current_app.extensions["answer_cache"] = AnswerCache.from_config(current_app.config)
+    return current_app.extensions["answer_cache"]
+
+def user_context(data):
+    """Digest of the signed-in user's collection and decks, unless disabled with `include_context: false`"""
+    identity = get_jwt_identity()
+    if not identity or not current_app.config.get("CHAT_USER_CONTEXT", True):
+        return None
+    if data.get('include_context') in (False, 'false', '0'):
+        return None
+    return get_user_digest(int(identity), current_app.config.get("CHAT_CONTEXT_TOKEN_BUDGET", 600))
+
+def context_scope(context):
+    """Answer cache scope of a context: answers are only shared between identical contexts"""
+    return hashlib.blake2b(context.encode(), digest_size=16).hexdigest() if context else ""
+
+def lookup_answer(data, question, chat_session, context=None):
+    """Serve a cached answer unless the cache is disabled or bypassed with `no_cache`.
+
+    Returns (answer or None, whether the new answer may be cached). Only
+    the first question of a conversation is looked up and stored, since
+    later answers depend on the conversation so far. Answers given with
+    a personal context are scoped to that exact context, so they are
+    reused until the user's collection or decks change.
+    """
+    if not current_app.config.get("CHAT_ANSWER_CACHE_ENABLED", True):
+        return None, False
+    if chat_session.turns or chat_session.summary:
+        return None, False
+    cache = get_answer_cache()
+    if data.get('no_cache') in (True, 'true', '1'):
+        cache.record_bypass()
+        return None, False
+    answer = cache.get(question, context_scope(context))
+    if answer is not None:
+        with chat_session.lock:
+            chat_session.add_turn(question, answer)
+    return answer, answer is None
+
+def request_question(data):
+    """The question of a request payload, or None if it is missing, not a string or blank"""
+    question = data.get('question') if isinstance(data, dict) else None
+    if not isinstance(question, str) or not question.strip():
+        return None
+    return question
+
+def overloaded():
+    return jsonify({'error': 'The AI service is busy, please try again shortly'}), 503, {'Retry-After': '2'}
+
+def chat_session_key(data=None):
+    """Key chats by JWT identity when present, otherwise by a cookie session id.
+
+    Clients may pass a `session_id` to keep several conversations apart.
+    """
+    verify_jwt_in_request(optional=True)
+    identity = get_jwt_identity()
+    if identity:
+        key = f"user:{identity}"
+    else:
+        if "chat_session_id" not in session:
+            session["chat_session_id"] = uuid.uuid4().hex
+        key = f"anon:{session['chat_session_id']}"
+    session_id = (data or {}).get("session_id")
+    return f"{key}:{session_id}" if session_id else key
 
 @chat_bp.route('/ask', methods=['POST'])
 def ask_question():
@@ -25,6 +116,15 @@ def ask_question():
               type: string
             chat_reset:
               type: boolean
+            session_id:
+              type: string
+              description: Optional conversation id, to keep several conversations per user
+            no_cache:
+              type: boolean
+              description: Always ask the model, bypassing the answer cache
+            include_context:
+              type: boolean
+              description: Send a digest of the signed-in user's collection and decks (default true)
     responses:
       200:
         description: AI response
@@ -32,26 +132,149 @@ def ask_question():
         description: Missing question
       500:
         description: AI service error
+      503:
+        description: Too many AI requests in progress, retry after the Retry-After delay
+      504:
+        description: The AI service did not answer in time
     """
-    
+
     data = request.get_json()
-    
-    if not data or 'question' not in data:
+
+    question = request_question(data)
+    if question is None:
         return jsonify({'error': 'Question is required'}), 400
-    
-    question = data['question']
-    
+
+    sessions = get_session_manager()
+    key = chat_session_key(data)
+
     if 'chat_reset' in data and data['chat_reset']:
-        ai_service.reset_chat()
-    
-    result = ai_service.ask_question(question)
-    
+        sessions.reset(key)
+
+    chat_session = sessions.get(key)
+    context = user_context(data)
+    answer, cacheable = lookup_answer(data, question, chat_session, context)
+    if answer is not None:
+        return jsonify({'response': answer, 'cached': True})
+
+    try:
+        result = get_ai_executor().run(
+            get_ai_service().ask_question, question, chat_session,
+            timeout=current_app.config.get("AI_CALL_TIMEOUT"),
+            retries=current_app.config.get("AI_MAX_RETRIES", 0),
+            context=context
+        )
+    except AIOverloadedError:
+        return overloaded()
+    except AITimeoutError as e:
+        return jsonify({'error': str(e)}), 504
+
     if result['status'] == 'success':
+        if cacheable:
+            get_answer_cache().set(question, result['response'], context_scope(context))
         return jsonify({'response': result['response']})
     else:
         return jsonify({'error': result['message']}), 500
 
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@chat_bp.route('/ask/stream', methods=['GET', 'POST'])
+def ask_question_stream():
+    """
+    Ask the AI a question and stream the answer as Server-Sent Events
+    ---
+    tags:
+      - Chat
+    parameters:
+      - in: query
+        name: question
+        type: string
+        description: The question, for GET requests (e.g. from EventSource)
+      - in: body
+        name: body
+        required: false
+        description: The question, for POST requests
+        schema:
+          type: object
+          properties:
+            question:
+              type: string
+            chat_reset:
+              type: boolean
+            session_id:
+              type: string
+            no_cache:
+              type: boolean
+            include_context:
+              type: boolean
+    produces:
+      - text/event-stream
+    responses:
+      200:
+        description: >
+          A stream of `data: {"text": ...}` events as the answer is
+          generated, ending with an `event: done` or `event: error` event
+      400:
+        description: Missing question
+      503:
+        description: Too many AI requests in progress, retry after the Retry-After delay
+    """
+    data = request.get_json(silent=True) if request.method == 'POST' else request.args
+    data = data or {}
+
+    question = request_question(data)
+    if question is None:
+        return jsonify({'error': 'Question is required'}), 400
+
+    sessions = get_session_manager()
+    key = chat_session_key(data)
+
+    if data.get('chat_reset') in (True, 'true', '1'):
+        sessions.reset(key)
+
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    }
+    chat_session = sessions.get(key)
+    context = user_context(data)
+    answer, cacheable = lookup_answer(data, question, chat_session, context)
+    if answer is not None:
+        body = sse_event({'text': answer}) + sse_event({'cached': True}, event='done')
+        return Response(body, mimetype='text/event-stream', headers=headers)
+
+    ai_service = get_ai_service()
+    try:
+        lease = get_ai_executor().acquire()
+    except AIOverloadedError:
+        return overloaded()
+    chunks = ai_service.ask_question_stream(
+        question, chat_session, timeout=current_app.config.get("AI_CALL_TIMEOUT"), context=context
+    )
+    answer_cache = get_answer_cache()
+
+    def generate():
+        try:
+            parts = []
+            for text in chunks:
+                parts.append(text)
+                yield sse_event({'text': text})
+            if cacheable:
+                answer_cache.set(question, "".join(parts), context_scope(context))
+            yield sse_event({}, event='done')
+        except Exception as e:
+            yield sse_event({'message': str(e)}, event='error')
+        finally:
+            # runs on client disconnect too and cancels the upstream call
+            chunks.close()
+
+    response = Response(generate(), mimetype='text/event-stream', headers=headers)
+    # the stream holds its capacity until the response is closed
+    response.call_on_close(lease.release)
+    return response
+
 @chat_bp.route('/reset', methods=['POST'])
 def reset_chat():
-    ai_service.reset_chat()
+    get_session_manager().reset(chat_session_key(request.get_json(silent=True)))
     return jsonify({'message': 'Chat session reset successfully'})
\ No newline at end of file
@@ -1,11 +1,27 @@
 
-from flask import Blueprint, jsonify, request
+import io
+from datetime import date, timedelta
+from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
 from app.db import db
 from app.models import Collection, Card
+from app.models.collection import VALID_CONDITIONS
+from app.services.cache_service import user_response, bump_user_version
+from app.services.import_service import import_collection, add_to_collection
+from app.services.price_service import collection_value, value_history, latest_price_date, PRICES_VERSION_KEY
+from app.services.set_progress_service import set_progress, remove_entry_progress, apply_set_progress
+from app.utils import parse_limit, parse_offset, parse_date
 
 collections_bp = Blueprint('collections', __name__, url_prefix='')
 
+COLLECTION_SORTS = {
+    "name": Card.name,
+    "set": Card.set_name,
+    "date_added": Collection.date_added,
+    "quantity": Collection.quantity,
+}
+
 @collections_bp.route('/collection', methods=['GET'])
 @jwt_required()
 def get_user_collection():
@@ -16,27 +32,96 @@ def get_user_collection():
       - Collections
     security:
       - Bearer: []
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        description: Page size (default 100, max 1000)
+      - in: query
+        name: offset
+        type: integer
+        description: Number of entries to skip
+      - in: query
+        name: sort
+        type: string
+        enum: [name, set, date_added, quantity]
+        description: Sort key (default date_added)
+      - in: query
+        name: order
+        type: string
+        enum: [asc, desc]
+        description: Sort direction (default asc)
+      - in: query
+        name: set_name
+        type: string
+      - in: query
+        name: rarity
+        type: string
+      - in: query
+        name: condition
+        type: string
     responses:
       200:
         description: User's card collection
+      400:
+        description: Invalid pagination, sort or order
     """
     try:
         current_user_id = get_jwt_identity()
-        collections = Collection.query.filter_by(user_id=current_user_id).all()
-        
-        collection_data = []
-        for collection in collections:
-            card = Card.query.get(collection.card_id)
-            if card:
-                collection_data.append({
-                    "collection_id": collection.id,
-                    "card_id": card.id,
-                    "card_name": card.name,
-                    "quantity": collection.quantity,
-                    "condition": collection.card_condition
-                })
-        
-        return jsonify({"collections": collection_data}), 200
+        limit = parse_limit(request.args.get("limit"))
+        offset = parse_offset(request.args.get("offset"))
+        sort = request.args.get("sort", "date_added")
+        order = request.args.get("order", "asc")
+        if sort not in COLLECTION_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(COLLECTION_SORTS)}")
+        if order not in ("asc", "desc"):
+            raise ValueError("order must be 'asc' or 'desc'")
+
+        sort_column = COLLECTION_SORTS[sort]
+        stmt = (
+            select(
+                Collection.id, Collection.card_id, Collection.quantity,
+                Collection.card_condition, Collection.date_added,
+                Card.name, Card.set_name, Card.rarity
+            )
+            .join(Card, Card.id == Collection.card_id)
+            .where(Collection.user_id == current_user_id)
+        )
+        if request.args.get("set_name"):
+            stmt = stmt.where(Card.set_name == request.args["set_name"])
+        if request.args.get("rarity"):
+            stmt = stmt.where(Card.rarity == request.args["rarity"])
+        if request.args.get("condition"):
+            stmt = stmt.where(Collection.card_condition == request.args["condition"])
+        stmt = (
+            stmt.order_by(sort_column.desc() if order == "desc" else sort_column.asc(), Collection.id)
+            .offset(offset)
+            .limit(limit + 1)
+        )
+
+        def render():
+            rows = db.session.execute(stmt).all()
+            has_more = len(rows) > limit
+
+            collection_data = [{
+                "collection_id": row.id,
+                "card_id": row.card_id,
+                "card_name": row.name,
+                "set_name": row.set_name,
+                "rarity": row.rarity,
+                "quantity": row.quantity,
+                "condition": row.card_condition,
+                "date_added": row.date_added.isoformat() if row.date_added else None
+            } for row in rows[:limit]]
+
+            return {
+                "collections": collection_data,
+                "next_offset": offset + limit if has_more else None
+            }
+
+        return user_response("collection", current_user_id, render)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -63,6 +148,9 @@ def create_collection():
               type: string
             quantity:
               type: integer
+            card_condition:
+              type: string
+              description: Defaults to Near Mint; adding a card and condition already owned increases its quantity
     responses:
       201:
         description: Collection created successfully
@@ -81,25 +169,26 @@ def create_collection():
 
         card_id = data.get("card_id")
         quantity = data.get("quantity", 1)
+        condition = data.get("card_condition", "Near Mint")
 
         if not card_id:
             return jsonify({"error": "Card ID is required"}), 400
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            return jsonify({"error": "Quantity must be at least 1"}), 400
+        if condition not in VALID_CONDITIONS:
+            return jsonify({"error": f'Invalid card condition. Must be one of: {", ".join(VALID_CONDITIONS)}'}), 400
 
         card = Card.query.get(card_id)
         if not card:
             return jsonify({"message": f"Card with id '{card_id}' not found."}), 404
 
-        new_collection = Collection(
-            user_id=current_user_id,
-            card_id=card_id,
-            quantity=quantity
-        )
-        db.session.add(new_collection)
+        [collection_id] = add_to_collection(int(current_user_id), {(card_id, condition): quantity})
+        bump_user_version(current_user_id)
         db.session.commit()
 
         return jsonify({
             "message": "Collection created successfully",
-            "collection_id": new_collection.id
+            "collection_id": collection_id
         }), 201
 
     except Exception as e:
@@ -107,6 +196,240 @@ def create_collection():
         return jsonify({"error": str(e)}), 500
 
 
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+@collections_bp.route('/collection/import', methods=['POST'])
+@jwt_required()
+def import_collection_entries():
+    """
+    Bulk import cards into the current user's collection
+    ---
+    tags:
+      - Collections
+    security:
+      - Bearer: []
+    consumes:
+      - text/csv
+      - application/x-ndjson
+    parameters:
+      - in: query
+        name: format
+        type: string
+        enum: [csv, ndjson]
+        description: Body format, defaults to the Content-Type (text/csv or application/x-ndjson)
+      - in: body
+        name: body
+        required: true
+        description: >
+          CSV with a header row (card_id, quantity, condition) or one JSON
+          object per line with the same keys. quantity defaults to 1 and
+          must be a whole number, condition defaults to "Near Mint". Rows
+          are merged with existing entries of the same card and condition;
+          bad lines are reported and skipped.
+        schema:
+          type: string
+    responses:
+      200:
+        description: Import report with created/updated counts and per-line errors
+      400:
+        description: Unknown format or malformed CSV header
+      500:
+        description: Server error
+    """
+    try:
+        current_user_id = int(get_jwt_identity())
+        fmt = request.args.get("format") or IMPORT_FORMATS.get(request.mimetype)
+        if fmt not in ("csv", "ndjson"):
+            return jsonify({"error": "Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson"}), 400
+
+        stream = io.TextIOWrapper(request.stream, encoding="utf-8-sig", newline="")
+        report = import_collection(current_user_id, stream, fmt)
+        return jsonify(report.to_dict()), 200
+
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@collections_bp.route('/collection/sets', methods=['GET'])
+@jwt_required()
+def get_set_progress():
+    """
+    Completion of every set for the current user
+    ---
+    tags:
+      - Collections
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: One entry per set in the catalog, sorted by set name
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              set_name:
+                type: string
+              owned_cards:
+                type: integer
+                description: Distinct cards of the set in the collection
+              total_cards:
+                type: integer
+                description: Cards of the set in the catalog
+              copies:
+                type: integer
+              percent_complete:
+                type: number
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        return user_response("set-progress", current_user_id, lambda: set_progress(int(current_user_id)))
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@collections_bp.route('/collection/value', methods=['GET'])
+@jwt_required()
+def get_collection_value():
+    """
+    Value of the current user's collection on a date
+    ---
+    tags:
+      - Collections
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: date
+        type: string
+        format: date
+        description: Valuation date (default today); each card uses its latest price on or before it
+    responses:
+      200:
+        description: Total and per-condition value
+        schema:
+          type: object
+          properties:
+            date:
+              type: string
+            price_date:
+              type: string
+              description: Latest price snapshot used
+            total:
+              type: number
+            by_condition:
+              type: object
+              additionalProperties:
+                type: number
+            priced_copies:
+              type: integer
+            unpriced_copies:
+              type: integer
+      400:
+        description: Invalid date
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        on_date = parse_date(request.args.get("date")) or date.today()
+        lookback = current_app.config.get("PRICE_LOOKBACK_DAYS", 30)
+        # the default date moves at midnight, so it is part of the cache key
+        return user_response(
+            f"value-{on_date.isoformat()}", current_user_id, lambda: collection_value(int(current_user_id), on_date, lookback),
+            extra_keys=(PRICES_VERSION_KEY,)
+        )
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@collections_bp.route('/collection/value/history', methods=['GET'])
+@jwt_required()
+def get_collection_value_history():
+    """
+    Value of the current user's collection at every price snapshot in a date range
+    ---
+    tags:
+      - Collections
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: start
+        type: string
+        format: date
+        description: First date (default one year before end)
+      - in: query
+        name: end
+        type: string
+        format: date
+        description: Last date (default the latest price snapshot)
+    responses:
+      200:
+        description: One point per snapshot date
+        schema:
+          type: object
+          properties:
+            start:
+              type: string
+            end:
+              type: string
+            points:
+              type: array
+              items:
+                type: object
+                properties:
+                  date:
+                    type: string
+                  total:
+                    type: number
+                  by_condition:
+                    type: object
+                    additionalProperties:
+                      type: number
+            price_date:
+              type: string
+            priced_copies:
+              type: integer
+            unpriced_copies:
+              type: integer
+      400:
+        description: Invalid dates or range too long
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        end = parse_date(request.args.get("end"), "end")
+        start = parse_date(request.args.get("start"), "start")
+        max_days = current_app.config.get("PRICE_MAX_HISTORY_DAYS", 1096)
+        lookback = current_app.config.get("PRICE_LOOKBACK_DAYS", 30)
+
+        def render():
+            last = end or latest_price_date() or date.today()
+            first = start or last - timedelta(days=365)
+            if first > last:
+                raise ValueError("start must not be after end")
+            if (last - first).days >= max_days:
+                raise ValueError(f"The range must be shorter than {max_days} days")
+            return value_history(int(current_user_id), first, last, lookback)
+
+        return user_response("value-history", current_user_id, render, extra_keys=(PRICES_VERSION_KEY,))
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @collections_bp.route('/collection/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_collection(id):
@@ -146,7 +469,9 @@ def delete_collection(id):
         if not coll:
             return jsonify({"message": f"Collection entry with id '{id}' not found."}), 404
 
+        apply_set_progress(coll.user_id, remove_entry_progress(coll))
         db.session.delete(coll)
+        bump_user_version(current_user_id)
         db.session.commit()
         return jsonify({
             "message": f"Collection entry with id '{id}' has been deleted."
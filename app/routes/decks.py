@@ -1,9 +1,15 @@
 
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select, func
 from app.db import db
-from app.models import Deck, DeckCard, Collection
-from app.utils import sanitize_input
+from app.models import Card, Deck, DeckCard
+from app.services.cache_service import user_response, bump_user_version, get_versions, user_version_key, CATALOG_VERSION_KEY
+from app.services.deck_service import apply_deck_operations, add_card_to_deck as add_deck_card, DeckEditError
+from app.services.legality_service import validate_decks
+from app.services.analytics_service import deck_analytics, TARGET_FIELDS, OPENING_HAND
+from app.services.simulation_service import simulate_deck as run_deck_simulation
+from app.utils import sanitize_input, parse_limit, parse_offset
 
 decks_bp = Blueprint('decks', __name__, url_prefix='')
 
@@ -45,6 +51,7 @@ def create_deck():
 
         new_deck = Deck(user_id=current_user_id, name=name, description=description)
         db.session.add(new_deck)
+        bump_user_version(current_user_id)
         db.session.commit()
 
         return jsonify({"message": "Deck created successfully", "deck_id": new_deck.id}), 201
@@ -122,32 +129,22 @@ def add_card_to_deck(deck_id):
 
         if not card_id:
             return jsonify({"error": "card_id is required"}), 400
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            return jsonify({"error": "quantity must be a positive integer"}), 400
 
         # Verify deck ownership
         deck = Deck.query.filter_by(id=deck_id, user_id=current_user_id).first()
         if not deck:
             return jsonify({"error": "Deck not found or access denied"}), 404
 
-        # Check if user has this card in their collection
-        user_collection = Collection.query.filter_by(
-            user_id=current_user_id,
-            card_id=card_id
-        ).first()
-        if not user_collection:
-            return jsonify({"error": "Card not in your collection"}), 400
-
-        # Check total after adding
-        existing = DeckCard.query.filter_by(deck_id=deck_id, card_id=card_id).first()
-        new_total = quantity + (existing.quantity if existing else 0)
-        if new_total > user_collection.quantity:
-            return jsonify({"error": "Not enough cards in your collection"}), 400
-
-        # Add or update
-        if existing:
-            existing.quantity = new_total
-        else:
-            db.session.add(DeckCard(deck_id=deck_id, card_id=card_id, quantity=quantity))
+        # Checks ownership and adds in one statement
+        try:
+            add_deck_card(deck.id, int(current_user_id), str(card_id), quantity)
+        except DeckEditError as e:
+            db.session.rollback()
+            return jsonify({"error": e.errors[0]["error"]}), 400
 
+        bump_user_version(current_user_id)
         db.session.commit()
         return jsonify({"message": "Card added to deck successfully"}), 201
 
@@ -155,6 +152,76 @@ def add_card_to_deck(deck_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
       
+@decks_bp.route('/deck/<int:deck_id>/cards/batch', methods=['POST'])
+@jwt_required()
+def batch_edit_deck(deck_id):
+    """
+    Apply several card changes to a deck at once
+    ---
+    tags:
+      - Decks
+    consumes:
+      - application/json
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: deck_id
+        type: integer
+        required: true
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - operations
+          properties:
+            operations:
+              type: array
+              description: >
+                Applied in order. "add" adds copies (default 1), "remove"
+                removes copies (all of them without quantity), "set" sets
+                the number of copies. A card's copies may only go up to the
+                number owned; lowering is always allowed. Either every
+                operation is applied or none is.
+              items:
+                type: object
+                properties:
+                  op:
+                    type: string
+                    enum: [add, remove, set]
+                  card_id:
+                    type: string
+                  quantity:
+                    type: integer
+    responses:
+      200:
+        description: Deck updated, returns the resulting quantity of every card touched
+      400:
+        description: One or more operations are invalid, returns the errors per operation
+      404:
+        description: Deck not found or access denied
+      500:
+        description: Server error
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+
+        deck = Deck.query.filter_by(id=deck_id, user_id=current_user_id).first()
+        if not deck:
+            return jsonify({"error": "Deck not found or access denied"}), 404
+
+        cards = apply_deck_operations(deck, current_user_id, data.get("operations"))
+        return jsonify({"message": "Deck updated successfully", "cards": cards}), 200
+
+    except DeckEditError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 @decks_bp.route('/deck', methods=['GET'])
 @jwt_required()
 def list_decks():
@@ -165,9 +232,18 @@ def list_decks():
       - Decks
     security:
       - Bearer: []
+    parameters:
+      - in: query
+        name: limit
+        type: integer
+        description: Page size (default 100, max 1000)
+      - in: query
+        name: offset
+        type: integer
+        description: Number of decks to skip
     responses:
       200:
-        description: A list of decks
+        description: A list of decks. When more decks exist the `X-Next-Offset` header holds the next offset.
         schema:
           type: array
           items:
@@ -187,25 +263,397 @@ def list_decks():
               last_updated:
                 type: string
                 format: date-time
+              card_count:
+                type: integer
+              distinct_cards:
+                type: integer
+              energy_types:
+                type: object
+                additionalProperties:
+                  type: integer
+      400:
+        description: Invalid pagination
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        limit = parse_limit(request.args.get("limit"))
+        offset = parse_offset(request.args.get("offset"))
+
+        def render():
+            counts = (
+                select(
+                    DeckCard.deck_id,
+                    func.sum(DeckCard.quantity).label("card_count"),
+                    func.count(func.distinct(DeckCard.card_id)).label("distinct_cards")
+                )
+                .join(Deck, Deck.id == DeckCard.deck_id)
+                .where(Deck.user_id == current_user_id)
+                .group_by(DeckCard.deck_id)
+                .subquery()
+            )
+            rows = db.session.execute(
+                select(
+                    Deck.id, Deck.name, Deck.description, Deck.is_public,
+                    Deck.created_at, Deck.last_updated,
+                    func.coalesce(counts.c.card_count, 0).label("card_count"),
+                    func.coalesce(counts.c.distinct_cards, 0).label("distinct_cards")
+                )
+                .outerjoin(counts, counts.c.deck_id == Deck.id)
+                .where(Deck.user_id == current_user_id)
+                .order_by(Deck.id)
+                .offset(offset)
+                .limit(limit + 1)
+            ).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            energy_types = {row.id: {} for row in rows}
+            if rows:
+                breakdown = db.session.execute(
+                    select(DeckCard.deck_id, Card.energy_type, func.sum(DeckCard.quantity))
+                    .join(Card, Card.id == DeckCard.card_id)
+                    .where(DeckCard.deck_id.in_(list(energy_types)), Card.energy_type.isnot(None))
+                    .group_by(DeckCard.deck_id, Card.energy_type)
+                )
+                for deck_id, energy_type, quantity in breakdown:
+                    energy_types[deck_id][energy_type] = int(quantity)
+
+            result = []
+            for row in rows:
+                result.append({
+                    "id": row.id,
+                    "name": row.name,
+                    "description": row.description,
+                    "is_public": row.is_public,
+                    "created_at": row.created_at.strftime('%Y-%m-%d'),
+                    "last_updated": row.last_updated.strftime('%Y-%m-%d'),
+                    "card_count": int(row.card_count),
+                    "distinct_cards": int(row.distinct_cards),
+                    "energy_types": energy_types[row.id]
+                })
+
+            headers = {"X-Next-Offset": str(offset + limit)} if has_more else {}
+            return result, headers
+
+        return user_response("decks", current_user_id, render)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@decks_bp.route('/deck/legality', methods=['GET'])
+@jwt_required()
+def list_deck_legality():
+    """
+    Tournament legality of every deck of the current user
+    ---
+    tags:
+      - Decks
+    security:
+      - Bearer: []
+    description: >
+      Checks 60 cards, at most 4 copies of a card by name (basic energy excepted)
+      and at least one Basic Pokémon for all decks in one pass, e.g. for legality
+      badges in the deck list.
+    responses:
+      200:
+        description: Legality per deck
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              deck_id:
+                type: integer
+              legal:
+                type: boolean
+              card_count:
+                type: integer
+              violations:
+                type: array
+                items:
+                  type: object
+                  properties:
+                    rule:
+                      type: string
+                      enum: [deck_size, max_copies, basic_pokemon]
+                    message:
+                      type: string
+                    card_name:
+                      type: string
+                    limit:
+                      type: integer
+                    expected:
+                      type: integer
+                    actual:
+                      type: integer
     """
     try:
         current_user_id = get_jwt_identity()
-        decks = Deck.query.filter_by(user_id=current_user_id).all()
-
-        result = []
-        for deck in decks:
-            result.append({
-                "id": deck.id,
-                "name": deck.name,
-                "description": deck.description,
-                "is_public": deck.is_public,
-                "created_at": deck.created_at.strftime('%Y-%m-%d'),
-                "last_updated": deck.last_updated.strftime('%Y-%m-%d'),
-                "card_count": sum(dc.quantity for dc in deck.deck_cards)
-            })
-
-        return jsonify(result), 200
+        # one version lookup serves both the ETag and the per-deck cache
+        versions = get_versions(user_version_key(current_user_id), CATALOG_VERSION_KEY)
+
+        def render():
+            results = validate_decks(int(current_user_id), catalog=versions[1])
+            return [{"deck_id": deck_id, **result} for deck_id, result in results.items()]
+
+        return user_response("legality", current_user_id, render, versions=versions)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@decks_bp.route('/deck/<int:deck_id>/legality', methods=['GET'])
+@jwt_required()
+def get_deck_legality(deck_id):
+    """
+    Tournament legality of one deck
+    ---
+    tags:
+      - Decks
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: deck_id
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Whether the deck is legal and the rules it breaks (same fields as /deck/legality)
+      404:
+        description: Deck not found or access denied
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        results = validate_decks(int(current_user_id), [deck_id])
+        if deck_id not in results:
+            return jsonify({"error": "Deck not found or access denied"}), 404
+        return jsonify({"deck_id": deck_id, **results[deck_id]}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@decks_bp.route('/deck/<int:deck_id>/analytics', methods=['GET'])
+@jwt_required()
+def get_deck_analytics(deck_id):
+    """
+    Statistics of one deck
+    ---
+    tags:
+      - Decks
+    security:
+      - Bearer: []
+    description: >
+      Energy type and evolution stage counts, HP mean and median, retreat cost
+      histogram and weakness exposure (all weighted by copies), plus hypergeometric
+      draw odds for the cards matching the target filters (default Basic Pokémon).
+      Works on your own decks and on public decks.
+    parameters:
+      - in: path
+        name: deck_id
+        type: integer
+        required: true
+      - in: query
+        name: draws
+        type: integer
+        description: Cards drawn for the odds (default 7, an opening hand)
+      - in: query
+        name: card_id
+        type: string
+      - in: query
+        name: name
+        type: string
+        description: Card name, matching all printings
+      - in: query
+        name: card_type
+        type: string
+      - in: query
+        name: energy_type
+        type: string
+      - in: query
+        name: evolution_stage
+        type: string
+    responses:
+      200:
+        description: Deck statistics
+        schema:
+          type: object
+          properties:
+            deck_id:
+              type: integer
+            card_count:
+              type: integer
+            pokemon_count:
+              type: integer
+            energy_types:
+              type: object
+              additionalProperties:
+                type: integer
+            evolution_stages:
+              type: object
+              additionalProperties:
+                type: integer
+            hp:
+              type: object
+              properties:
+                mean:
+                  type: number
+                median:
+                  type: number
+            retreat_cost:
+              type: object
+              additionalProperties:
+                type: integer
+            weakness:
+              type: object
+              additionalProperties:
+                type: object
+                properties:
+                  copies:
+                    type: integer
+                  share:
+                    type: number
+            draw_odds:
+              type: object
+              properties:
+                target:
+                  type: object
+                draws:
+                  type: integer
+                matching:
+                  type: integer
+                at_least_one:
+                  type: number
+                distribution:
+                  type: array
+                  description: Chance of drawing exactly 0, 1, 2... matching cards
+                  items:
+                    type: number
+      400:
+        description: Invalid draws
+      404:
+        description: Deck not found or access denied
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        try:
+            draws = int(request.args.get("draws") or OPENING_HAND)
+        except ValueError:
+            return jsonify({"error": "draws must be an integer"}), 400
+        if draws < 1:
+            return jsonify({"error": "draws must be at least 1"}), 400
+
+        deck = db.session.execute(
+            select(Deck.id).where(Deck.id == deck_id, (Deck.user_id == current_user_id) | Deck.is_public.is_(True))
+        ).first()
+        if not deck:
+            return jsonify({"error": "Deck not found or access denied"}), 404
+
+        target = {field: request.args.get(field) for field in TARGET_FIELDS}
+        return jsonify({"deck_id": deck_id, **deck_analytics(deck_id, target, draws)}), 200
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@decks_bp.route('/deck/<int:deck_id>/simulate', methods=['POST'])
+@jwt_required()
+def simulate_deck(deck_id):
+    """
+    Monte Carlo simulation of a deck's opening hands and setup
+    ---
+    tags:
+      - Decks
+    consumes:
+      - application/json
+    security:
+      - Bearer: []
+    description: >
+      Shuffles the deck `trials` times, mulligans hands without a Basic Pokémon,
+      sets aside 6 prizes and draws one card per turn. Reports how often each
+      condition (at least `min` matching cards in hand by `turn`) holds, how often
+      matching cards are prized, and 95% (or `confidence`) intervals. With
+      `tolerance`, stops as soon as every interval is within ± tolerance. The same
+      seed always gives the same result.
+    parameters:
+      - in: path
+        name: deck_id
+        type: integer
+        required: true
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            trials:
+              type: integer
+              description: Games to simulate (default 100000, max SIMULATION_MAX_TRIALS)
+            seed:
+              type: integer
+              description: Random seed; a random one is used and returned if omitted
+            turn:
+              type: integer
+              description: Cards drawn after setup (default 1)
+            tolerance:
+              type: number
+              description: Stop early once every interval half-width is at most this, e.g. 0.005
+            confidence:
+              type: number
+              description: Interval confidence level (default 0.95)
+            conditions:
+              type: array
+              items:
+                type: object
+                properties:
+                  card_id:
+                    type: string
+                  name:
+                    type: string
+                  card_type:
+                    type: string
+                  energy_type:
+                    type: string
+                  evolution_stage:
+                    type: string
+                  min:
+                    type: integer
+                    description: Matching cards needed (default 1)
+    responses:
+      200:
+        description: >
+          Estimates as {probability, ci} for opening_basic, mulligan, each condition,
+          all_conditions together and each condition's cards being prized, plus
+          seed, trials run and whether the run stopped early
+      400:
+        description: Invalid parameters, or a deck too small or over 60 cards
+      404:
+        description: Deck not found or access denied
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json(silent=True) or {}
+
+        deck = db.session.execute(
+            select(Deck.id).where(Deck.id == deck_id, (Deck.user_id == current_user_id) | Deck.is_public.is_(True))
+        ).first()
+        if not deck:
+            return jsonify({"error": "Deck not found or access denied"}), 404
+
+        result = run_deck_simulation(
+            deck_id,
+            conditions=data.get("conditions"),
+            trials=data.get("trials", 100_000),
+            seed=data.get("seed"),
+            turn=data.get("turn", 1),
+            tolerance=data.get("tolerance"),
+            confidence=data.get("confidence", 0.95)
+        )
+        return jsonify({"deck_id": deck_id, **result}), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -249,6 +697,7 @@ def delete_deck(id):
             return jsonify({"message": f"Deck with id '{id}' not found."}), 404
 
         db.session.delete(deck)
+        bump_user_version(current_user_id)
         db.session.commit()
         return jsonify({
             "message": f"Deck with id '{id}' and all associated cards have been deleted."
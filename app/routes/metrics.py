@@ -0,0 +1,61 @@
+
+import hmac
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.services.cache_service import catalog_cache, user_cache
+from app.services.legality_service import legality_cache
+from app.services.analytics_service import analytics_cache
+from app.services.price_service import snapshot_cache
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='')
+
+def cache_families():
+    caches = {"catalog": catalog_cache.stats(), "user": user_cache.stats(), "legality": legality_cache.stats(),
+              "analytics": analytics_cache.stats(), "price_snapshots": snapshot_cache.stats()}
+    answer_cache = current_app.extensions.get("answer_cache")
+    if answer_cache:
+        stats = answer_cache.stats()
+        caches["answers"] = {"entries": stats["entries"], "hits": stats["exact_hits"] + stats["similar_hits"], "misses": stats["misses"]}
+    return [
+        ("cache_entries", "Entries held by each response cache", "gauge",
+         [({"cache": name}, stats["entries"]) for name, stats in caches.items()]),
+        ("cache_hits_total", "Cache lookups that were served from the cache", "counter",
+         [({"cache": name}, stats["hits"]) for name, stats in caches.items()]),
+        ("cache_misses_total", "Cache lookups that had to be computed", "counter",
+         [({"cache": name}, stats["misses"]) for name, stats in caches.items()]),
+    ]
+
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1")
+
+def scrape_allowed():
+    """With METRICS_TOKEN set, require it as a bearer token; otherwise only allow loopback scrapes"""
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    return request.remote_addr in LOOPBACK_ADDRESSES
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics for the worker process that serves the scrape
+    ---
+    tags:
+      - Metrics
+    produces:
+      - text/plain
+    parameters:
+      - in: header
+        name: Authorization
+        type: string
+        description: "Bearer <METRICS_TOKEN> when a token is configured; otherwise only loopback clients are served"
+    responses:
+      200:
+        description: >
+          Request latency histograms, SQL query counts and time, response
+          sizes and slow queries per endpoint, plus cache counters
+      403:
+        description: Missing or wrong token, or a non-loopback client without a configured token
+    """
+    if not scrape_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    registry = current_app.extensions["metrics"]
+    return Response(registry.render(cache_families()), mimetype="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,154 @@
+
+import os
+import random
+import threading
+import time
+from functools import cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+
+try:
+    import fcntl
+except ImportError:  # Windows: no host-wide slots
+    fcntl = None
+
+
+@cache
+def transient_errors():
+    """Errors worth retrying; resolved on first use to keep the Google SDK out of startup"""
+    try:
+        from google.api_core import exceptions as google_exceptions
+    except ImportError:
+        return (ConnectionError, TimeoutError)
+    return (
+        ConnectionError,
+        TimeoutError,
+        google_exceptions.TooManyRequests,
+        google_exceptions.InternalServerError,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+    )
+
+
+class AIOverloadedError(Exception):
+    """Raised when the AI call capacity is exhausted"""
+
+
+class AITimeoutError(Exception):
+    """Raised when an AI call does not finish within its timeout"""
+
+
+def retry_call(fn, retries=2, base_delay=0.5, max_delay=4.0):
+    """Call `fn`, retrying transient errors with exponential backoff and full jitter"""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except transient_errors():
+            if attempt == retries:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+class HostSlots:
+    """Limit concurrent AI calls across all worker processes on a host.
+
+    Each slot is a lock file; holding an exclusive flock on it is holding
+    the slot. The OS drops the lock if a worker dies, so slots never leak.
+    """
+
+    def __init__(self, directory, count):
+        self.directory = directory
+        self.count = count
+        os.makedirs(directory, exist_ok=True)
+
+    def acquire(self):
+        """Return an open file holding a free slot, or None if all are taken"""
+        for i in random.sample(range(self.count), self.count):
+            f = open(os.path.join(self.directory, f"ai-slot-{i}.lock"), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except OSError:
+                f.close()
+        return None
+
+
+class Lease:
+    def __init__(self, capacity, slot):
+        self._capacity = capacity
+        self._slot = slot
+        self._lock = threading.Lock()
+        self._released = False
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        if self._slot is not None:
+            self._slot.close()
+        self._capacity.release()
+
+
+class AIExecutor:
+    """Bounded execution of AI calls.
+
+    At most `max_in_flight` calls run at once on a dedicated thread pool
+    and at most `max_queue` more may wait; beyond that `acquire`/`run`
+    fail immediately with AIOverloadedError. This bounds the AI calls in
+    flight, not the request workers: `run` still blocks its worker on the
+    result until the call returns or times out, and a stream holds its
+    worker while it is open. With `slot_dir`, `max_in_flight` is also
+    enforced across all worker processes on the host.
+    """
+
+    def __init__(self, max_in_flight=4, max_queue=8, timeout=30.0, slot_dir=None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._capacity = threading.BoundedSemaphore(max_in_flight + max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ai-call")
+        self._slots = HostSlots(slot_dir, max_in_flight) if slot_dir and fcntl else None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_in_flight=config.get("AI_MAX_IN_FLIGHT", 4),
+            max_queue=config.get("AI_MAX_QUEUE", 8),
+            timeout=config.get("AI_CALL_TIMEOUT", 30.0),
+            slot_dir=config.get("AI_SLOT_DIR"),
+        )
+
+    def acquire(self):
+        """Reserve capacity for one call; release the returned Lease when done"""
+        if not self._capacity.acquire(blocking=False):
+            raise AIOverloadedError("Too many AI requests in progress")
+        slot = None
+        if self._slots is not None:
+            slot = self._slots.acquire()
+            if slot is None:
+                self._capacity.release()
+                raise AIOverloadedError("Too many AI requests in progress on this host")
+        return Lease(self._capacity, slot)
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """Run `fn` on the AI pool and wait for it at most `timeout` seconds.
+
+        `fn` is passed a `cancel` threading.Event that is set when the wait
+        times out. A running call cannot be interrupted from outside, so
+        `fn` must check it and stop its upstream call; until it returns,
+        it keeps its pool thread, its capacity and its host slot.
+        """
+        lease = self.acquire()
+        cancel = threading.Event()
+        try:
+            future = self._pool.submit(fn, *args, cancel=cancel, **kwargs)
+        except Exception:
+            lease.release()
+            raise
+        future.add_done_callback(lambda f: lease.release())
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FuturesTimeoutError:
+            cancel.set()
+            future.cancel()
+            raise AITimeoutError("The AI service did not answer in time")
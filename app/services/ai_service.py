@@ -1,18 +1,25 @@
 
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from app.services.ai_executor import retry_call
+from app.services.chat_sessions import ChatSession
+from app.services.fake_model import FakeGenerativeModel
+
+def cancel_stream(response):
+    """Stop an in-flight streamed generation (closes the underlying RPC)"""
+    iterator = getattr(response, "_iterator", None)
+    if hasattr(iterator, "cancel"):
+        iterator.cancel()
+    elif hasattr(iterator, "close"):
+        iterator.close()
 
 class PokemonAIService:
-    def __init__(self):
+    def __init__(self, model=None):
         load_dotenv()
         self.api_key = os.getenv("API_KEY")
-        genai.configure(api_key=self.api_key)
-        
-        # Initialize the model
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.backend = os.getenv("AI_MODEL_BACKEND", "gemini")
         
-        # Create a chat session with personality
+        # Personality of the chat bot
         self.personality_prompt = """
         You are a world-renowned Pokémon TCG expert with 25 years of experience.
         Your personality traits:
@@ -27,17 +34,89 @@ class PokemonAIService:
         - Take into consideration, that not all users want to play the actual TCG game, some only want to collect the cards.
         """
 
-        self.reset_chat()
+        # Initialize the model, the personality is sent as system instruction with every turn
+        if model is not None:
+            self.model = model
+        elif self.backend == "fake":
+            self.model = FakeGenerativeModel()
+        else:
+            # imported here: the Gemini SDK is slow to import and only needed for the real backend
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self.model = genai.GenerativeModel('gemini-2.0-flash', system_instruction=self.personality_prompt)
+
+        # Used when no per-user session is given
+        self.default_session = ChatSession()
         
-    def reset_chat(self):
+    def reset_chat(self, session=None):
         """Reset the chat session"""
-        self.chat = self.model.start_chat(history=[])
-        self.chat.send_message(self.personality_prompt)
+        (session or self.default_session).reset()
     
-    def ask_question(self, question):
-        """Ask a question to the chat bot"""
+    def ask_question(self, question, session=None, timeout=None, retries=0, context=None, cancel=None):
+        """Ask a question to the chat bot, continuing the given session.
+
+        `context` is extra background (such as the user's collection digest)
+        sent ahead of the history. Transient API errors are retried
+        `retries` times with jittered backoff. With a `cancel` event the
+        answer is streamed, and setting the event stops the upstream
+        generation at the next chunk, releasing the session.
+        """
+        session = session or self.default_session
+        request_options = {"timeout": timeout} if timeout else None
         try:
-            response = self.chat.send_message(question)
-            return {"status": "success", "response": response.text}
+            if not (session.lock.acquire(timeout=timeout) if timeout else session.lock.acquire()):
+                raise TimeoutError("The conversation is busy with another question")
+            try:
+                chat = self.model.start_chat(history=session.history(context))
+                if cancel is None:
+                    text = retry_call(lambda: chat.send_message(question, request_options=request_options), retries).text
+                else:
+                    response = retry_call(
+                        lambda: chat.send_message(question, stream=True, request_options=request_options), retries
+                    )
+                    parts = []
+                    for chunk in response:
+                        if cancel.is_set():
+                            cancel_stream(response)
+                            raise TimeoutError("The question was cancelled")
+                        if chunk.text:
+                            parts.append(chunk.text)
+                    text = "".join(parts)
+                session.add_turn(question, text)
+            finally:
+                session.lock.release()
+            return {"status": "success", "response": text}
         except Exception as e:
-            return {"status": "error", "message": str(e)}
\ No newline at end of file
+            return {"status": "error", "message": str(e)}
+
+    def ask_question_stream(self, question, session=None, timeout=None, context=None):
+        """Ask a question and yield the answer text as the model generates it.
+
+        If the consumer stops early (e.g. the client disconnected and the
+        generator is closed), the upstream generation is cancelled and
+        the unfinished turn is not added to the session. Like
+        `ask_question`, it waits at most `timeout` seconds for another
+        question on the same session to finish, then raises TimeoutError.
+        """
+        session = session or self.default_session
+        if not (session.lock.acquire(timeout=timeout) if timeout else session.lock.acquire()):
+            raise TimeoutError("The conversation is busy with another question")
+        try:
+            chat = self.model.start_chat(history=session.history(context))
+            request_options = {"timeout": timeout} if timeout else None
+            response = chat.send_message(question, stream=True, request_options=request_options)
+            parts = []
+            completed = False
+            try:
+                for chunk in response:
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+                completed = True
+            finally:
+                if completed:
+                    session.add_turn(question, "".join(parts))
+                else:
+                    cancel_stream(response)
+        finally:
+            session.lock.release()
\ No newline at end of file
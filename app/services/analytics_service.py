@@ -0,0 +1,118 @@
+
+from math import comb
+from sqlalchemy import select
+from app.db import db
+from app.models import Card, DeckCard
+from app.services.cache_service import LRUCache, catalog_version, contents_digest
+from app.services.legality_service import normalize
+
+OPENING_HAND = 7
+# Card attributes a draw-odds target can be filtered on
+TARGET_FIELDS = ("card_id", "name", "card_type", "energy_type", "evolution_stage")
+
+# Analytics keyed by (deck contents digest, catalog version, target); identical lists share an entry
+analytics_cache = LRUCache(max_entries=4096)
+
+
+def weighted_counts(np, labels, quantities):
+    """{label: copies} from parallel label/quantity arrays, skipping missing labels"""
+    present = np.array([label is not None for label in labels], dtype=bool)
+    if not present.any():
+        return {}
+    values, inverse = np.unique(labels[present].astype(str), return_inverse=True)
+    totals = np.bincount(inverse, weights=quantities[present])
+    return {str(value): int(total) for value, total in zip(values, totals)}
+
+
+def draw_odds(matching, deck_size, draws):
+    """Hypergeometric chance of drawing exactly k of `matching` cards in `draws` cards, for each k"""
+    draws = min(draws, deck_size)
+    if not deck_size:
+        return {"draws": draws, "matching": matching, "at_least_one": 0.0, "distribution": [1.0]}
+    total = comb(deck_size, draws)
+    distribution = [
+        comb(matching, k) * comb(deck_size - matching, draws - k) / total
+        for k in range(min(matching, draws) + 1)
+    ]
+    return {
+        "draws": draws,
+        "matching": matching,
+        "at_least_one": round(1 - distribution[0], 6),
+        "distribution": [round(p, 6) for p in distribution],
+    }
+
+
+def compute_analytics(rows, target, draws):
+    """Statistics of a deck from its (quantity, card attribute...) rows, as array operations over copies"""
+    import numpy as np
+
+    columns = list(zip(*rows)) if rows else [()] * 9
+    quantity = np.array(columns[0], dtype=np.int64)
+    card_id, name, card_type, energy_type, stage, hp, retreat_cost, weakness = (
+        np.array(column, dtype=object) for column in columns[1:9]
+    )
+    pokemon = np.array([normalize(t).startswith("pokemon") for t in card_type], dtype=bool)
+    deck_size = int(quantity.sum())
+
+    # per-copy values, so means and medians weigh each card by its count
+    hp_copies = np.repeat(np.array([v if v is not None else np.nan for v in hp], dtype=float), quantity)
+    hp_copies = hp_copies[~np.isnan(hp_copies)]
+    retreat = np.array([v if v is not None else -1 for v in retreat_cost], dtype=np.int64)
+    has_retreat = retreat >= 0
+    retreat_histogram = np.bincount(retreat[has_retreat], weights=quantity[has_retreat]) if has_retreat.any() else []
+
+    pokemon_copies = int(quantity[pokemon].sum())
+    weakness_counts = weighted_counts(np, weakness[pokemon], quantity[pokemon])
+
+    if target:
+        matches = np.ones(len(quantity), dtype=bool)
+        for field, value in target.items():
+            column = {"card_id": card_id, "name": name, "card_type": card_type,
+                      "energy_type": energy_type, "evolution_stage": stage}[field]
+            matches &= np.array([normalize(v) == normalize(value) for v in column], dtype=bool)
+    else:
+        # default: chance of an opening hand with a Basic Pokémon
+        matches = pokemon & np.array([normalize(s) == "basic" for s in stage], dtype=bool)
+
+    return {
+        "card_count": deck_size,
+        "pokemon_count": pokemon_copies,
+        "energy_types": weighted_counts(np, energy_type, quantity),
+        "evolution_stages": weighted_counts(np, stage[pokemon], quantity[pokemon]),
+        "hp": {
+            "mean": round(float(hp_copies.mean()), 2) if hp_copies.size else None,
+            "median": float(np.median(hp_copies)) if hp_copies.size else None,
+        },
+        "retreat_cost": {str(cost): int(copies) for cost, copies in enumerate(retreat_histogram) if copies},
+        "weakness": {
+            weakness_type: {"copies": copies, "share": round(copies / pokemon_copies, 4)}
+            for weakness_type, copies in weakness_counts.items()
+        },
+        "draw_odds": {"target": target or {"card_type": "Pokémon", "evolution_stage": "Basic"},
+                      **draw_odds(int(quantity[matches].sum()), deck_size, draws)},
+    }
+
+
+def deck_analytics(deck_id, target=None, draws=OPENING_HAND):
+    """Analytics of a deck, cached on its contents and the catalog version.
+
+    `target` filters the cards whose draw odds are computed by any of
+    TARGET_FIELDS (default: Basic Pokémon); `draws` is the hand size.
+    A cache hit costs the contents and version lookups only.
+    """
+    target = {field: value for field, value in (target or {}).items() if value}
+    contents = db.session.execute(
+        select(DeckCard.card_id, DeckCard.quantity).where(DeckCard.deck_id == deck_id)
+    ).all()
+    key = (contents_digest(contents), catalog_version(), tuple(sorted(target.items())), draws)
+    result = analytics_cache.get(key)
+    if result is None:
+        rows = db.session.execute(
+            select(DeckCard.quantity, Card.id, Card.name, Card.card_type, Card.energy_type,
+                   Card.evolution_stage, Card.hp, Card.retreat_cost, Card.weakness)
+            .join(Card, Card.id == DeckCard.card_id)
+            .where(DeckCard.deck_id == deck_id)
+        ).all()
+        result = compute_analytics(rows, target, draws)
+        analytics_cache.set(key, result)
+    return result
@@ -0,0 +1,175 @@
+
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from app.services.search_service import tokenize
+
+FILLER_WORDS = {"a", "an", "the", "please", "hey", "hi", "hello", "so", "just", "um", "uh"}
+MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_question(question):
+    """Canonical form of a question: accents, case, punctuation and filler words removed"""
+    return " ".join(t for t in tokenize(question) if t not in FILLER_WORDS)
+
+
+def question_terms(normalized):
+    """Words of a normalized question, with plurals folded (collections -> collection)"""
+    return frozenset(t[:-1] if len(t) > 3 and t.endswith("s") else t for t in normalized.split())
+
+
+def shingles(text, size=3):
+    """Character n-grams of the normalized text, robust to small typos and rewording"""
+    text = f" {text} "
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class AnswerCache:
+    """Cache of chat answers keyed by normalized question within a scope.
+
+    Exact matches are a dict lookup on the hash of the normalized
+    question. Near matches use MinHash signatures over character
+    trigrams with LSH banding to find candidates, which are confirmed
+    by their exact Jaccard similarity and must use the same words
+    (up to order and plurals), so a negation or another card name
+    never matches. Entries expire after `ttl`
+    seconds and the least recently used are evicted beyond `max_entries`.
+    A scope (such as a hash of the context sent with the question)
+    keeps answers given with different background apart.
+    """
+
+    def __init__(self, max_entries=1000, ttl=86400, similarity=0.8, bands=8, rows=4, seed=42):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        self._hash_params = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(bands * rows)
+        ]
+        self._entries = OrderedDict()
+        self._buckets = defaultdict(set)
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_entries=config.get("CHAT_ANSWER_CACHE_SIZE", 1000),
+            ttl=config.get("CHAT_ANSWER_CACHE_TTL", 86400),
+            similarity=config.get("CHAT_ANSWER_SIMILARITY", 0.8),
+        )
+
+    @staticmethod
+    def _key(normalized, scope):
+        return hashlib.blake2b(f"{scope}\0{normalized}".encode(), digest_size=16).digest()
+
+    def _band_keys(self, grams, scope):
+        hashes = [int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), "little") for g in grams]
+        signature = [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self._hash_params]
+        return [
+            (scope, band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def get(self, question, scope=""):
+        """Return a cached answer for `question` asked within `scope`, or None"""
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        key = self._key(normalized, scope)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["created"] < self.ttl:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"]
+            if entry is not None:
+                self._remove(key)
+
+            if self.similarity > 0:
+                grams = shingles(normalized)
+                terms = question_terms(normalized)
+                best, best_score = None, self.similarity
+                candidates = set()
+                for band_key in self._band_keys(grams, scope):
+                    candidates |= self._buckets.get(band_key, set())
+                for candidate in candidates:
+                    other = self._entries[candidate]
+                    if now - other["created"] >= self.ttl or other["terms"] != terms:
+                        continue
+                    score = len(grams & other["grams"]) / len(grams | other["grams"])
+                    if score >= best_score:
+                        best, best_score = candidate, score
+                if best is not None:
+                    self._entries.move_to_end(best)
+                    self.similar_hits += 1
+                    return self._entries[best]["answer"]
+
+            self.misses += 1
+            return None
+
+    def set(self, question, answer, scope=""):
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+        key = self._key(normalized, scope)
+        grams = shingles(normalized)
+        band_keys = self._band_keys(grams, scope) if self.similarity > 0 else []
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {
+                "answer": answer,
+                "created": time.monotonic(),
+                "grams": grams,
+                "terms": question_terms(normalized),
+                "band_keys": band_keys,
+            }
+            for band_key in band_keys:
+                self._buckets[band_key].add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in entry["band_keys"]:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
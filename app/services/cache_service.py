@@ -0,0 +1,200 @@
+
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response, jsonify, request
+from sqlalchemy import select, update
+from app.db import db, dialect_insert
+from app.models import CacheVersion
+
+CATALOG_VERSION_KEY = "catalog"
+
+
+def get_version(key):
+    """Current version of a cache key (0 if it was never bumped)"""
+    version = db.session.scalar(select(CacheVersion.version).where(CacheVersion.key == key))
+    return version or 0
+
+
+def get_versions(*keys):
+    """Current versions of several keys in one query, in the order given"""
+    found = dict(db.session.execute(
+        select(CacheVersion.key, CacheVersion.version).where(CacheVersion.key.in_(keys))
+    ).all())
+    return tuple(found.get(key, 0) for key in keys)
+
+
+def bump_version(key):
+    """Increment a version counter inside the caller's transaction and return it.
+
+    The caller commits, so the bump becomes visible to every worker
+    together with the write it belongs to.
+    """
+    stmt = dialect_insert(CacheVersion.__table__)
+    if stmt is not None:
+        stmt = stmt.values(key=key, version=1).on_conflict_do_update(
+            index_elements=[CacheVersion.__table__.c.key],
+            set_={"version": CacheVersion.__table__.c.version + 1}
+        ).returning(CacheVersion.__table__.c.version)
+        return db.session.execute(stmt).scalar_one()
+
+    updated = db.session.execute(
+        update(CacheVersion).where(CacheVersion.key == key).values(version=CacheVersion.version + 1)
+    ).rowcount
+    if not updated:
+        db.session.add(CacheVersion(key=key, version=1))
+        db.session.flush()
+    return get_version(key)
+
+
+def catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+def user_version_key(user_id):
+    return f"user:{user_id}"
+
+
+def bump_user_version(user_id):
+    """Invalidate cached collection/deck responses of a user (call before commit)"""
+    return bump_version(user_version_key(user_id))
+
+
+def make_etag(prefix, version, args):
+    """ETag for a versioned resource and its (order independent) query arguments"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(args.items(multi=True)))
+    digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+    return f"{prefix}-{version}-{digest}"
+
+
+def contents_digest(rows):
+    """Stable digest of a deck's (card_id, quantity) rows"""
+    text = "\n".join(f"{card_id}\t{quantity}" for card_id, quantity in sorted(rows))
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping with hit/miss counters.
+
+    With `max_bytes`, entries are also evicted until the sum of
+    `sizeof(value)` fits, for caches whose values vary a lot in size.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._bytes -= self._sizes.pop(key, 0)
+            self._data[key] = value
+            if size:
+                self._sizes[key] = size
+                self._bytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                evicted, _ = self._data.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Serialized catalog pages, keyed by ETag (which embeds the catalog version)
+catalog_cache = LRUCache(max_entries=256)
+
+# Serialized per-user collection and deck responses, keyed the same way
+user_cache = LRUCache(max_entries=2048)
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def cached_response(cache, etag, render):
+    """Serve a JSON response through `cache` with ETag / If-None-Match.
+
+    `render()` builds the payload on a cache miss and may return a
+    (payload, headers) pair for extra response headers.
+    """
+    if etag in request.if_none_match:
+        return not_modified(etag)
+
+    cached = cache.get(etag)
+    if cached is None:
+        payload = render()
+        headers = {}
+        if isinstance(payload, tuple):
+            payload, headers = payload
+        cached = (jsonify(payload).get_data(), headers)
+        cache.set(etag, cached)
+
+    body, headers = cached
+    response = Response(body, mimetype="application/json", headers=headers)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def catalog_response(prefix, render):
+    """Cached catalog read; `render(version)` builds the payload.
+
+    The ETag embeds the catalog version, so any catalog write changes it.
+    """
+    version = catalog_version()
+    return cached_response(catalog_cache, make_etag(prefix, version, request.args), lambda: render(version))
+
+
+def user_response(prefix, user_id, render, extra_keys=(), versions=None):
+    """Cached per-user read, invalidated by the user's writes, by catalog writes and by bumps of `extra_keys`.
+
+    Callers that already looked up the (user, catalog, *extra_keys)
+    versions pass them as `versions` to skip a second lookup.
+    """
+    if versions is None:
+        versions = get_versions(user_version_key(user_id), CATALOG_VERSION_KEY, *extra_keys)
+    etag = make_etag(f"{prefix}-{user_id}", ".".join(map(str, versions)), request.args)
+    return cached_response(user_cache, etag, render)
@@ -0,0 +1,124 @@
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for budgeting"""
+    return len(text) // 4 + 1
+
+
+def clip(text, max_chars, keep="head"):
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "…" if keep == "head" else "…" + text[-max_chars:]
+
+
+class ChatSession:
+    """One conversation: recent turns verbatim plus a compact summary of older ones.
+
+    Once the recent turns exceed `token_budget`, the oldest are folded
+    into the summary, which is itself capped at `summary_budget` tokens,
+    so the history sent with each question stays bounded.
+    """
+
+    def __init__(self, token_budget=2000, summary_budget=400):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.turns = deque()
+        self.summary = ""
+        self.tokens = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def history(self, context=None):
+        """Conversation history in the Gemini start_chat format.
+
+        `context` (e.g. a digest of the user's collection) is sent first;
+        it is not stored in the session, so it never counts towards the budget.
+        """
+        history = []
+        if context:
+            history.append({"role": "user", "parts": [f"Background about me, use it when relevant:\n{context}"]})
+            history.append({"role": "model", "parts": ["Thanks, I'll take your collection and decks into account."]})
+        if self.summary:
+            history.append({"role": "user", "parts": [f"Summary of our earlier conversation: {self.summary}"]})
+            history.append({"role": "model", "parts": ["Got it, I'll keep that in mind."]})
+        for question, answer in self.turns:
+            history.append({"role": "user", "parts": [question]})
+            history.append({"role": "model", "parts": [answer]})
+        return history
+
+    def add_turn(self, question, answer):
+        max_chars = self.token_budget * 4
+        question, answer = clip(question, max_chars // 2), clip(answer, max_chars // 2)
+        self.turns.append((question, answer))
+        self.tokens += estimate_tokens(question) + estimate_tokens(answer)
+        while self.tokens > self.token_budget and len(self.turns) > 1:
+            self._compact_oldest()
+
+    def _compact_oldest(self):
+        question, answer = self.turns.popleft()
+        self.tokens -= estimate_tokens(question) + estimate_tokens(answer)
+        note = f"User asked: {clip(question, 200)} You answered: {clip(answer, 300)}"
+        # keep the most recent part of the summary when it outgrows its budget
+        self.summary = clip(f"{self.summary} {note}".strip(), self.summary_budget * 4, keep="tail")
+
+    def prompt_tokens(self):
+        return self.tokens + (estimate_tokens(self.summary) if self.summary else 0)
+
+    def reset(self):
+        self.turns.clear()
+        self.summary = ""
+        self.tokens = 0
+
+
+class ChatSessionManager:
+    """Bounded map of chat sessions with LRU and idle-TTL eviction"""
+
+    def __init__(self, max_sessions=1000, ttl=1800, token_budget=2000, summary_budget=400):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_sessions=config.get("CHAT_MAX_SESSIONS", 1000),
+            ttl=config.get("CHAT_SESSION_TTL", 1800),
+            token_budget=config.get("CHAT_HISTORY_TOKEN_BUDGET", 2000),
+            summary_budget=config.get("CHAT_SUMMARY_TOKEN_BUDGET", 400),
+        )
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, key):
+        """Return the session for `key`, creating it (and evicting others) if needed"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.pop(key, None)
+            if session is None:
+                session = ChatSession(self.token_budget, self.summary_budget)
+            session.last_used = now
+            self._sessions[key] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return session
+
+    def reset(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def _evict_expired(self, now):
+        # sessions are kept in least-recently-used order, so expired ones are at the front
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if now - session.last_used < self.ttl:
+                break
+            del self._sessions[key]
@@ -0,0 +1,119 @@
+
+from sqlalchemy import select, func
+from app.db import db
+from app.models import Card, Collection, Deck, DeckCard
+from app.services.cache_service import LRUCache, CATALOG_VERSION_KEY, get_versions, user_version_key
+from app.services.chat_sessions import estimate_tokens
+
+TOP_CARDS = 10
+MAX_DECKS = 5
+MAX_DECK_CARDS = 15
+BREAKDOWN_ENTRIES = 8
+TRUNCATED = "(truncated)"
+
+# Digests keyed by (user id, user version, catalog version, budget); any write makes a new key
+digest_cache = LRUCache(max_entries=1024)
+
+
+def format_counts(label, rows):
+    """One line like "By set: Base Set 40, Jungle 12 (+3 more)" from (name, count) rows"""
+    rows = [(name or "Unknown", int(count)) for name, count in rows]
+    shown = ", ".join(f"{name} {count}" for name, count in rows[:BREAKDOWN_ENTRIES])
+    more = f" (+{len(rows) - BREAKDOWN_ENTRIES} more)" if len(rows) > BREAKDOWN_ENTRIES else ""
+    return f"{label}: {shown}{more}"
+
+
+def collection_lines(user_id):
+    total_copies, unique_cards = db.session.execute(
+        select(func.coalesce(func.sum(Collection.quantity), 0), func.count(func.distinct(Collection.card_id)))
+        .where(Collection.user_id == user_id)
+    ).one()
+    if not total_copies:
+        return ["Collection: empty"]
+
+    lines = [f"Collection: {int(total_copies)} cards, {unique_cards} unique"]
+    for label, column in (("By set", Card.set_name), ("By energy type", Card.energy_type), ("By rarity", Card.rarity)):
+        rows = db.session.execute(
+            select(column, func.sum(Collection.quantity).label("copies"))
+            .join(Card, Card.id == Collection.card_id)
+            .where(Collection.user_id == user_id)
+            .group_by(column)
+            .order_by(func.sum(Collection.quantity).desc(), column)
+        ).all()
+        lines.append(format_counts(label, rows))
+
+    top = db.session.execute(
+        select(Card.name, Card.set_name, func.sum(Collection.quantity).label("copies"))
+        .join(Card, Card.id == Collection.card_id)
+        .where(Collection.user_id == user_id)
+        .group_by(Card.id, Card.name, Card.set_name)
+        .order_by(func.sum(Collection.quantity).desc(), Card.name)
+        .limit(TOP_CARDS)
+    ).all()
+    lines.append("Top cards: " + ", ".join(f"{name} ({set_name}) x{int(copies)}" for name, set_name, copies in top))
+    return lines
+
+
+def deck_lines(user_id):
+    decks = db.session.execute(
+        select(Deck.id, Deck.name)
+        .where(Deck.user_id == user_id)
+        .order_by(Deck.last_updated.desc(), Deck.id.desc())
+    ).all()
+    if not decks:
+        return ["Decks: none"]
+
+    shown = decks[:MAX_DECKS]
+    cards = {deck.id: [] for deck in shown}
+    for deck_id, name, quantity in db.session.execute(
+        select(DeckCard.deck_id, Card.name, func.sum(DeckCard.quantity))
+        .join(Card, Card.id == DeckCard.card_id)
+        .where(DeckCard.deck_id.in_(list(cards)))
+        .group_by(DeckCard.deck_id, Card.name)
+        .order_by(DeckCard.deck_id, func.sum(DeckCard.quantity).desc(), Card.name)
+    ):
+        cards[deck_id].append((name, int(quantity)))
+
+    lines = [f"Decks: {len(decks)}"]
+    for deck in shown:
+        entries = cards[deck.id]
+        total = sum(quantity for _, quantity in entries)
+        listed = ", ".join(f"{quantity}x {name}" for name, quantity in entries[:MAX_DECK_CARDS])
+        more = f", +{len(entries) - MAX_DECK_CARDS} more" if len(entries) > MAX_DECK_CARDS else ""
+        lines.append(f"- {deck.name} ({total} cards): {listed or 'empty'}{more}")
+    if len(decks) > MAX_DECKS:
+        lines.append(f"- +{len(decks) - MAX_DECKS} more decks")
+    return lines
+
+
+def build_user_digest(user_id, token_budget=600):
+    """Compact plain-text digest of a user's collection and decks.
+
+    Lines are added in priority order (totals and breakdowns first,
+    then deck lists) until `token_budget` is reached; room is kept for
+    the "(truncated)" marker so the whole digest stays within it.
+    """
+    candidates = collection_lines(user_id) + deck_lines(user_id)
+    lines = []
+    for i, line in enumerate(candidates):
+        marker = [TRUNCATED] if i < len(candidates) - 1 else []
+        if estimate_tokens("\n".join(lines + [line] + marker)) > token_budget:
+            if estimate_tokens("\n".join(lines + [TRUNCATED])) <= token_budget:
+                lines.append(TRUNCATED)
+            break
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def get_user_digest(user_id, token_budget=600):
+    """Cached digest for a user, rebuilt only after their collection, decks or the catalog change.
+
+    Costs one version lookup per call; the aggregate queries only run on a miss.
+    """
+    user_version, catalog = get_versions(user_version_key(user_id), CATALOG_VERSION_KEY)
+    key = (user_id, user_version, catalog, token_budget)
+    digest = digest_cache.get(key)
+    if digest is None:
+        digest = build_user_digest(user_id, token_budget)
+        digest_cache.set(key, digest)
+    return digest
@@ -0,0 +1,173 @@
+
+from datetime import datetime
+from sqlalchemy import select, func, insert, update, delete, literal
+from app.db import db, dialect_insert
+from app.models import Collection, DeckCard
+from app.services.cache_service import bump_user_version
+
+DECK_OPERATIONS = ("add", "remove", "set")
+
+
+class DeckEditError(Exception):
+    """Raised with a list of per-operation errors when a batch is rejected"""
+
+    def __init__(self, errors):
+        super().__init__("Deck edit rejected")
+        self.errors = errors
+
+
+def parse_operations(operations):
+    """Validate the shape of a batch and return [(index, op, card_id, quantity)]"""
+    if not isinstance(operations, list) or not operations:
+        raise DeckEditError([{"index": None, "error": "operations must be a non-empty list"}])
+
+    parsed, errors = [], []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append({"index": index, "error": "Each operation must be an object"})
+            continue
+        op = operation.get("op")
+        card_id = operation.get("card_id")
+        quantity = operation.get("quantity", 1 if op == "add" else None)
+        if op not in DECK_OPERATIONS:
+            errors.append({"index": index, "error": f"op must be one of: {', '.join(DECK_OPERATIONS)}"})
+        elif not card_id:
+            errors.append({"index": index, "error": "card_id is required"})
+        elif not isinstance(card_id, str):
+            errors.append({"index": index, "error": "card_id must be a string"})
+        elif op == "set" and quantity is None:
+            errors.append({"index": index, "card_id": card_id, "error": "quantity is required for set"})
+        elif quantity is not None and (not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0):
+            errors.append({"index": index, "card_id": card_id, "error": "quantity must be a non-negative integer"})
+        else:
+            parsed.append((index, op, card_id, quantity))
+    if errors:
+        raise DeckEditError(errors)
+    return parsed
+
+
+def apply_deck_operations(deck, user_id, operations):
+    """Apply add/remove/set operations to a deck atomically.
+
+    Owned quantities (summed over conditions) and current deck contents
+    are each loaded with one query for all cards in the batch; the
+    result is written with bulk statements in a single commit. Nothing
+    is written if any operation fails validation. Ownership only limits
+    cards whose quantity goes up, so copies can always be taken out of a
+    deck even after the collection shrank below it.
+    Returns the final {card_id: quantity} for the cards touched.
+    """
+    parsed = parse_operations(operations)
+    card_ids = {card_id for _, _, card_id, _ in parsed}
+
+    owned = dict(db.session.execute(
+        select(Collection.card_id, func.sum(Collection.quantity))
+        .where(Collection.user_id == user_id, Collection.card_id.in_(card_ids))
+        .group_by(Collection.card_id)
+    ).all())
+
+    rows = {}
+    for row in db.session.execute(
+        select(DeckCard.id, DeckCard.card_id, DeckCard.quantity)
+        .where(DeckCard.deck_id == deck.id, DeckCard.card_id.in_(card_ids))
+        .order_by(DeckCard.id)
+    ):
+        rows.setdefault(row.card_id, []).append(row)
+
+    current = {card_id: sum(r.quantity for r in rows.get(card_id, [])) for card_id in card_ids}
+    final = dict(current)
+    errors, last_index = [], {}
+    for index, op, card_id, quantity in parsed:
+        last_index[card_id] = index
+        if op == "add":
+            final[card_id] += quantity
+        elif op == "remove":
+            final[card_id] = 0 if quantity is None else final[card_id] - quantity
+            if final[card_id] < 0:
+                errors.append({"index": index, "card_id": card_id, "error": "Cannot remove more copies than are in the deck"})
+                final[card_id] = 0
+        else:
+            final[card_id] = quantity
+
+    for card_id, quantity in final.items():
+        if quantity > current[card_id] and quantity > owned.get(card_id, 0):
+            error = "Card not in your collection" if card_id not in owned else "Not enough cards in your collection"
+            errors.append({"index": last_index[card_id], "card_id": card_id, "error": error})
+    if errors:
+        raise DeckEditError(sorted(errors, key=lambda e: e["index"]))
+
+    updates, inserts, deletes = [], [], []
+    for card_id, quantity in final.items():
+        existing = rows.get(card_id, [])
+        if quantity == current[card_id] and len(existing) <= 1:
+            continue
+        if quantity == 0:
+            deletes.extend(r.id for r in existing)
+        elif existing:
+            updates.append({"id": existing[0].id, "quantity": quantity})
+            deletes.extend(r.id for r in existing[1:])
+        else:
+            inserts.append({"deck_id": deck.id, "card_id": card_id, "quantity": quantity})
+
+    try:
+        if updates:
+            db.session.execute(update(DeckCard), updates)
+        if inserts:
+            # a concurrent edit may have inserted the card since it was read; the final quantity wins
+            stmt = dialect_insert(DeckCard.__table__)
+            if stmt is not None:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[DeckCard.deck_id, DeckCard.card_id],
+                    set_={"quantity": stmt.excluded.quantity}
+                )
+            db.session.execute(stmt if stmt is not None else insert(DeckCard), inserts)
+        if deletes:
+            db.session.execute(delete(DeckCard).where(DeckCard.id.in_(deletes)))
+        deck.last_updated = datetime.utcnow()
+        bump_user_version(user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return final
+
+
+def add_card_to_deck(deck_id, user_id, card_id, quantity=1):
+    """Add copies of a card to a deck with one atomic upsert; the caller commits.
+
+    The row is only inserted or incremented while the deck total stays
+    within the copies the user owns (over all conditions), so concurrent
+    adds cannot overshoot. Otherwise nothing is written and DeckEditError
+    says why. Returns the card's new quantity in the deck.
+    """
+    owned = (
+        select(func.coalesce(func.sum(Collection.quantity), 0))
+        .where(Collection.user_id == user_id, Collection.card_id == card_id)
+        .scalar_subquery()
+    )
+    stmt = dialect_insert(DeckCard.__table__)
+    if stmt is not None:
+        table = DeckCard.__table__
+        source = select(literal(deck_id), literal(card_id), literal(quantity)).where(owned >= quantity)
+        stmt = stmt.from_select(["deck_id", "card_id", "quantity"], source).on_conflict_do_update(
+            index_elements=[table.c.deck_id, table.c.card_id],
+            set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+            where=table.c.quantity + stmt.excluded.quantity <= owned
+        ).returning(table.c.quantity)
+        total = db.session.scalar(stmt)
+    else:
+        existing = db.session.execute(
+            select(DeckCard.id, DeckCard.quantity).where(DeckCard.deck_id == deck_id, DeckCard.card_id == card_id)
+        ).first()
+        total = quantity + (existing.quantity if existing else 0)
+        if total > db.session.scalar(select(owned)):
+            total = None
+        elif existing:
+            db.session.execute(update(DeckCard).where(DeckCard.id == existing.id).values(quantity=total))
+        else:
+            db.session.execute(insert(DeckCard).values(deck_id=deck_id, card_id=card_id, quantity=quantity))
+
+    if total is None:
+        error = "Not enough cards in your collection" if db.session.scalar(select(owned)) else "Card not in your collection"
+        raise DeckEditError([{"card_id": card_id, "error": error}])
+    return total
@@ -0,0 +1,137 @@
+
+import threading
+from collections import defaultdict
+from sqlalchemy import select
+from app.db import db
+from app.models import Card
+
+FACET_DIMENSIONS = (
+    "set_name", "rarity", "energy_type", "card_type", "evolution_stage",
+    "weakness", "resistance", "hp", "retreat_cost"
+)
+RANGE_DIMENSIONS = ("hp", "retreat_cost")
+
+
+def iter_bits(bits):
+    """Yield the positions of the set bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class FacetIndex:
+    """Per-value bitmap index over the card catalog.
+
+    Every card gets a position (cards ordered by id) and every
+    (dimension, value) pair a Python int used as a bitset, so combining
+    filters is a handful of big-int AND/OR operations and facet counts
+    are popcounts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._card_ids = []
+        self._bitmaps = {}
+        self._all = 0
+        self.built = False
+        self.version = None
+
+    def load_from_db(self, version=None):
+        """(Re)build the bitmaps from the cards table at catalog `version`"""
+        columns = [Card.__table__.c[d] for d in FACET_DIMENSIONS]
+        rows = db.session.execute(
+            select(Card.id, *columns).order_by(Card.id).execution_options(yield_per=1000)
+        )
+        card_ids = []
+        positions = {d: defaultdict(list) for d in FACET_DIMENSIONS}
+        for position, row in enumerate(rows):
+            card_ids.append(row[0])
+            for dimension, value in zip(FACET_DIMENSIONS, row[1:]):
+                if value is not None:
+                    positions[dimension][value].append(position)
+
+        bitmaps = {}
+        for dimension, values in positions.items():
+            bitmaps[dimension] = {value: self._to_bitmap(p) for value, p in values.items()}
+
+        with self._lock:
+            self._card_ids = card_ids
+            self._bitmaps = bitmaps
+            self._all = (1 << len(card_ids)) - 1
+            self.built = True
+            self.version = version
+
+    def ensure_built(self, version=None):
+        """Build the index, or rebuild it if another worker changed the catalog"""
+        if not self.built or (version is not None and version != self.version):
+            self.load_from_db(version)
+
+    def invalidate(self):
+        """Mark the index stale; it is rebuilt on next use"""
+        self.built = False
+
+    @staticmethod
+    def _to_bitmap(positions):
+        # Build via a bytearray; OR-ing 1 << p one at a time is quadratic
+        if not positions:
+            return 0
+        buf = bytearray(positions[-1] // 8 + 1)
+        for p in positions:
+            buf[p >> 3] |= 1 << (p & 7)
+        return int.from_bytes(buf, "little")
+
+    def _dimension_mask(self, dimension, criterion):
+        bitmaps = self._bitmaps.get(dimension, {})
+        if dimension in RANGE_DIMENSIONS and isinstance(criterion, tuple):
+            low, high = criterion
+            mask = 0
+            for value, bitmap in bitmaps.items():
+                if (low is None or value >= low) and (high is None or value <= high):
+                    mask |= bitmap
+            return mask
+        mask = 0
+        for value in criterion:
+            mask |= bitmaps.get(value, 0)
+        return mask
+
+    def query(self, filters, limit=50, offset=0):
+        """Apply `filters` and return (card_ids page, total, facet counts).
+
+        `filters` maps a dimension to a list of accepted values (OR'ed),
+        or for hp/retreat_cost optionally to a (min, max) tuple.
+        Facet counts for a dimension ignore that dimension's own filter,
+        so clients can show how many cards each alternative would give.
+        """
+        with self._lock:
+            masks = {d: self._dimension_mask(d, c) for d, c in filters.items()}
+
+            matched = self._all
+            for mask in masks.values():
+                matched &= mask
+
+            facets = {}
+            for dimension in FACET_DIMENSIONS:
+                base = self._all
+                for other, mask in masks.items():
+                    if other != dimension:
+                        base &= mask
+                counts = {}
+                for value, bitmap in self._bitmaps.get(dimension, {}).items():
+                    count = (base & bitmap).bit_count()
+                    if count:
+                        counts[str(value)] = count
+                facets[dimension] = counts
+
+            page = []
+            for i, position in enumerate(iter_bits(matched)):
+                if i >= offset + limit:
+                    break
+                if i >= offset:
+                    page.append(self._card_ids[position])
+
+            return page, matched.bit_count(), facets
+
+
+# Shared per-worker facet index, built lazily on the first filter request
+facet_index = FacetIndex()
@@ -0,0 +1,72 @@
+
+import time
+from collections import deque
+
+
+class FakeStream:
+    """Chunk iterator standing in for the streaming RPC; records cancellation"""
+
+    def __init__(self, chunks, delay):
+        self._chunks = iter(chunks)
+        self.delay = delay
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.cancelled:
+            raise StopIteration
+        if self.delay:
+            time.sleep(self.delay)
+        return FakeResponse(next(self._chunks))
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeResponse:
+    def __init__(self, text, stream=None):
+        self.text = text
+        self._iterator = stream
+
+    def __iter__(self):
+        return iter(self._iterator) if self._iterator is not None else iter([self])
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False, **kwargs):
+        self.model.calls.append({"history": self.history, "content": content})
+        text = self.model.reply(content)
+        if not stream:
+            return FakeResponse(text)
+        words = text.split(" ")
+        chunks = [w + " " for w in words[:-1]] + [words[-1]]
+        response = FakeResponse(text, FakeStream(chunks, self.model.chunk_delay))
+        self.model.streams.append(response._iterator)
+        return response
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel used in tests and local development.
+
+    Answers are canned and derived from the question; streamed answers
+    are emitted word by word, optionally with a delay per chunk. Only
+    the last `keep` calls and streams are recorded for inspection, so a
+    long-running development server or benchmark does not grow.
+    """
+
+    def __init__(self, chunk_delay=0.0, keep=100):
+        self.chunk_delay = chunk_delay
+        self.calls = deque(maxlen=keep)
+        self.streams = deque(maxlen=keep)
+
+    def reply(self, content):
+        return f"Ah, marvelous! You asked: {content} Remember, gotta catch 'em all!"
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
\ No newline at end of file
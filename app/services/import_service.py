@@ -0,0 +1,223 @@
+
+import csv
+import json
+from collections import defaultdict
+from sqlalchemy import select, insert, update, tuple_
+from app.db import db, dialect_insert
+from app.models import Card, Collection
+from app.models.collection import VALID_CONDITIONS
+from app.services.cache_service import bump_user_version
+from app.services.set_progress_service import lock_user_progress, card_sets, added_progress, apply_set_progress
+
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    def __init__(self):
+        self.lines = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self):
+        return {
+            "lines": self.lines,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+def read_records(stream, fmt):
+    """Yield (line number, dict) pairs from a CSV or NDJSON text stream.
+
+    Malformed lines are yielded as (line number, error message string).
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        try:
+            fieldnames = reader.fieldnames
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV header: {e}")
+        if not fieldnames or "card_id" not in fieldnames:
+            raise ValueError("CSV header must include a card_id column")
+        while True:
+            start = reader.line_num + 1
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # the reader starts afresh on the next line
+                yield start, f"Invalid CSV: {e}"
+                continue
+            yield reader.line_num, record
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, "Each line must be a JSON object"
+                continue
+            yield line_number, record
+
+
+def normalize_record(record):
+    """Validate one record and return (card_id, condition, quantity).
+
+    Like /collection/create, quantity must be a whole number of at least
+    1 (an int, or digits in CSV); 1.7 or true are errors, not rounded.
+    """
+    card_id = record.get("card_id")
+    if card_id is not None and not isinstance(card_id, str):
+        raise ValueError("card_id must be a string")
+    card_id = (card_id or "").strip()
+    if not card_id:
+        raise ValueError("card_id is required")
+    quantity = record.get("quantity")
+    if quantity is None or quantity == "":
+        quantity = 1
+    elif isinstance(quantity, str) and quantity.strip().isascii() and quantity.strip().isdigit():
+        quantity = int(quantity)
+    elif not isinstance(quantity, int) or isinstance(quantity, bool):
+        raise ValueError("Quantity must be a whole number")
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1")
+    condition = record.get("condition") or record.get("card_condition") or "Near Mint"
+    if condition not in VALID_CONDITIONS:
+        raise ValueError(f'Invalid card condition. Must be one of: {", ".join(VALID_CONDITIONS)}')
+    return card_id, condition, quantity
+
+
+def import_collection(user_id, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """Merge a CSV/NDJSON stream into a user's collection.
+
+    Records are validated and upserted in batches: each batch costs one
+    query to check card ids, one to find which rows already exist (for
+    the report) and one upsert, committed as its own transaction. Rows
+    are merged by (user, card, condition) by adding quantities.
+    """
+    report = ImportReport()
+    batch = []
+    for line_number, record in read_records(stream, fmt):
+        report.lines += 1
+        if isinstance(record, str):
+            report.error(line_number, record)
+            continue
+        try:
+            batch.append((line_number,) + normalize_record(record))
+        except (TypeError, ValueError) as e:
+            report.error(line_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _import_batch(user_id, batch, report)
+            batch = []
+    if batch:
+        _import_batch(user_id, batch, report)
+    return report
+
+
+def add_to_collection(user_id, quantities):
+    """Add {(card_id, condition): quantity} to a user's collection; returns the row ids in the order given.
+
+    Uses one atomic INSERT .. ON CONFLICT DO UPDATE, so concurrent adds of
+    the same card and condition are summed rather than racing, and
+    updates the user's set progress summary under the user's lock. The
+    caller commits.
+    """
+    copies = defaultdict(int)
+    for (card_id, _), quantity in quantities.items():
+        copies[card_id] += quantity
+    lock_user_progress(user_id)
+    progress = added_progress(card_sets(user_id, list(copies)), copies)
+
+    rows = [
+        {"user_id": user_id, "card_id": card_id, "card_condition": condition, "quantity": quantity}
+        for (card_id, condition), quantity in quantities.items()
+    ]
+    stmt = dialect_insert(Collection.__table__)
+    if stmt is not None:
+        table = Collection.__table__
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.card_id, table.c.card_condition],
+            set_={"quantity": table.c.quantity + stmt.excluded.quantity}
+        ).returning(table.c.id, sort_by_parameter_order=True)
+        ids = list(db.session.scalars(stmt, rows))
+        apply_set_progress(user_id, progress)
+        return ids
+
+    keys = tuple_(Collection.card_id, Collection.card_condition).in_(list(quantities))
+    existing = {
+        (row.card_id, row.card_condition): row
+        for row in db.session.execute(
+            select(Collection.id, Collection.card_id, Collection.card_condition, Collection.quantity)
+            .where(Collection.user_id == user_id, keys)
+        )
+    }
+    updates = [
+        {"id": existing[key].id, "quantity": existing[key].quantity + quantity}
+        for key, quantity in quantities.items() if key in existing
+    ]
+    if updates:
+        db.session.execute(update(Collection), updates)
+    inserts = [row for row in rows if (row["card_id"], row["card_condition"]) not in existing]
+    if inserts:
+        db.session.execute(insert(Collection), inserts)
+    apply_set_progress(user_id, progress)
+    ids = {
+        (row.card_id, row.card_condition): row.id
+        for row in db.session.execute(
+            select(Collection.id, Collection.card_id, Collection.card_condition)
+            .where(Collection.user_id == user_id, keys)
+        )
+    }
+    return [ids[key] for key in quantities]
+
+
+def _import_batch(user_id, batch, report):
+    card_ids = {card_id for _, card_id, _, _ in batch}
+    known = set(db.session.scalars(select(Card.id).where(Card.id.in_(card_ids))))
+
+    totals = {}
+    for line_number, card_id, condition, quantity in batch:
+        if card_id not in known:
+            report.error(line_number, f"Card with id '{card_id}' not found.")
+            continue
+        key = (card_id, condition)
+        totals[key] = totals.get(key, 0) + quantity
+    if not totals:
+        return
+
+    existing = set(db.session.execute(
+        select(Collection.card_id, Collection.card_condition)
+        .where(Collection.user_id == user_id, Collection.card_id.in_(card_ids))
+    ).tuples())
+    updated = sum(1 for key in totals if key in existing)
+
+    try:
+        add_to_collection(user_id, totals)
+        bump_user_version(user_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for line_number, card_id, _, _ in batch:
+            if card_id in known:
+                report.error(line_number, f"Batch failed: {e}")
+        return
+    report.updated += updated
+    report.created += len(totals) - updated
@@ -0,0 +1,262 @@
+
+import csv
+import json
+import os
+import re
+import time
+from sqlalchemy import select, insert, update
+from app.db import db, dialect_insert
+from app.models import Card
+from app.services.cache_service import bump_catalog_version
+from app.services.set_progress_service import owners_of_moved_cards, rebuild_set_progress
+
+INGEST_CHUNK_SIZE = 2000
+READ_SIZE = 1 << 16
+MAX_RECORD_SIZE = 1 << 20
+STRUCTURE_RE = re.compile(r'["\[\]{},]')
+STRING_END_RE = re.compile(r'["\\]')
+
+CARD_COLUMNS = (
+    "id", "name", "set_name", "card_type", "rarity", "energy_type", "hp",
+    "attack_names", "description", "evolution_stage", "weakness",
+    "resistance", "retreat_cost"
+)
+INTEGER_COLUMNS = ("hp", "retreat_cost")
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return "json"
+
+
+def element_end(buf, pos):
+    """Index of the top-level "," or "]" after the array element starting at `pos`, or None if not in `buf` yet.
+
+    Only tracks strings and nesting, so it also finds the end of an
+    element that is not valid JSON.
+    """
+    depth = 0
+    while True:
+        match = STRUCTURE_RE.search(buf, pos)
+        if match is None:
+            return None
+        char, pos = match.group(), match.end()
+        if char == '"':
+            while True:
+                match = STRING_END_RE.search(buf, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                if match.group() == '"':
+                    break
+                # skip the escaped character
+                pos += 1
+        elif char in "[{":
+            depth += 1
+        elif depth == 0 and char in ",]":
+            return match.start()
+        elif char in "]}":
+            depth = max(depth - 1, 0)
+
+
+def iter_json_array(f):
+    """Yield the objects of a top-level JSON array without loading the whole file.
+
+    An element that is not valid JSON is yielded as its raw text, so it
+    fails alone in `normalize_card` like a bad NDJSON line. An element
+    longer than MAX_RECORD_SIZE characters aborts the load instead of
+    growing the buffer without bound.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(READ_SIZE).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("JSON dumps must contain a top-level array of cards")
+    pos = 1
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            obj, stop = decoder.raw_decode(buf, pos)
+        except ValueError:
+            stop = None
+        if stop is not None:
+            while stop < len(buf) and buf[stop] in " \t\r\n":
+                stop += 1
+            if stop < len(buf) and buf[stop] in ",]":
+                yield obj
+                pos = stop
+                continue
+        # either the element is cut off by the end of the buffer or it is malformed
+        end = element_end(buf, pos)
+        if end is None:
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            if len(buf) - pos > MAX_RECORD_SIZE:
+                raise ValueError(f"A JSON record is longer than {MAX_RECORD_SIZE} characters")
+            # only the unread tail is carried over when refilling
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield buf[pos:end]
+        pos = end
+
+
+def iter_records(path, fmt=None):
+    """Stream raw card records from a JSON array, NDJSON or CSV file.
+
+    NDJSON lines and malformed JSON array elements are yielded unparsed,
+    so a bad record fails only itself in `normalize_card`.
+    """
+    fmt = fmt or detect_format(path)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "ndjson":
+            for line in f:
+                if line.strip():
+                    yield line
+        else:
+            yield from iter_json_array(f)
+
+
+def normalize_card(record):
+    """Map a raw record (dict, or an NDJSON line) onto Card columns"""
+    if isinstance(record, str):
+        record = json.loads(record)
+    if not isinstance(record, dict):
+        raise ValueError("Each card must be a JSON object")
+    card = {}
+    for column in CARD_COLUMNS:
+        value = record.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+            if value in ("", "None"):
+                value = None
+        card[column] = value
+
+    if card["attack_names"] is None and record.get("attacks"):
+        card["attack_names"] = [a["name"] for a in record["attacks"] if isinstance(a, dict) and a.get("name")]
+    elif isinstance(card["attack_names"], str):
+        # CSV dumps list attacks separated by "|"
+        card["attack_names"] = [a.strip() for a in card["attack_names"].split("|") if a.strip()]
+    for column in INTEGER_COLUMNS:
+        if card[column] is not None:
+            card[column] = int(card[column])
+
+    if not card["id"] or not card["name"] or not card["set_name"]:
+        raise ValueError("id, name and set_name are required")
+    card["id"] = str(card["id"])
+    return card
+
+
+def upsert_cards(rows):
+    """Insert or update a chunk of card dicts, keyed on id"""
+    stmt = dialect_insert(Card.__table__)
+    if stmt is not None:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Card.__table__.c.id],
+            set_={c: stmt.excluded[c] for c in CARD_COLUMNS if c != "id"}
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    existing = set(db.session.scalars(select(Card.id).where(Card.id.in_([r["id"] for r in rows]))))
+    updates = [r for r in rows if r["id"] in existing]
+    inserts = [r for r in rows if r["id"] not in existing]
+    if updates:
+        db.session.execute(update(Card), updates)
+    if inserts:
+        db.session.execute(insert(Card), inserts)
+
+
+class Checkpoint:
+    """Records how many records of a source file have been committed"""
+
+    def __init__(self, path, source):
+        self.path = path
+        stat = os.stat(source)
+        self.key = {"source": os.path.abspath(source), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            state = json.load(f)
+        if state.get("key") != self.key:
+            return 0
+        return state.get("records", 0)
+
+    def save(self, records):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"key": self.key, "records": records}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def ingest_cards(path, fmt=None, chunk_size=INGEST_CHUNK_SIZE, checkpoint_path=None, log=print):
+    """Stream a card dump into the cards table in chunked upserts.
+
+    Re-running is safe (rows are upserted by id). With a checkpoint file,
+    an interrupted run resumes after the last committed chunk.
+    Returns a stats dict.
+    """
+    checkpoint = Checkpoint(checkpoint_path, path)
+    skip = checkpoint.load()
+    if skip:
+        log(f"Resuming after {skip} records")
+
+    stats = {"records": skip, "upserted": 0, "failed": 0, "errors": []}
+    started = time.perf_counter()
+    chunk = {}
+
+    def flush():
+        # cards moving to another set change their owners' set progress
+        owners = owners_of_moved_cards({card_id: card["set_name"] for card_id, card in chunk.items()})
+        upsert_cards(list(chunk.values()))
+        for user_id in owners:
+            rebuild_set_progress(user_id)
+        bump_catalog_version()
+        db.session.commit()
+        stats["upserted"] += len(chunk)
+        checkpoint.save(stats["records"])
+        elapsed = time.perf_counter() - started
+        log(f"{stats['records']} records read, {stats['upserted']} upserted "
+            f"({stats['upserted'] / elapsed:,.0f} cards/s)")
+        chunk.clear()
+
+    for number, record in enumerate(iter_records(path, fmt), start=1):
+        if number <= skip:
+            continue
+        stats["records"] = number
+        try:
+            card = normalize_card(record)
+        except (KeyError, TypeError, ValueError) as e:
+            stats["failed"] += 1
+            if len(stats["errors"]) < 100:
+                stats["errors"].append({"record": number, "error": str(e)})
+            continue
+        # later duplicates in a chunk win, matching what a second upsert would do
+        chunk[card["id"]] = card
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    checkpoint.clear()
+    return stats
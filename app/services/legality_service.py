@@ -0,0 +1,112 @@
+
+import unicodedata
+from collections import defaultdict
+from sqlalchemy import select, func
+from app.db import db
+from app.models import Card, Deck, DeckCard
+from app.services.cache_service import LRUCache, catalog_version, contents_digest
+
+DECK_SIZE = 60
+MAX_COPIES = 4
+BASIC_ENERGY_NAMES = {
+    "Grass Energy", "Fire Energy", "Water Energy", "Lightning Energy", "Psychic Energy",
+    "Fighting Energy", "Darkness Energy", "Metal Energy", "Fairy Energy",
+}
+
+# Results keyed by (deck contents digest, catalog version); identical lists share an entry
+legality_cache = LRUCache(max_entries=4096)
+
+
+def normalize(value):
+    """Lowercase without accents, so "Pokémon" and "Pokemon" compare equal"""
+    value = unicodedata.normalize("NFKD", value or "")
+    return "".join(c for c in value if not unicodedata.combining(c)).strip().lower()
+
+
+def is_basic_energy(name, card_type, stage):
+    if "energy" not in normalize(card_type):
+        return False
+    return normalize(stage) == "basic" or name in BASIC_ENERGY_NAMES or normalize(name).startswith("basic ")
+
+
+def is_basic_pokemon(card_type, stage):
+    return normalize(card_type).startswith("pokemon") and normalize(stage) == "basic"
+
+
+def check_deck(groups):
+    """Legality of one deck from its (name, card_type, evolution_stage, copies) groups"""
+    violations = []
+    total = sum(copies for _, _, _, copies in groups)
+    if total != DECK_SIZE:
+        violations.append({
+            "rule": "deck_size", "expected": DECK_SIZE, "actual": total,
+            "message": f"Deck must have exactly {DECK_SIZE} cards, has {total}"
+        })
+
+    # the copy limit applies by name across printings
+    by_name = defaultdict(int)
+    for name, card_type, stage, copies in groups:
+        if not is_basic_energy(name, card_type, stage):
+            by_name[name] += copies
+    for name, copies in sorted(by_name.items()):
+        if copies > MAX_COPIES:
+            violations.append({
+                "rule": "max_copies", "card_name": name, "limit": MAX_COPIES, "actual": copies,
+                "message": f"At most {MAX_COPIES} copies of {name} allowed, has {copies}"
+            })
+
+    if not any(is_basic_pokemon(card_type, stage) for _, card_type, stage, _ in groups):
+        violations.append({"rule": "basic_pokemon", "message": "Deck must contain at least one Basic Pokémon"})
+
+    return {"legal": not violations, "card_count": total, "violations": violations}
+
+
+def validate_decks(user_id, deck_ids=None, catalog=None):
+    """Legality of the user's decks (all of them, or those in `deck_ids`) as {deck_id: result}.
+
+    The decks and their (card_id, quantity) rows come from one query.
+    Results are cached on a digest of those rows and the catalog
+    version, so only decks whose contents changed are checked again,
+    together from one grouped query over deck_cards joined with cards.
+    Ids the user does not own are left out of the result. `catalog` is
+    the catalog version if the caller has already looked it up.
+    """
+    query = (
+        select(Deck.id, DeckCard.card_id, DeckCard.quantity)
+        .outerjoin(DeckCard, DeckCard.deck_id == Deck.id)
+        .where(Deck.user_id == user_id)
+        .order_by(Deck.id)
+    )
+    if deck_ids is not None:
+        query = query.where(Deck.id.in_(deck_ids))
+    contents = {}
+    for deck_id, card_id, quantity in db.session.execute(query):
+        rows = contents.setdefault(deck_id, [])
+        if card_id is not None:
+            rows.append((card_id, quantity))
+
+    if catalog is None:
+        catalog = catalog_version()
+    keys = {deck_id: (contents_digest(rows), catalog) for deck_id, rows in contents.items()}
+    results, missing = {}, []
+    for deck_id, key in keys.items():
+        result = legality_cache.get(key)
+        if result is None:
+            missing.append(deck_id)
+        else:
+            results[deck_id] = result
+
+    if missing:
+        groups = {deck_id: [] for deck_id in missing}
+        for deck_id, name, card_type, stage, copies in db.session.execute(
+            select(DeckCard.deck_id, Card.name, Card.card_type, Card.evolution_stage, func.sum(DeckCard.quantity))
+            .join(Card, Card.id == DeckCard.card_id)
+            .where(DeckCard.deck_id.in_(missing))
+            .group_by(DeckCard.deck_id, Card.name, Card.card_type, Card.evolution_stage)
+        ):
+            groups[deck_id].append((name, card_type, stage, int(copies)))
+        for deck_id in missing:
+            results[deck_id] = check_deck(groups[deck_id])
+            legality_cache.set(keys[deck_id], results[deck_id])
+
+    return {deck_id: results[deck_id] for deck_id in contents}
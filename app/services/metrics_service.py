@@ -0,0 +1,206 @@
+
+import bisect
+import cProfile
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from flask import g, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# String and number literals, replaced before a statement is logged
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+_local = threading.local()
+
+
+def redact_sql(statement):
+    """Statement text with literals blanked out and whitespace collapsed"""
+    return " ".join(SQL_LITERALS.sub("?", statement).split())
+
+
+class RequestStats:
+    __slots__ = ("start", "queries", "query_time", "profiler")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.profiler = None
+
+
+class EndpointMetrics:
+    __slots__ = ("count", "seconds", "buckets", "queries", "query_seconds", "response_bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    """Per-endpoint request metrics of one worker.
+
+    Requests are keyed by (method, URL rule, status class), so the number
+    of series stays bounded whatever URLs are requested.
+    """
+
+    def __init__(self, slow_query_seconds=0.2):
+        self.slow_query_seconds = slow_query_seconds
+        self.endpoints = {}
+        self.slow_queries = 0
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds, queries, query_seconds, response_bytes):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            metrics = self.endpoints.get(key)
+            if metrics is None:
+                metrics = self.endpoints[key] = EndpointMetrics()
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.buckets[bucket] += 1
+            metrics.queries += queries
+            metrics.query_seconds += query_seconds
+            metrics.response_bytes += response_bytes
+
+    def record_slow_query(self, statement, seconds):
+        with self._lock:
+            self.slow_queries += 1
+        logger.warning("Slow query (%.1f ms): %s", seconds * 1000, redact_sql(statement))
+
+    def render(self, extra=()):
+        """Prometheus text exposition of the collected metrics plus `extra` (name, help, type, samples) families"""
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            slow_queries = self.slow_queries
+            snapshot = [(key, m.count, m.seconds, list(m.buckets), m.queries, m.query_seconds, m.response_bytes)
+                        for key, m in endpoints]
+
+        lines = [
+            "# HELP http_request_duration_seconds Time to produce the response, by endpoint",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, rule, status), count, seconds, buckets, _, _, _ in snapshot:
+            labels = f'method="{method}",endpoint="{rule}",status="{status}"'
+            cumulative = 0
+            for bound, observed in zip(LATENCY_BUCKETS, buckets):
+                cumulative += observed
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {seconds:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+        for name, help_text, index, fmt in (
+            ("http_request_queries_total", "SQL statements executed while serving requests", 4, "{}"),
+            ("http_request_query_seconds_total", "Time spent in SQL statements while serving requests", 5, "{:.6f}"),
+            ("http_response_size_bytes_total", "Bytes sent in response bodies (streamed bodies excluded)", 6, "{}"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for row in snapshot:
+                method, rule, status = row[0]
+                lines.append(f'{name}{{method="{method}",endpoint="{rule}",status="{status}"}} {fmt.format(row[index])}')
+
+        lines.append("# HELP sql_slow_queries_total SQL statements slower than the slow query threshold")
+        lines.append("# TYPE sql_slow_queries_total counter")
+        lines.append(f"sql_slow_queries_total {slow_queries}")
+
+        for name, help_text, metric_type, samples in extra:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _handle_error(context):
+    # a failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+def _after_cursor_execute(registry):
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        stats = getattr(_local, "stats", None)
+        if stats is not None:
+            stats.queries += 1
+            stats.query_time += seconds
+        if seconds >= registry.slow_query_seconds:
+            registry.record_slow_query(statement, seconds)
+    return listener
+
+
+def init_metrics(app, engine):
+    """Instrument requests and SQL of `app`; returns the registry served on /metrics.
+
+    create_app only calls this when METRICS_ENABLED is set, so disabled
+    metrics add no hooks at all. With METRICS_PROFILING, requests
+    sending `X-Profile: 1` are run under cProfile and the stats are saved
+    to METRICS_PROFILE_DIR, named by the returned X-Profile-Id header.
+    """
+    registry = MetricsRegistry(app.config.get("SLOW_QUERY_MS", 200) / 1000)
+    app.extensions["metrics"] = registry
+    profiling = app.config.get("METRICS_PROFILING", False)
+    profile_dir = app.config.get("METRICS_PROFILE_DIR") or "profiles"
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute(registry))
+    event.listen(engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def start_request_metrics():
+        stats = _local.stats = g._request_stats = RequestStats()
+        if profiling and request.headers.get("X-Profile") == "1":
+            stats.profiler = cProfile.Profile()
+            stats.profiler.enable()
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = g.pop("_request_stats", None)
+        if stats is None:
+            return response
+        _local.stats = None
+        seconds = time.perf_counter() - stats.start
+
+        if stats.profiler is not None:
+            stats.profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            profile_id = uuid.uuid4().hex
+            stats.profiler.dump_stats(os.path.join(profile_dir, f"{profile_id}.prof"))
+            response.headers["X-Profile-Id"] = profile_id
+
+        rule = request.url_rule.rule if request.url_rule else "unmatched"
+        size = 0 if response.is_streamed else (response.content_length or 0)
+        registry.observe((request.method, rule, f"{response.status_code // 100}xx"),
+                         seconds, stats.queries, stats.query_time, size)
+        response.headers["Server-Timing"] = (
+            f'app;dur={seconds * 1000:.1f}, db;dur={stats.query_time * 1000:.1f};desc="{stats.queries} queries"'
+        )
+        return response
+
+    @app.teardown_request
+    def clear_request_metrics(exc):
+        # after_request is skipped when a request fails with an unhandled error
+        stats = g.pop("_request_stats", None)
+        if stats is not None and stats.profiler is not None:
+            stats.profiler.disable()
+        _local.stats = None
+
+    return registry
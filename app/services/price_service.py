@@ -0,0 +1,241 @@
+
+import re
+from datetime import date, timedelta
+from sqlalchemy import select, func, and_, insert, update
+from app.db import db, dialect_insert
+from app.models import Card, Collection, PriceKey, PriceSnapshot
+from app.models.collection import VALID_CONDITIONS
+from app.services.cache_service import LRUCache, bump_version
+from app.services.import_service import read_records, MAX_REPORTED_ERRORS
+
+PRICES_VERSION_KEY = "prices"
+# Cards whose last price is older than this (before the requested dates) count as unpriced
+PRICE_LOOKBACK_DAYS = 30
+LOOKUP_CHUNK_SIZE = 5000
+FILE_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+# Decoded snapshots keyed by (price_date, revision); re-ingesting a day makes a new key.
+# A snapshot holds the arrays for the whole catalog, so the cache is bounded by their bytes.
+SNAPSHOT_CACHE_BYTES = 64 * 1024 * 1024
+snapshot_cache = LRUCache(
+    max_entries=512, max_bytes=SNAPSHOT_CACHE_BYTES, sizeof=lambda arrays: sum(a.nbytes for a in arrays)
+)
+
+
+def price_date_from_path(path):
+    """Snapshot date from a file name like prices-2025-03-01.csv"""
+    match = FILE_DATE.search(path.rsplit("/", 1)[-1])
+    if not match:
+        raise ValueError(f"No YYYY-MM-DD date in the file name {path!r}; pass the date explicitly")
+    return date.fromisoformat(match.group(1))
+
+
+def read_prices(stream, errors):
+    """{(card_id, condition): price} from a CSV with card_id, condition (default Near Mint) and price columns.
+
+    Bad lines are appended to `errors`; a later line for the same card and condition wins.
+    """
+    prices = {}
+    for line_number, record in read_records(stream, "csv"):
+        try:
+            card_id = str(record.get("card_id") or "").strip()
+            condition = record.get("condition") or record.get("card_condition") or "Near Mint"
+            if not card_id:
+                raise ValueError("card_id is required")
+            if condition not in VALID_CONDITIONS:
+                raise ValueError(f'Invalid card condition. Must be one of: {", ".join(VALID_CONDITIONS)}')
+            try:
+                price = float(record.get("price") or "nan")
+            except ValueError:
+                price = float("nan")
+            if not price >= 0:
+                raise ValueError("price must be a non-negative number")
+        except ValueError as e:
+            errors.append({"line": line_number, "error": str(e)})
+            continue
+        prices[(card_id, condition)] = price
+    return prices
+
+
+def ensure_price_keys(keys):
+    """{(card_id, condition): PriceKey id}, creating ids for keys seen for the first time"""
+    card_ids = sorted({card_id for card_id, _ in keys})
+    ids = {}
+
+    def load(chunk):
+        for row in db.session.execute(
+            select(PriceKey.id, PriceKey.card_id, PriceKey.card_condition).where(PriceKey.card_id.in_(chunk))
+        ):
+            ids[(row.card_id, row.card_condition)] = row.id
+
+    for start in range(0, len(card_ids), LOOKUP_CHUNK_SIZE):
+        load(card_ids[start:start + LOOKUP_CHUNK_SIZE])
+    new = [{"card_id": card_id, "card_condition": condition} for card_id, condition in keys if (card_id, condition) not in ids]
+    if new:
+        stmt = dialect_insert(PriceKey.__table__)
+        # another ingest may add the same keys concurrently; the reload picks up whichever id won
+        db.session.execute(stmt.on_conflict_do_nothing() if stmt is not None else insert(PriceKey), new)
+        new_card_ids = sorted({row["card_id"] for row in new})
+        for start in range(0, len(new_card_ids), LOOKUP_CHUNK_SIZE):
+            load(new_card_ids[start:start + LOOKUP_CHUNK_SIZE])
+    return ids
+
+
+def store_snapshot(price_date, key_ids, prices):
+    """Write one day's prices (parallel arrays, any order). The caller commits.
+
+    New days are appended; ingesting a day that is already stored
+    replaces its snapshot (a correction) and increments its revision,
+    which also retires the cached copy. Other days are never rewritten.
+    """
+    import numpy as np
+
+    key_ids = np.asarray(key_ids, dtype="<i4")
+    order = np.argsort(key_ids, kind="stable")
+    row = {
+        "price_date": price_date,
+        "key_ids": key_ids[order].tobytes(),
+        "prices": np.asarray(prices, dtype="<f4")[order].tobytes(),
+        "entries": int(key_ids.size),
+        "revision": 1,
+    }
+    stmt = dialect_insert(PriceSnapshot.__table__)
+    if stmt is not None:
+        table = PriceSnapshot.__table__
+        db.session.execute(stmt.values(**row).on_conflict_do_update(
+            index_elements=[table.c.price_date],
+            set_={"key_ids": stmt.excluded.key_ids, "prices": stmt.excluded.prices,
+                  "entries": stmt.excluded.entries, "revision": table.c.revision + 1}
+        ))
+    elif db.session.get(PriceSnapshot, price_date) is None:
+        db.session.execute(insert(PriceSnapshot).values(**row))
+    else:
+        db.session.execute(
+            update(PriceSnapshot).where(PriceSnapshot.price_date == price_date)
+            .values(key_ids=row["key_ids"], prices=row["prices"], entries=row["entries"],
+                    revision=PriceSnapshot.revision + 1)
+        )
+    bump_version(PRICES_VERSION_KEY)
+
+
+def ingest_price_snapshot(stream, price_date):
+    """Store a day's price CSV as one columnar snapshot and commit; returns stats.
+
+    Rows for cards missing from the catalog are skipped and reported.
+    """
+    errors = []
+    prices = read_prices(stream, errors)
+    card_ids = sorted({card_id for card_id, _ in prices})
+    known = set()
+    for start in range(0, len(card_ids), LOOKUP_CHUNK_SIZE):
+        known.update(db.session.scalars(select(Card.id).where(Card.id.in_(card_ids[start:start + LOOKUP_CHUNK_SIZE]))))
+    unknown = sorted(card_id for card_id in card_ids if card_id not in known)
+    prices = {key: price for key, price in prices.items() if key[0] in known}
+
+    try:
+        ids = ensure_price_keys(list(prices))
+        store_snapshot(price_date, [ids[key] for key in prices], list(prices.values()))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {
+        "date": price_date.isoformat(),
+        "prices": len(prices),
+        "unknown_cards": len(unknown),
+        "failed": len(errors),
+        "errors": errors[:MAX_REPORTED_ERRORS] + [{"card_id": c, "error": "Card not found"} for c in unknown[:100]],
+    }
+
+
+def latest_price_date():
+    return db.session.scalar(select(func.max(PriceSnapshot.price_date)))
+
+
+def load_snapshots(start, end):
+    """[(price_date, key_ids, prices)] of the snapshots between `start` and `end`, decoded via the snapshot cache"""
+    import numpy as np
+
+    meta = db.session.execute(
+        select(PriceSnapshot.price_date, PriceSnapshot.revision)
+        .where(PriceSnapshot.price_date >= start, PriceSnapshot.price_date <= end)
+        .order_by(PriceSnapshot.price_date)
+    ).all()
+    snapshots = {key: snapshot_cache.get(key) for key in map(tuple, meta)}
+    missing = [price_date for (price_date, _), arrays in snapshots.items() if arrays is None]
+    if missing:
+        for row in db.session.execute(
+            select(PriceSnapshot.price_date, PriceSnapshot.revision, PriceSnapshot.key_ids, PriceSnapshot.prices)
+            .where(PriceSnapshot.price_date.in_(missing))
+        ):
+            arrays = (np.frombuffer(row.key_ids, dtype="<i4"), np.frombuffer(row.prices, dtype="<f4"))
+            snapshots[(row.price_date, row.revision)] = arrays
+            snapshot_cache.set((row.price_date, row.revision), arrays)
+    # a snapshot re-ingested between the two queries is simply left out of this answer
+    return [(price_date, *arrays) for (price_date, _), arrays in snapshots.items() if arrays is not None]
+
+
+def owned_entries(user_id):
+    """The user's copies per (card, condition) with the PriceKey id (None if never priced)"""
+    return db.session.execute(
+        select(Collection.card_condition, func.sum(Collection.quantity), PriceKey.id)
+        .outerjoin(PriceKey, and_(PriceKey.card_id == Collection.card_id,
+                                  PriceKey.card_condition == Collection.card_condition))
+        .where(Collection.user_id == user_id)
+        .group_by(Collection.card_id, Collection.card_condition, PriceKey.id)
+    ).all()
+
+
+def value_points(user_id, start, end, lookback_days=PRICE_LOOKBACK_DAYS):
+    """Collection value at every snapshot date from `start` to `end`, plus the state at `end`.
+
+    Replays the snapshots from `lookback_days` before `start`, carrying
+    each card's last price forward, so a card missing from one day's
+    file keeps its previous price. Each day is one vectorized lookup of
+    the owned keys in that day's sorted key array.
+    """
+    import numpy as np
+
+    entries = owned_entries(user_id)
+    conditions = sorted({condition for condition, _, _ in entries})
+    condition_index = np.array([conditions.index(condition) for condition, _, _ in entries], dtype=np.int64)
+    quantity = np.array([int(copies) for _, copies, _ in entries], dtype=np.float64)
+    keys = np.array([key if key is not None else -1 for _, _, key in entries], dtype=np.int64)
+
+    price = np.full(len(entries), np.nan)
+    points = []
+    price_date = None
+    for snapshot_date, day_keys, day_prices in load_snapshots(start - timedelta(days=lookback_days), end):
+        if day_keys.size and keys.size:
+            position = np.minimum(np.searchsorted(day_keys, keys), day_keys.size - 1)
+            found = day_keys[position] == keys
+            price[found] = day_prices[position[found]]
+        price_date = snapshot_date
+        if snapshot_date >= start:
+            value = np.where(np.isnan(price), 0.0, price) * quantity
+            by_condition = np.bincount(condition_index, weights=value, minlength=len(conditions))
+            points.append({
+                "date": snapshot_date.isoformat(),
+                "total": round(float(value.sum()), 2),
+                "by_condition": {c: round(float(v), 2) for c, v in zip(conditions, by_condition)},
+            })
+
+    priced = ~np.isnan(price)
+    return points, {
+        "price_date": price_date.isoformat() if price_date else None,
+        "priced_copies": int(quantity[priced].sum()),
+        "unpriced_copies": int(quantity[~priced].sum()),
+    }
+
+
+def collection_value(user_id, on_date, lookback_days=PRICE_LOOKBACK_DAYS):
+    """Value of the collection by condition at `on_date`, using each card's latest price on or before it"""
+    points, state = value_points(user_id, on_date - timedelta(days=lookback_days), on_date, 0)
+    latest = points[-1] if points else {"total": 0.0, "by_condition": {}}
+    return {"date": on_date.isoformat(), "total": latest["total"], "by_condition": latest["by_condition"], **state}
+
+
+def value_history(user_id, start, end, lookback_days=PRICE_LOOKBACK_DAYS):
+    """Collection value at every snapshot date between `start` and `end`"""
+    points, state = value_points(user_id, start, end, lookback_days)
+    return {"start": start.isoformat(), "end": end.isoformat(), "points": points, **state}
\ No newline at end of file
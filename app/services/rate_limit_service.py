@@ -0,0 +1,151 @@
+
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+
+# Expired counters are purged every this many increments
+PURGE_INTERVAL = 1000
+
+
+def rate_limit_key():
+    """Limit signed-in users by JWT identity (shared across their devices), everyone else by IP"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f"user:{identity}" if identity else f"ip:{get_remote_address()}"
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit counters in a SQLite file shared by all worker processes on a host.
+
+    Use with ``RATELIMIT_STORAGE_URI = "sqlite:////path/to/ratelimit.db"``.
+    The database runs in WAL mode so readers never block; each check is
+    one short write transaction, which also makes the sliding window
+    check-and-increment atomic across processes.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, timeout=5.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urlparse(uri or "sqlite:///ratelimit.db")
+        path = parsed.path
+        # sqlite:///relative.db and sqlite:////absolute.db, as for SQLAlchemy URLs
+        self.path = path[1:] if path.startswith("/") else path
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        # never reuse a connection inherited from the parent of a forked worker
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _incr(self, connection, key, expiry, amount, now):
+        self._writes += 1
+        if self._writes % PURGE_INTERVAL == 0:
+            connection.execute("DELETE FROM rate_limits WHERE expires <= ?", (now,))
+        return connection.execute(
+            "INSERT INTO rate_limits (key, count, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "count = CASE WHEN expires <= ? THEN excluded.count ELSE count + excluded.count END, "
+            "expires = CASE WHEN expires <= ? THEN excluded.expires ELSE expires END "
+            "RETURNING count",
+            (key, amount, now + expiry, now, now)
+        ).fetchone()[0]
+
+    def _get(self, connection, key, now):
+        row = connection.execute(
+            "SELECT count, expires FROM rate_limits WHERE key = ? AND expires > ?", (key, now)
+        ).fetchone()
+        return row if row else (0, now)
+
+    def incr(self, key, expiry, amount=1):
+        return self._incr(self.connection, key, expiry, amount, time.time())
+
+    def decr(self, key, amount=1):
+        row = self.connection.execute(
+            "UPDATE rate_limits SET count = MAX(count - ?, 0) WHERE key = ? RETURNING count", (amount, key)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get(self, key):
+        return self._get(self.connection, key, time.time())[0]
+
+    def get_expiry(self, key):
+        return self._get(self.connection, key, time.time())[1]
+
+    def check(self):
+        try:
+            self.connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self.connection.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key):
+        self.connection.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def _sliding_window(self, connection, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(connection, previous_key, now)[0]
+        current_count = self._get(connection, current_key, now)[0]
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        connection = self.connection
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so no other worker can interleave
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(connection, key, expiry, now)
+            if int(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                connection.execute("COMMIT")
+                return False
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            # the current window is also the previous one for the next window, so keep it for two
+            self._incr(connection, current_key, 2 * expiry, amount, now)
+            connection.execute("COMMIT")
+            return True
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get_sliding_window(self, key, expiry):
+        return self._sliding_window(self.connection, key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
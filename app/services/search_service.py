@@ -0,0 +1,168 @@
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from sqlalchemy import select
+from app.db import db
+from app.models import Card
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase, strip accents (Pokémon -> pokemon) and split on non alphanumerics"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.lower())
+
+
+class CardSearchIndex:
+    """In-memory inverted index over card names, attacks and descriptions.
+
+    Postings map a token to {card_id: weight}, where weight is the term
+    frequency weighted by field. A sorted vocabulary gives prefix lookups
+    for typeahead. The index is plain Python, so it behaves the same on
+    PostgreSQL and SQLite.
+    """
+
+    FIELD_WEIGHTS = {"name": 3.0, "attack_names": 2.0, "description": 1.0}
+    MAX_PREFIX_EXPANSIONS = 64
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._vocab = []
+        self._docs = {}
+        self.built = False
+        self.version = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def load_from_db(self, version=None):
+        """(Re)build the index from the cards table at catalog `version`"""
+        rows = db.session.execute(
+            select(Card.id, Card.name, Card.set_name, Card.description, Card.attack_names)
+            .execution_options(yield_per=1000)
+        )
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._vocab = []
+            self._docs = {}
+            for row in rows:
+                self._add(*row)
+            self._vocab = sorted(self._postings)
+            self.built = True
+            self.version = version
+
+    def ensure_built(self, version=None):
+        """Build the index, or rebuild it if another worker changed the catalog"""
+        if not self.built or (version is not None and version != self.version):
+            self.load_from_db(version)
+
+    def remove_card(self, card_id, version=None):
+        """Drop a card; if this was the only change since the build, the index stays current"""
+        with self._lock:
+            self._remove(card_id)
+            if version is not None and self.version == version - 1:
+                self.version = version
+
+    def _add(self, card_id, name, set_name, description, attack_names):
+        fields = {
+            "name": name,
+            "attack_names": " ".join(attack_names or []),
+            "description": description,
+        }
+        weights = defaultdict(float)
+        for field, text in fields.items():
+            for token in tokenize(text):
+                weights[token] += self.FIELD_WEIGHTS[field]
+        for token, weight in weights.items():
+            self._postings[token][card_id] = weight
+        self._docs[card_id] = (name, set_name, " ".join(tokenize(name)), tuple(weights))
+
+    def _remove(self, card_id):
+        doc = self._docs.pop(card_id, None)
+        if doc is None:
+            return
+        for token in doc[3]:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(card_id, None)
+            if not postings:
+                del self._postings[token]
+                i = bisect_left(self._vocab, token)
+                if i < len(self._vocab) and self._vocab[i] == token:
+                    del self._vocab[i]
+
+    def _expand(self, term):
+        """Vocabulary tokens starting with `term`"""
+        i = bisect_left(self._vocab, term)
+        tokens = []
+        while i < len(self._vocab) and self._vocab[i].startswith(term):
+            tokens.append(self._vocab[i])
+            if len(tokens) >= self.MAX_PREFIX_EXPANSIONS:
+                break
+            i += 1
+        return tokens
+
+    def search(self, query, limit=20, prefix=True):
+        """Rank cards matching every query term; the last term is a prefix when `prefix` is set"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            total = len(self._docs) or 1
+            scores = None
+            for position, term in enumerate(terms):
+                if prefix and position == len(terms) - 1:
+                    tokens = self._expand(term)
+                else:
+                    tokens = [term] if term in self._postings else []
+
+                term_scores = {}
+                for token in tokens:
+                    postings = self._postings[token]
+                    idf = math.log(1 + total / len(postings))
+                    # exact matches outrank completions of the prefix
+                    boost = 1.0 if token == term else 0.5
+                    for card_id, weight in postings.items():
+                        term_scores[card_id] = max(term_scores.get(card_id, 0.0), weight * idf * boost)
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        card_id: score + term_scores[card_id]
+                        for card_id, score in scores.items() if card_id in term_scores
+                    }
+                if not scores:
+                    return []
+
+            needle = " ".join(terms)
+            results = []
+            for card_id, score in scores.items():
+                name, set_name, lowered_name, _ = self._docs[card_id]
+                if lowered_name.startswith(needle):
+                    score *= 2
+                results.append((score, card_id, name, set_name))
+
+        top = heapq.nsmallest(limit, results, key=lambda r: (-r[0], r[2] or "", r[1]))
+        return [{
+            "id": card_id,
+            "name": name,
+            "set_name": set_name,
+            "score": round(score, 4)
+        } for score, card_id, name, set_name in top]
+
+
+# Shared per-worker search index, built lazily on the first search
+search_index = CardSearchIndex()
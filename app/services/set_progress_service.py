@@ -0,0 +1,171 @@
+
+from collections import defaultdict
+from sqlalchemy import select, func, exists, insert, update, delete
+from app.db import db, dialect_insert
+from app.models import Card, Collection, SetProgress, User
+from app.services.cache_service import LRUCache, catalog_version
+
+# {set_name: cards in the catalog}, keyed by catalog version
+set_sizes_cache = LRUCache(max_entries=4)
+
+
+def set_sizes():
+    version = catalog_version()
+    sizes = set_sizes_cache.get(version)
+    if sizes is None:
+        sizes = dict(db.session.execute(select(Card.set_name, func.count()).group_by(Card.set_name)).all())
+        set_sizes_cache.set(version, sizes)
+    return sizes
+
+
+def lock_user_progress(user_id):
+    """Hold the user's row lock until commit; take it before reading ownership for a collection write.
+
+    Ownership read afterwards (`card_sets`, `remove_entry_progress`) is
+    then still true when the deltas are applied, so concurrent writes of
+    the same user cannot both count a card as newly owned. The no-op
+    UPDATE takes the row lock on PostgreSQL and the write lock on SQLite.
+    """
+    db.session.execute(
+        update(User).where(User.id == user_id).values(id=User.id).execution_options(synchronize_session=False)
+    )
+
+
+def card_sets(user_id, card_ids):
+    """{card_id: (set_name, owned)} for existing cards; call before a write to know what the user owned"""
+    owned = exists().where(Collection.user_id == user_id, Collection.card_id == Card.id)
+    return {
+        row.id: (row.set_name, row.owned)
+        for row in db.session.execute(select(Card.id, Card.set_name, owned.label("owned")).where(Card.id.in_(card_ids)))
+    }
+
+
+def added_progress(sets, quantities):
+    """Summary deltas for adding {card_id: copies}, given `card_sets` from before the write"""
+    deltas = defaultdict(lambda: [0, 0])
+    for card_id, copies in quantities.items():
+        set_name, owned = sets[card_id]
+        deltas[set_name][0] += 0 if owned else 1
+        deltas[set_name][1] += copies
+    return deltas
+
+
+def apply_set_progress(user_id, deltas):
+    """Add {set_name: (distinct cards, copies)} deltas to the user's summary rows; the caller commits.
+
+    One upsert for all sets; rows that drop to zero copies are removed.
+    """
+    rows = [
+        {"user_id": user_id, "set_name": set_name, "distinct_cards": distinct, "total_copies": copies}
+        for set_name, (distinct, copies) in deltas.items() if distinct or copies
+    ]
+    if not rows:
+        return
+
+    stmt = dialect_insert(SetProgress.__table__)
+    if stmt is not None:
+        table = SetProgress.__table__
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.set_name],
+            set_={
+                "distinct_cards": table.c.distinct_cards + stmt.excluded.distinct_cards,
+                "total_copies": table.c.total_copies + stmt.excluded.total_copies,
+            }
+        ), rows)
+    else:
+        existing = set(db.session.scalars(
+            select(SetProgress.set_name).where(SetProgress.user_id == user_id, SetProgress.set_name.in_(list(deltas)))
+        ))
+        for row in rows:
+            if row["set_name"] in existing:
+                db.session.execute(
+                    update(SetProgress)
+                    .where(SetProgress.user_id == user_id, SetProgress.set_name == row["set_name"])
+                    .values(distinct_cards=SetProgress.distinct_cards + row["distinct_cards"],
+                            total_copies=SetProgress.total_copies + row["total_copies"])
+                )
+            else:
+                db.session.execute(insert(SetProgress).values(**row))
+
+    if any(copies < 0 for _, copies in deltas.values()):
+        db.session.execute(delete(SetProgress).where(
+            SetProgress.user_id == user_id, SetProgress.set_name.in_(list(deltas)), SetProgress.total_copies <= 0
+        ))
+
+
+def remove_entry_progress(entry):
+    """Summary deltas for deleting one collection row; call before the delete"""
+    lock_user_progress(entry.user_id)
+    others = exists().where(
+        Collection.user_id == entry.user_id, Collection.card_id == entry.card_id, Collection.id != entry.id
+    )
+    set_name, still_owned = db.session.execute(
+        select(Card.set_name, others).where(Card.id == entry.card_id)
+    ).one()
+    return {set_name: (0 if still_owned else -1, -entry.quantity)}
+
+
+def remove_card_progress(card):
+    """Take a card out of every owner's summary; call before deleting it from the catalog"""
+    copies = (
+        select(func.sum(Collection.quantity))
+        .where(Collection.user_id == SetProgress.user_id, Collection.card_id == card.id)
+        .scalar_subquery()
+    )
+    owners = select(Collection.user_id).where(Collection.card_id == card.id)
+    db.session.execute(
+        update(SetProgress)
+        .where(SetProgress.set_name == card.set_name, SetProgress.user_id.in_(owners))
+        .values(distinct_cards=SetProgress.distinct_cards - 1, total_copies=SetProgress.total_copies - copies)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(delete(SetProgress).where(SetProgress.set_name == card.set_name, SetProgress.total_copies <= 0))
+
+
+def owners_of_moved_cards(sets):
+    """Users owning any of {card_id: new set_name} whose set is about to change; call before updating the cards"""
+    current = db.session.execute(select(Card.id, Card.set_name).where(Card.id.in_(list(sets)))).all()
+    moved = [card_id for card_id, set_name in current if set_name != sets[card_id]]
+    if not moved:
+        return []
+    return db.session.scalars(select(Collection.user_id).where(Collection.card_id.in_(moved)).distinct()).all()
+
+
+def rebuild_set_progress(user_id=None):
+    """Recompute the summary (of one user, or everyone) from the collections; the caller commits"""
+    clear = delete(SetProgress)
+    source = (
+        select(Collection.user_id, Card.set_name, func.count(func.distinct(Collection.card_id)), func.sum(Collection.quantity))
+        .join(Card, Card.id == Collection.card_id)
+        .group_by(Collection.user_id, Card.set_name)
+    )
+    if user_id is not None:
+        clear = clear.where(SetProgress.user_id == user_id)
+        source = source.where(Collection.user_id == user_id)
+    db.session.execute(clear)
+    return db.session.execute(
+        insert(SetProgress).from_select(["user_id", "set_name", "distinct_cards", "total_copies"], source)
+    ).rowcount
+
+
+def set_progress(user_id):
+    """Completion of every set in the catalog for a user: one primary key lookup plus the cached set sizes"""
+    owned = {
+        row.set_name: row
+        for row in db.session.execute(
+            select(SetProgress.set_name, SetProgress.distinct_cards, SetProgress.total_copies)
+            .where(SetProgress.user_id == user_id)
+        )
+    }
+    result = []
+    for set_name, total in sorted(set_sizes().items()):
+        row = owned.get(set_name)
+        distinct = row.distinct_cards if row else 0
+        result.append({
+            "set_name": set_name,
+            "owned_cards": distinct,
+            "total_cards": total,
+            "copies": row.total_copies if row else 0,
+            "percent_complete": round(100 * distinct / total, 1) if total else 0.0,
+        })
+    return result
@@ -0,0 +1,212 @@
+
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from flask import current_app
+from sqlalchemy import select
+from app.db import db
+from app.models import Card, DeckCard
+from app.services.analytics_service import TARGET_FIELDS
+from app.services.legality_service import normalize, is_basic_pokemon, DECK_SIZE
+
+OPENING_HAND = 7
+PRIZES = 6
+# A deck whose Basics are all prized or buried still ends the mulligan loop eventually
+MAX_MULLIGANS = 20
+BATCH_SIZE = 50_000
+# Cap on shuffled cards held per batch (batch rows x deck length), bounding a worker's memory
+MAX_BATCH_CARDS = BATCH_SIZE * DECK_SIZE
+# Batches run between confidence checks; fixed so results do not depend on the worker count
+WAVE_BATCHES = 8
+
+
+def simulate_batch(task):
+    """Run one batch of shuffled setups and return summed outcome counts.
+
+    `task` is (deck, basic, masks, minimums, turn, size, seed): `deck`
+    holds a card row index per copy, `basic` and each row of `masks`
+    flag card rows, and `seed` is a numpy SeedSequence. Runs in a pool
+    process, so it only takes and returns plain picklable values.
+    """
+    import numpy as np
+
+    deck, basic, masks, minimums, turn, size, seed = task
+    rng = np.random.default_rng(seed)
+    deck = np.asarray(deck)
+    basic = np.asarray(basic, dtype=bool)
+    masks = np.asarray(masks, dtype=bool).reshape(len(minimums), len(basic))
+
+    cards = rng.permuted(np.tile(deck, (size, 1)), axis=1)
+    opening_basic = basic[cards[:, :OPENING_HAND]].any(axis=1)
+    mulligans = np.zeros(size, dtype=np.int64)
+    pending = ~opening_basic if basic.any() else np.zeros(size, dtype=bool)
+    for _ in range(MAX_MULLIGANS):
+        if not pending.any():
+            break
+        redo = np.flatnonzero(pending)
+        cards[redo] = rng.permuted(np.tile(deck, (redo.size, 1)), axis=1)
+        mulligans[redo] += 1
+        pending[redo] = ~basic[cards[redo, :OPENING_HAND]].any(axis=1)
+
+    # prizes come off the top after the opening hand, then one card is drawn per turn
+    prizes = cards[:, OPENING_HAND:OPENING_HAND + PRIZES]
+    seen = np.concatenate([cards[:, :OPENING_HAND], cards[:, OPENING_HAND + PRIZES:OPENING_HAND + PRIZES + turn]], axis=1)
+    met = np.stack([mask[seen].sum(axis=1) >= minimum for mask, minimum in zip(masks, minimums)]) if minimums else np.ones((0, size), dtype=bool)
+
+    return {
+        "trials": size,
+        "opening_basic": int(opening_basic.sum()),
+        "mulliganed": int((mulligans > 0).sum()),
+        "mulligans": int(mulligans.sum()),
+        "conditions": [int(hits) for hits in met.sum(axis=1)],
+        "all_conditions": int(met.all(axis=0).sum()),
+        "prized": [int(mask[prizes].any(axis=1).sum()) for mask in masks],
+    }
+
+
+def wilson_interval(hits, trials, z):
+    """Wilson score interval of a proportion, usable near 0 and 1"""
+    p = hits / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half = z * ((p * (1 - p) / trials + z * z / (4 * trials * trials)) ** 0.5) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def get_simulation_pool():
+    """This app's process pool, started on first use; None when SIMULATION_WORKERS is 1 (run inline)"""
+    workers = current_app.config.get("SIMULATION_WORKERS") or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    pool = current_app.extensions.get("simulation_pool")
+    if pool is None:
+        # forking a threaded web worker is unsafe, so start clean interpreters by default
+        context = multiprocessing.get_context(current_app.config.get("SIMULATION_START_METHOD", "spawn"))
+        pool = current_app.extensions["simulation_pool"] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    return pool
+
+
+def run_simulation(deck, basic, masks, minimums, trials, seed, turn=1, tolerance=None, confidence=0.95,
+                   batch_size=BATCH_SIZE, pool=None):
+    """Simulate up to `trials` setups in seeded batches, stopping early once every estimate is within `tolerance`.
+
+    Batch i always uses the i-th child of SeedSequence(seed), so a seed
+    gives the same result inline or on any number of pool processes.
+    """
+    import numpy as np
+
+    batch_size = max(1, min(batch_size, MAX_BATCH_CARDS // max(1, len(deck))))
+    seeds = np.random.SeedSequence(seed)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    totals, done = None, 0
+    stopped_early = False
+    while done < trials:
+        sizes = []
+        while len(sizes) < WAVE_BATCHES and done < trials:
+            sizes.append(min(batch_size, trials - done))
+            done += sizes[-1]
+        tasks = [(deck, basic, masks, minimums, turn, size, child) for size, child in zip(sizes, seeds.spawn(len(sizes)))]
+        for result in (pool.map(simulate_batch, tasks) if pool is not None else map(simulate_batch, tasks)):
+            if totals is None:
+                totals = result
+                continue
+            for key, value in result.items():
+                totals[key] = [a + b for a, b in zip(totals[key], value)] if isinstance(value, list) else totals[key] + value
+
+        if tolerance:
+            counts = [totals["opening_basic"], totals["mulliganed"], totals["all_conditions"], *totals["conditions"], *totals["prized"]]
+            if all(high - low <= 2 * tolerance for low, high in (wilson_interval(c, totals["trials"], z) for c in counts)):
+                stopped_early = done < trials
+                break
+
+    n = totals["trials"]
+
+    def estimate(hits):
+        low, high = wilson_interval(hits, n, z)
+        return {"probability": round(hits / n, 6), "ci": [round(low, 6), round(high, 6)]}
+
+    return {
+        "trials": n,
+        "stopped_early": stopped_early,
+        "opening_basic": estimate(totals["opening_basic"]),
+        "mulligan": estimate(totals["mulliganed"]),
+        "mulligans_per_game": round(totals["mulligans"] / n, 6),
+        "conditions": [estimate(hits) for hits in totals["conditions"]],
+        "all_conditions": estimate(totals["all_conditions"]),
+        "prized": [estimate(hits) for hits in totals["prized"]],
+    }
+
+
+def parse_conditions(conditions):
+    """Validate [{field: value, ..., "min": n}] card conditions and return [(filters, minimum)]"""
+    if conditions is None:
+        return []
+    if not isinstance(conditions, list) or len(conditions) > 10:
+        raise ValueError("conditions must be a list of at most 10 objects")
+    parsed = []
+    for condition in conditions:
+        if not isinstance(condition, dict):
+            raise ValueError("Each condition must be an object")
+        filters = {field: condition[field] for field in TARGET_FIELDS if condition.get(field)}
+        unknown = set(condition) - set(TARGET_FIELDS) - {"min"}
+        minimum = condition.get("min", 1)
+        if not filters or unknown:
+            raise ValueError(f"Each condition needs at least one of: {', '.join(TARGET_FIELDS)} (and optionally min)")
+        if not isinstance(minimum, int) or isinstance(minimum, bool) or minimum < 1:
+            raise ValueError("min must be a positive integer")
+        parsed.append((filters, minimum))
+    return parsed
+
+
+def simulate_deck(deck_id, conditions=None, trials=100_000, seed=None, turn=1, tolerance=None, confidence=0.95):
+    """Monte Carlo setup odds of a deck: opening Basic, mulligans, card conditions by `turn`, and prized copies.
+
+    Conditions are like {"card_type": "Energy", "min": 1}: at least `min`
+    matching cards in the opening hand plus the `turn` cards drawn since.
+    Without a seed a random one is used and returned, to replay the run.
+    """
+    max_trials = current_app.config.get("SIMULATION_MAX_TRIALS", 5_000_000)
+    if not isinstance(trials, int) or isinstance(trials, bool) or not 1 <= trials <= max_trials:
+        raise ValueError(f"trials must be an integer between 1 and {max_trials}")
+    if not isinstance(turn, int) or isinstance(turn, bool) or not 0 <= turn <= 20:
+        raise ValueError("turn must be an integer between 0 and 20")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise ValueError("seed must be a non-negative integer")
+    if tolerance is not None and not (isinstance(tolerance, (int, float)) and 0 < tolerance < 0.5):
+        raise ValueError("tolerance must be between 0 and 0.5")
+    if not (isinstance(confidence, (int, float)) and 0 < confidence < 1):
+        raise ValueError("confidence must be between 0 and 1")
+    parsed = parse_conditions(conditions)
+
+    rows = db.session.execute(
+        select(DeckCard.quantity, Card.id, Card.name, Card.card_type, Card.energy_type, Card.evolution_stage)
+        .join(Card, Card.id == DeckCard.card_id)
+        .where(DeckCard.deck_id == deck_id)
+        .order_by(Card.id)
+    ).all()
+    size = sum(row.quantity for row in rows)
+    if size > DECK_SIZE:
+        raise ValueError(f"Only decks of at most {DECK_SIZE} cards can be simulated, this one has {size}")
+    if size < OPENING_HAND + PRIZES + turn:
+        raise ValueError(f"Deck needs at least {OPENING_HAND + PRIZES + turn} cards to simulate turn {turn}")
+    deck = [index for index, row in enumerate(rows) for _ in range(row.quantity)]
+
+    basic = [is_basic_pokemon(row.card_type, row.evolution_stage) for row in rows]
+    fields = {"card_id": "id"}
+    masks = [
+        all(normalize(getattr(row, fields.get(field, field))) == normalize(value) for field, value in filters.items())
+        for filters, _ in parsed for row in rows
+    ]
+    seed = secrets.randbits(32) if seed is None else seed
+
+    result = run_simulation(
+        deck, basic, masks, [minimum for _, minimum in parsed], trials, seed, turn=turn,
+        tolerance=tolerance, confidence=confidence, pool=get_simulation_pool()
+    )
+    result["conditions"] = [{"condition": {**filters, "min": minimum}, **estimate}
+                            for (filters, minimum), estimate in zip(parsed, result["conditions"])]
+    result["prized"] = [{"condition": {**filters, "min": minimum}, **estimate}
+                        for (filters, minimum), estimate in zip(parsed, result["prized"])]
+    return {"seed": seed, "turn": turn, "deck_size": len(deck), **result}
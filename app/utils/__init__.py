@@ -1,5 +1,5 @@
 
 from app.utils.validators import is_valid_email, is_valid_username
-from app.utils.helpers import sanitize_input
+from app.utils.helpers import sanitize_input, parse_limit, parse_offset, parse_date, is_truthy
 
-__all__ = ['is_valid_email', 'is_valid_username', 'sanitize_input']
\ No newline at end of file
+__all__ = ['is_valid_email', 'is_valid_username', 'sanitize_input', 'parse_limit', 'parse_offset', 'parse_date', 'is_truthy']
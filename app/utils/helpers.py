@@ -1,7 +1,38 @@
 
 import bleach
+from datetime import date
 
 def sanitize_input(input_str):
     if input_str is None:
         return ""
-    return bleach.clean(input_str)
\ No newline at end of file
+    return bleach.clean(input_str)
+
+def parse_limit(value, default=100, maximum=1000):
+    """Parse a `limit` query argument, clamped to [1, maximum] (unbounded if maximum is None)"""
+    if value is None or value == "":
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return limit if maximum is None else min(limit, maximum)
+
+def parse_offset(value):
+    """Parse an `offset` query argument"""
+    if value is None or value == "":
+        return 0
+    offset = int(value)
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+    return offset
+
+def parse_date(value, name="date"):
+    """Parse a YYYY-MM-DD query argument (None if missing)"""
+    if value is None or value == "":
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+def is_truthy(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
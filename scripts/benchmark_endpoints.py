@@ -0,0 +1,331 @@
+import sys
+import os
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func, insert, select, make_url
+from app import create_app
+from app.config import Config
+from app.db import db
+from app.models import Card, Collection, Deck, DeckCard, User
+from app.models.collection import VALID_CONDITIONS
+from app.services.set_progress_service import rebuild_set_progress
+
+# Dataset sizes; "large" is the production-like catalog (~2M collection and ~1.5M deck rows)
+SCALES = {
+    "tiny": {"cards": 500, "users": 20, "collection_per_user": 50, "decks_per_user": 2, "cards_per_deck": 10},
+    "small": {"cards": 10_000, "users": 1_000, "collection_per_user": 100, "decks_per_user": 3, "cards_per_deck": 20},
+    "large": {"cards": 100_000, "users": 10_000, "collection_per_user": 200, "decks_per_user": 5, "cards_per_deck": 30},
+}
+
+SEED_BATCH_SIZE = 5000
+SETS = ["Base Set", "Jungle", "Fossil", "Team Rocket", "Gym Heroes", "Neo Genesis", "Scarlet & Violet", "Paldea Evolved"]
+ENERGY_TYPES = ["Fire", "Water", "Grass", "Lightning", "Psychic", "Fighting", "Darkness", "Metal", "Colorless"]
+RARITIES = ["Common", "Uncommon", "Rare", "Rare Holo", "Ultra Rare"]
+STAGES = ["Basic", "Stage 1", "Stage 2"]
+SYLLABLES = ["pi", "ka", "chu", "char", "man", "der", "bul", "ba", "saur", "squi", "rtle", "mew", "gen", "gar", "eev", "ee", "dra", "gon", "ite"]
+
+# Metrics compared against the baseline; query counts are deterministic so any increase is a regression
+TIMING_METRICS = ("p50_ms", "p95_ms")
+
+
+class BenchmarkConfig(Config):
+    TESTING = True
+    RATELIMIT_ENABLED = False
+    SWAGGER_ENABLED = False
+    JWT_SECRET_KEY = "benchmark-secret-key-that-is-long-enough-for-hs256"
+
+
+def card_name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def insert_batched(model, rows):
+    for start in range(0, len(rows), SEED_BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + SEED_BATCH_SIZE])
+
+
+def seed_database(scale, seed=42):
+    """Fill an empty database with a synthetic catalog, users, collections and decks"""
+    rng = random.Random(seed)
+    size = SCALES[scale]
+
+    card_ids = [f"bench-{i}" for i in range(size["cards"])]
+    insert_batched(Card, [{
+        "id": card_id,
+        "name": card_name(rng),
+        "set_name": rng.choice(SETS),
+        "card_type": "Pokemon",
+        "rarity": rng.choice(RARITIES),
+        "energy_type": rng.choice(ENERGY_TYPES),
+        "hp": rng.randrange(30, 340, 10),
+        "attack_names": [card_name(rng) for _ in range(rng.randint(1, 2))],
+        "evolution_stage": rng.choice(STAGES),
+        "retreat_cost": rng.randint(0, 4),
+    } for card_id in card_ids])
+
+    insert_batched(User, [{
+        "id": user_id,
+        "username": f"trainer{user_id}",
+        "email": f"trainer{user_id}@example.com",
+        "password_hash": "x",
+    } for user_id in range(1, size["users"] + 1)])
+
+    collection_id = deck_id = 0
+    collections, decks, deck_cards = [], [], []
+    for user_id in range(1, size["users"] + 1):
+        owned = rng.sample(card_ids, size["collection_per_user"])
+        for card_id in owned:
+            collection_id += 1
+            collections.append({
+                "id": collection_id, "user_id": user_id, "card_id": card_id,
+                "quantity": rng.randint(1, 4), "card_condition": rng.choice(VALID_CONDITIONS),
+            })
+        # deck lists use the first half of the collection, quantities within what is owned
+        deckable = collections[-len(owned):][:len(owned) // 2]
+        for d in range(size["decks_per_user"]):
+            deck_id += 1
+            decks.append({"id": deck_id, "user_id": user_id, "name": f"Deck {d + 1}", "is_public": d == 0})
+            for row in rng.sample(deckable, min(size["cards_per_deck"], len(deckable))):
+                deck_cards.append({"deck_id": deck_id, "card_id": row["card_id"], "quantity": rng.randint(1, row["quantity"])})
+
+        if len(collections) >= SEED_BATCH_SIZE * 4:
+            insert_batched(Collection, collections)
+            insert_batched(Deck, decks)
+            insert_batched(DeckCard, deck_cards)
+            db.session.commit()
+            collections, decks, deck_cards = [], [], []
+
+    insert_batched(Collection, collections)
+    insert_batched(Deck, decks)
+    insert_batched(DeckCard, deck_cards)
+    rebuild_set_progress()
+    db.session.commit()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "queries_mean": round(statistics.fmean(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+def run_scenario(client, requests):
+    """Send each (method, url, headers, json, expected_status) and time it and count its SQL statements"""
+    counter = QueryCounter()
+    event.listen(db.engine, "before_cursor_execute", counter)
+    latencies, queries, errors = [], [], 0
+    started = time.perf_counter()
+    try:
+        for method, url, headers, body, expected in requests:
+            counter.count = 0
+            start = time.perf_counter()
+            response = client.open(url, method=method, headers=headers, json=body)
+            latencies.append(time.perf_counter() - start)
+            queries.append(counter.count)
+            if response.status_code != expected:
+                errors += 1
+    finally:
+        event.remove(db.engine, "before_cursor_execute", counter)
+    return summarize(latencies, queries, errors, time.perf_counter() - started)
+
+
+def build_scenarios(iterations, seed=42):
+    """Requests for each benchmarked endpoint, chosen from the seeded data.
+
+    Read scenarios use a different user per request so they measure the
+    uncached path; the "warm" variants repeat one user to measure cache hits.
+    Write scenarios each touch distinct rows, so every request succeeds.
+    """
+    rng = random.Random(seed)
+    user_ids = db.session.scalars(select(User.id).order_by(User.id)).all()
+    users = rng.sample(user_ids, min(iterations, len(user_ids)))
+    users = (users * (iterations // len(users) + 1))[:iterations]
+    tokens = {user_id: {"Authorization": create_access_token(identity=str(user_id))} for user_id in set(users)}
+    auth = tokens[users[0]]
+
+    card_ids = db.session.scalars(select(Card.id).order_by(Card.id)).all()
+    names = db.session.scalars(select(Card.name).limit(1000)).all()
+
+    scenarios = {
+        "cards_page": [("GET", f"/cards?limit=100&cursor={rng.choice(card_ids)}", auth, None, 200) for _ in range(iterations)],
+        "cards_search": [("GET", f"/cards/search?q={rng.choice(names)[:4]}", auth, None, 200) for _ in range(iterations)],
+        "cards_filter": [(
+            "GET", f"/cards/filter?energy_type={rng.choice(ENERGY_TYPES)}&rarity={rng.choice(RARITIES)}&limit=50",
+            auth, None, 200
+        ) for _ in range(iterations)],
+        "collection": [("GET", "/collection?limit=100", tokens[u], None, 200) for u in users],
+        "collection_warm": [("GET", "/collection?limit=100", auth, None, 200) for _ in range(iterations)],
+        "decks": [("GET", "/deck", tokens[u], None, 200) for u in users],
+        "set_progress": [("GET", "/collection/sets", tokens[u], None, 200) for u in users],
+    }
+
+    add_card, delete_collection, delete_deck = [], [], []
+    for user_id in dict.fromkeys(users):
+        decks = db.session.scalars(select(Deck.id).where(Deck.user_id == user_id).order_by(Deck.id)).all()
+        in_decks = select(DeckCard.card_id).join(Deck, Deck.id == DeckCard.deck_id).where(Deck.user_id == user_id)
+        spare = db.session.execute(
+            select(Collection.id, Collection.card_id)
+            .where(Collection.user_id == user_id, Collection.card_id.not_in(in_decks))
+            .order_by(Collection.id).limit(2)
+        ).all()
+        if len(decks) < 2 or len(spare) < 2:
+            continue
+        add_card.append(("POST", f"/deck/{decks[0]}/add-card", tokens[user_id], {"card_id": spare[0].card_id}, 201))
+        delete_collection.append(("DELETE", f"/collection/{spare[1].id}", tokens[user_id], None, 200))
+        delete_deck.append(("DELETE", f"/deck/{decks[-1]}", tokens[user_id], None, 200))
+
+    scenarios["add_card_to_deck"] = add_card
+    scenarios["delete_collection"] = delete_collection
+    scenarios["delete_deck"] = delete_deck
+    # deleting cards cascades into every collection and deck, so use cards that exist
+    scenarios["delete_card"] = [("DELETE", f"/cards/{card_id}", auth, None, 200) for card_id in rng.sample(card_ids, min(10, iterations))]
+    return scenarios
+
+
+def run_benchmarks(app, iterations=100, seed=42):
+    """Run every scenario against `app` and return {scenario: metrics}"""
+    client = app.test_client()
+    with app.app_context():
+        scenarios = build_scenarios(iterations, seed)
+        # one untimed request per read scenario, so per-worker indexes are built before timing
+        for name in ("cards_page", "cards_search", "cards_filter"):
+            method, url, headers, body, _ = scenarios[name][0]
+            client.open(url, method=method, headers=headers, json=body)
+        return {name: run_scenario(client, requests) for name, requests in scenarios.items() if requests}
+
+
+def compare(results, baseline, threshold=0.25, min_delta_ms=1.0):
+    """List the regressions of `results` against a previous run's results.
+
+    A latency counts as regressed when it is both `threshold` (relative)
+    and `min_delta_ms` (absolute) slower, so sub-millisecond jitter is ignored.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in TIMING_METRICS:
+            delta = metrics[metric] - previous[metric]
+            if delta > previous[metric] * threshold and delta > min_delta_ms:
+                regressions.append(f"{name}: {metric} {previous[metric]} -> {metrics[metric]}")
+        if metrics["queries_max"] > previous["queries_max"]:
+            regressions.append(f"{name}: queries_max {previous['queries_max']} -> {metrics['queries_max']}")
+        if metrics["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {metrics['errors']}")
+    return regressions
+
+
+def prepare_database(database, scale, seed):
+    """Create the app on `database`, seeding it first if it has no cards"""
+    BenchmarkConfig.SQLALCHEMY_DATABASE_URI = database
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        # create_all skips existing tables, so bring a previously seeded file up to the current indexes
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        if not db.session.scalar(select(func.count()).select_from(Card)):
+            started = time.perf_counter()
+            seed_database(scale, seed)
+            print(f"Seeded {scale} dataset in {time.perf_counter() - started:.1f}s")
+    return app
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API endpoints on a synthetic dataset")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--database", help="Database URL; write scenarios modify it (default: a copy of a SQLite file seeded once per scale)")
+    parser.add_argument("--iterations", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed latency increase over the baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency increases smaller than this")
+    args = parser.parse_args()
+
+    database = args.database
+    if database is None:
+        # seed once, then run every benchmark on a fresh copy so the write scenarios start from the same data
+        seeded = os.path.join(tempfile.gettempdir(), f"pokemon-bench-{args.scale}-{args.seed}.db")
+        if not os.path.exists(seeded):
+            prepare_database(f"sqlite:///{seeded}.tmp", args.scale, args.seed)
+            os.replace(f"{seeded}.tmp", seeded)
+        shutil.copyfile(seeded, f"{seeded}.run")
+        database = f"sqlite:///{seeded}.run"
+
+    app = prepare_database(database, args.scale, args.seed)
+
+    results = run_benchmarks(app, args.iterations, args.seed)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "scale": args.scale,
+            "iterations": args.iterations,
+            "database": make_url(database).get_backend_name(),
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'scenario':<20}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}{'queries':>10}{'errors':>8}")
+    for name, metrics in results.items():
+        print(f"{name:<20}{metrics['p50_ms']:>10}{metrics['p95_ms']:>10}{metrics['throughput_rps']:>10}"
+              f"{metrics['queries_max']:>10}{metrics['errors']:>8}")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("scale") != args.scale:
+            print(f"Baseline was run at scale {baseline['meta'].get('scale')}, not {args.scale}", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import sys
+import os
+import argparse
+import json
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported on first use, never at worker start
+LAZY_MODULES = ["google.generativeai", "google.api_core", "authlib", "alembic", "numpy"]
+
+# Runs in a fresh interpreter, like a newly forked gunicorn worker importing wsgi.py
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "create_app_seconds": created - imported,
+    "total_seconds": created - start,
+    "modules": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure_startup(runs=3, env=None):
+    """Cold-start a worker `runs` times and return the median timings and any eagerly loaded heavy modules"""
+    env = {**os.environ, "DATABASE_URL": "sqlite://", **(env or {})}
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE % (LAZY_MODULES,)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    result = {
+        key: round(statistics.median(sample[key] for sample in samples), 4)
+        for key in ("import_seconds", "create_app_seconds", "total_seconds")
+    }
+    result["runs"] = runs
+    result["eager_modules"] = sorted({name for sample in samples for name in sample["modules"]})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start (import + create_app) of one worker")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--max-seconds", type=float, help="Fail if the median cold start is slower than this")
+    args = parser.parse_args()
+
+    result = measure_startup(args.runs)
+    print(json.dumps(result, indent=2))
+
+    if result["eager_modules"]:
+        print(f"Loaded at startup, should be lazy: {', '.join(result['eager_modules'])}", file=sys.stderr)
+        sys.exit(1)
+    if args.max_seconds is not None and result["total_seconds"] > args.max_seconds:
+        print(f"Cold start {result['total_seconds']}s exceeds {args.max_seconds}s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
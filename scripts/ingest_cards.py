@@ -0,0 +1,37 @@
+
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.db import db
+from app.services.ingest_service import ingest_cards, INGEST_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a card dump (JSON array, NDJSON or CSV) into the cards table")
+    parser.add_argument("path", help="Card dump to load")
+    parser.add_argument("--format", choices=["json", "ndjson", "csv"], help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Cards per transaction")
+    parser.add_argument("--checkpoint", help="Progress file used to resume an interrupted load (default: <path>.checkpoint)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Always start from the beginning")
+    args = parser.parse_args()
+
+    checkpoint = None if args.no_checkpoint else (args.checkpoint or args.path + ".checkpoint")
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        stats = ingest_cards(args.path, fmt=args.format, chunk_size=args.chunk_size, checkpoint_path=checkpoint)
+
+    print(f"Loaded {stats['upserted']} cards from {stats['records']} records in {stats['seconds']}s "
+          f"({stats['failed']} failed)")
+    for error in stats["errors"]:
+        print(f"  record {error['record']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import sys
+import os
+import argparse
+from datetime import date
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.db import db
+from app.models import PriceKey, PriceSnapshot
+from app.services.price_service import ingest_price_snapshot, price_date_from_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load daily price CSVs (card_id, condition, price) as price snapshots")
+    parser.add_argument("paths", nargs="+", help="CSV files, or directories of them, named with their YYYY-MM-DD date")
+    parser.add_argument("--date", type=date.fromisoformat, help="Snapshot date when loading a single file")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".csv")))
+        else:
+            files.append(path)
+    if args.date and len(files) != 1:
+        parser.error("--date needs exactly one file")
+
+    app = create_app()
+    with app.app_context():
+        for table in (PriceKey.__table__, PriceSnapshot.__table__):
+            table.create(db.engine, checkfirst=True)
+        for path in files:
+            with open(path, newline="", encoding="utf-8-sig") as stream:
+                stats = ingest_price_snapshot(stream, args.date or price_date_from_path(path))
+            print(f"{stats['date']}: {stats['prices']} prices from {path} "
+                  f"({stats['unknown_cards']} unknown cards, {stats['failed']} failed)")
+            for error in stats["errors"]:
+                print(f"  {error}")
+
+
+if __name__ == "__main__":
+    main()
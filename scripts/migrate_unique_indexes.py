@@ -0,0 +1,86 @@
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app import create_app
+from app.db import db
+from app.models import Collection, Deck, DeckCard
+from app.services.cache_service import bump_user_version
+
+# (table, key columns) merged so the unique indexes can be built
+DUPLICATE_KEYS = [
+    ("collections", ("user_id", "card_id", "card_condition")),
+    ("deck_cards", ("deck_id", "card_id")),
+]
+
+
+def merge_duplicates(table, keys):
+    """Sum the quantities of rows sharing `keys` into the oldest one and delete the rest; returns rows deleted"""
+    same_keys = " AND ".join(f"d.{key} = {table}.{key}" for key in keys)
+    db.session.execute(text(
+        f"UPDATE {table} SET quantity = (SELECT SUM(d.quantity) FROM {table} d WHERE {same_keys}) "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} d WHERE {same_keys} AND d.id < {table}.id) "
+        f"AND EXISTS (SELECT 1 FROM {table} d WHERE {same_keys} AND d.id > {table}.id)"
+    ))
+    return db.session.execute(text(
+        f"DELETE FROM {table} WHERE EXISTS (SELECT 1 FROM {table} d WHERE {same_keys} AND d.id < {table}.id)"
+    )).rowcount
+
+
+def affected_users():
+    """Users owning duplicate collection or deck rows"""
+    return [row[0] for row in db.session.execute(text(
+        "SELECT user_id FROM collections GROUP BY user_id, card_id, card_condition HAVING COUNT(*) > 1 "
+        "UNION SELECT decks.user_id FROM deck_cards JOIN decks ON decks.id = deck_cards.deck_id "
+        "GROUP BY decks.user_id, deck_cards.deck_id, deck_cards.card_id HAVING COUNT(*) > 1"
+    ))]
+
+
+def migrate_unique_indexes(dry_run=False):
+    """Merge duplicate rows and create the collection and deck indexes; returns what was (or would be) done"""
+    # NULL conditions never conflict in a unique index, so give them the model default first
+    filled = db.session.execute(text(
+        "UPDATE collections SET card_condition = 'Near Mint' WHERE card_condition IS NULL"
+    )).rowcount
+    users = affected_users()
+    merged = {table: merge_duplicates(table, keys) for table, keys in DUPLICATE_KEYS}
+    for user_id in users:
+        bump_user_version(user_id)
+
+    indexes = [index for model in (Collection, Deck, DeckCard) for index in sorted(model.__table__.indexes, key=lambda i: i.name)]
+    report = {"conditions_filled": filled, "rows_merged": merged, "users": len(users),
+              "indexes": [index.name for index in indexes]}
+    if dry_run:
+        db.session.rollback()
+        return report
+
+    db.session.commit()
+    for index in indexes:
+        index.create(db.engine, checkfirst=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Merge duplicate collection/deck rows and add the unique indexes the upserts rely on"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        report = migrate_unique_indexes(dry_run=args.dry_run)
+
+    prefix = "Would merge" if args.dry_run else "Merged"
+    print(f"{prefix} {report['rows_merged']['collections']} collection and {report['rows_merged']['deck_cards']} "
+          f"deck rows for {report['users']} users ({report['conditions_filled']} conditions filled)")
+    if not args.dry_run:
+        print(f"Indexes: {', '.join(report['indexes'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import sys
+import os
+import argparse
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.db import db
+from app.models import SetProgress
+from app.services.cache_service import bump_catalog_version, bump_user_version
+from app.services.set_progress_service import rebuild_set_progress
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute the per-user set progress summary from the collections (creates the table if missing)"
+    )
+    parser.add_argument("--user-id", type=int, help="Only rebuild this user's rows")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        SetProgress.__table__.create(db.engine, checkfirst=True)
+        rows = rebuild_set_progress(args.user_id)
+        # cached set progress responses carry both the user and the catalog version
+        if args.user_id is not None:
+            bump_user_version(args.user_id)
+        else:
+            bump_catalog_version()
+        db.session.commit()
+
+    target = f"user {args.user_id}" if args.user_id is not None else "all users"
+    print(f"Rebuilt {rows} set progress rows for {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from contextlib import contextmanager
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app import create_app
+from app.config import Config
+from app.db import db
+from app.models import Card, Collection, User
+from app.services.analytics_service import analytics_cache
+from app.services.cache_service import catalog_cache, user_cache
+from app.services.context_service import digest_cache
+from app.services.legality_service import legality_cache
+from app.services.facet_service import facet_index
+from app.services.price_service import snapshot_cache
+from app.services.search_service import search_index
+from app.services.set_progress_service import set_sizes_cache
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    JWT_SECRET_KEY = "test-secret-key-that-is-long-enough-for-hs256"
+    RATELIMIT_ENABLED = False
+
+
+@pytest.fixture
+def app():
+    # module-level caches are keyed by version counters, which restart with every test database
+    for cache in (catalog_cache, user_cache, digest_cache, legality_cache, analytics_cache, set_sizes_cache,
+                  snapshot_cache):
+        cache.clear()
+    search_index.built = False
+    facet_index.invalidate()
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username="ash", email="ash@pallet.town", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def seed_collection(app):
+    """Adds `count` catalog cards across two sets, all owned by `user`"""
+    def seed(user, count):
+        for i in range(count):
+            db.session.add(Card(
+                id=f"card-{i}",
+                name=f"Pokemon {i:03d}",
+                set_name="Base Set" if i % 2 else "Jungle",
+                rarity="Common" if i % 3 else "Rare Holo",
+            ))
+            db.session.add(Collection(user_id=user.id, card_id=f"card-{i}", quantity=i % 4 + 1))
+        db.session.commit()
+
+    return seed
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {"Authorization": create_access_token(identity=str(user.id))}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager counting the SQL statements run inside it"""
+    @contextmanager
+    def counter():
+        queries = QueryCounter()
+        event.listen(db.engine, "before_cursor_execute", queries)
+        try:
+            yield queries
+        finally:
+            event.remove(db.engine, "before_cursor_execute", queries)
+
+    return counter
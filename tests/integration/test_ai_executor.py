@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from app.services.ai_executor import AIExecutor, AIOverloadedError
+from app.services.ai_service import PokemonAIService
+from app.services.fake_model import FakeGenerativeModel
+
+
+@pytest.fixture
+def slow_model(app, tmp_path):
+    model = FakeGenerativeModel(chunk_delay=0.05)
+    app.extensions["ai_service"] = PokemonAIService(model=model)
+    app.extensions["ai_executor"] = AIExecutor(max_in_flight=1, max_queue=0, slot_dir=str(tmp_path))
+    app.config["CHAT_ANSWER_CACHE_ENABLED"] = False
+    return model
+
+
+def wait_until(condition, seconds=2.0):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def has_capacity(executor):
+    try:
+        executor.acquire().release()
+    except AIOverloadedError:
+        return False
+    return True
+
+
+def test_full_queue_is_rejected_with_retry_after(app, client, slow_model):
+    lease = app.extensions["ai_executor"].acquire()
+    response = client.post("/chat/ask", json={"question": "Is Shadowless rarer?"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/chat/ask/stream?question=Hi").status_code == 503
+
+    lease.release()
+    assert client.post("/chat/ask", json={"question": "Is Shadowless rarer?"}).status_code == 200
+
+
+def test_timeout_cancels_the_upstream_call_and_frees_capacity(app, client, slow_model):
+    app.config["AI_CALL_TIMEOUT"] = 0.1
+    response = client.post("/chat/ask", json={"question": "Which Eeveelution is best?"})
+    assert response.status_code == 504
+
+    # the pool thread stops at the next chunk, so its slot and the conversation are free again
+    assert wait_until(lambda: slow_model.streams[-1].cancelled)
+    executor = app.extensions["ai_executor"]
+    assert wait_until(lambda: has_capacity(executor))
+    app.config["AI_CALL_TIMEOUT"] = 5
+    response = client.post("/chat/ask", json={"question": "And the second best?"})
+    assert response.status_code == 200
+    # the cancelled question did not become part of the conversation
+    assert len(slow_model.calls[-1]["history"]) == 0
+
+
+def test_host_slots_are_shared_between_executors_and_released(tmp_path):
+    first = AIExecutor(max_in_flight=1, max_queue=4, slot_dir=str(tmp_path))
+    second = AIExecutor(max_in_flight=1, max_queue=4, slot_dir=str(tmp_path))
+
+    lease = first.acquire()
+    with pytest.raises(AIOverloadedError):
+        second.acquire()
+    lease.release()
+    second.acquire().release()
+
+    assert second.run(lambda cancel: "answer") == "answer"
+    first.acquire().release()
@@ -0,0 +1,50 @@
+import pytest
+from app.db import db
+from app.models import Card, Deck, DeckCard
+
+
+def test_deck_analytics_weighted_by_copies_and_cached(client, user, auth_headers, count_queries):
+    db.session.add_all([
+        Card(id="base1-58", name="Pikachu", set_name="Base Set", card_type="Pokémon", energy_type="Lightning",
+             evolution_stage="Basic", hp=40, retreat_cost=1, weakness="Fighting"),
+        Card(id="base1-14", name="Raichu", set_name="Base Set", card_type="Pokémon", energy_type="Lightning",
+             evolution_stage="Stage 1", hp=80, retreat_cost=1, weakness="Fighting"),
+        Card(id="base1-2", name="Blastoise", set_name="Base Set", card_type="Pokémon", energy_type="Water",
+             evolution_stage="Stage 2", hp=100, retreat_cost=3, weakness="Lightning"),
+        Card(id="base1-100", name="Lightning Energy", set_name="Base Set", card_type="Energy", evolution_stage="Basic"),
+    ])
+    deck = Deck(user_id=user.id, name="Sparks")
+    db.session.add(deck)
+    db.session.flush()
+    for card_id, quantity in (("base1-58", 4), ("base1-14", 2), ("base1-2", 2), ("base1-100", 52)):
+        db.session.add(DeckCard(deck_id=deck.id, card_id=card_id, quantity=quantity))
+    db.session.commit()
+
+    response = client.get(f"/deck/{deck.id}/analytics", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json
+    assert data["card_count"] == 60
+    assert data["energy_types"] == {"Lightning": 6, "Water": 2}
+    assert data["evolution_stages"] == {"Basic": 4, "Stage 1": 2, "Stage 2": 2}
+    assert data["hp"] == {"mean": 65.0, "median": 60.0}
+    assert data["retreat_cost"] == {"1": 6, "3": 2}
+    assert data["weakness"] == {"Fighting": {"copies": 6, "share": 0.75}, "Lightning": {"copies": 2, "share": 0.25}}
+    # 4 Basic Pokémon in 60 cards, 7 drawn: 1 - C(56, 7) / C(60, 7)
+    assert data["draw_odds"]["matching"] == 4
+    assert data["draw_odds"]["at_least_one"] == pytest.approx(0.39949, abs=1e-4)
+    assert sum(data["draw_odds"]["distribution"]) == pytest.approx(1.0)
+
+    with count_queries() as queries:
+        response = client.get(f"/deck/{deck.id}/analytics?name=raichu&draws=8", headers=auth_headers)
+    assert response.json["draw_odds"]["matching"] == 2
+    assert queries.count == 4
+
+    with count_queries() as queries:
+        client.get(f"/deck/{deck.id}/analytics?name=raichu&draws=8", headers=auth_headers)
+    # deck lookup, contents and catalog version; the statistics come from the cache
+    assert queries.count == 3
+
+    assert client.get(f"/deck/{deck.id}/analytics?draws=0", headers=auth_headers).status_code == 400
+    response = client.get(f"/deck/{deck.id}/analytics?draws=seven", headers=auth_headers)
+    assert (response.status_code, response.json) == (400, {"error": "draws must be an integer"})
+    assert client.get("/deck/999/analytics", headers=auth_headers).status_code == 404
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "scripts"))
+
+from benchmark_endpoints import compare, run_benchmarks, seed_database
+
+
+def test_benchmark_suite_runs_on_a_tiny_dataset(app):
+    seed_database("tiny")
+
+    results = run_benchmarks(app, iterations=5)
+
+    assert set(results) >= {"cards_page", "collection", "decks", "add_card_to_deck", "delete_collection", "delete_deck"}
+    assert all(metrics["errors"] == 0 for metrics in results.values())
+    # list endpoints stay a fixed number of queries whatever the data size
+    assert results["collection"]["queries_max"] == 2
+    assert results["collection_warm"]["queries_max"] == 1
+    assert results["decks"]["queries_max"] <= 3
+
+
+def test_compare_flags_slower_endpoints_and_extra_queries():
+    baseline = {"decks": {"p50_ms": 10.0, "p95_ms": 20.0, "queries_max": 3, "errors": 0}}
+    current = {"decks": {"p50_ms": 10.5, "p95_ms": 30.0, "queries_max": 4, "errors": 0}}
+
+    assert compare(current, baseline) == ["decks: p95_ms 20.0 -> 30.0", "decks: queries_max 3 -> 4"]
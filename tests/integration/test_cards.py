@@ -0,0 +1,57 @@
+import json
+
+from app.db import db
+from app.models import Card
+
+
+def seed_cards(count):
+    db.session.add_all([
+        Card(id=f"base1-{i:03d}", name=f"Card {i}", set_name="Base Set", hp=10 * i, attack_names=[f"Attack {i}"])
+        for i in range(count)
+    ])
+    db.session.commit()
+
+
+def test_cursor_pages_cover_the_catalog_once(client, auth_headers):
+    seed_cards(7)
+
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 3, "fields": "name,hp"}
+        if cursor:
+            query["cursor"] = cursor
+        data = client.get("/cards", query_string=query, headers=auth_headers).json
+        seen.extend(data["cards"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [card["id"] for card in seen] == [f"base1-{i:03d}" for i in range(7)]
+    # only the requested columns, plus the id
+    assert seen[0] == {"id": "base1-000", "name": "Card 0", "hp": 0}
+
+
+def test_unknown_fields_are_rejected(client, auth_headers):
+    response = client.get("/cards?fields=name,password_hash", headers=auth_headers)
+    assert response.status_code == 400
+    assert "password_hash" in response.json["error"]
+
+
+def test_streamed_document_is_valid_json(client, auth_headers):
+    seed_cards(5)
+
+    response = client.get("/cards?stream=true&fields=attack_names&cursor=base1-001", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = json.loads(response.get_data(as_text=True))
+    assert [card["id"] for card in data["cards"]] == ["base1-002", "base1-003", "base1-004"]
+    assert data["cards"][0] == {"id": "base1-002", "attack_names": ["Attack 2"]}
+    assert data["last_id"] == "base1-004"
+
+    etag = response.headers["ETag"]
+    repeat = client.get("/cards?stream=true&fields=attack_names&cursor=base1-001",
+                        headers={**auth_headers, "If-None-Match": etag})
+    assert repeat.status_code == 304
+
+    data = json.loads(client.get("/cards?stream=true&cursor=base1-004", headers=auth_headers).get_data(as_text=True))
+    assert data == {"cards": [], "last_id": None}
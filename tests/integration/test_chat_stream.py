@@ -0,0 +1,203 @@
+import json
+
+import pytest
+
+from app.db import db
+from app.models import Card, Collection, Deck, DeckCard
+from app.services.ai_executor import AIExecutor
+from app.services.ai_service import PokemonAIService
+from app.services.chat_sessions import ChatSessionManager, estimate_tokens
+from app.services.context_service import build_user_digest
+from app.services.fake_model import FakeGenerativeModel
+
+
+@pytest.fixture
+def fake_model(app):
+    model = FakeGenerativeModel()
+    app.extensions["ai_service"] = PokemonAIService(model=model)
+    return model
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+
+def test_stream_relays_chunks_as_sse(client, auth_headers, fake_model):
+    response = client.post("/chat/ask/stream", json={"question": "Best starter deck?"}, headers=auth_headers)
+
+    assert response.mimetype == "text/event-stream"
+    events = parse_events(response.get_data(as_text=True))
+    assert events[-1] == ("done", {})
+    text = "".join(data["text"] for event, data in events[:-1])
+    assert text == fake_model.reply("Best starter deck?")
+    assert len(events) > 2
+
+    # the finished answer becomes part of the conversation
+    client.post("/chat/ask", json={"question": "And a second one?"}, headers=auth_headers)
+    assert fake_model.calls[-1]["history"][-1]["parts"] == [text]
+
+
+def test_stream_requires_question(client, fake_model):
+    assert client.get("/chat/ask/stream").status_code == 400
+
+
+@pytest.mark.parametrize("payload", [{}, {"question": None}, {"question": 123}, {"question": {"a": 1}}, {"question": "  "}, []])
+@pytest.mark.parametrize("path", ["/chat/ask", "/chat/ask/stream"])
+def test_question_must_be_a_non_blank_string(client, fake_model, path, payload):
+    response = client.post(path, json=payload)
+    assert (response.status_code, response.get_json()) == (400, {"error": "Question is required"})
+    assert not fake_model.calls and not fake_model.streams
+
+
+def test_fake_model_keeps_only_recent_calls():
+    model = FakeGenerativeModel(keep=3)
+    for i in range(10):
+        list(model.start_chat().send_message(f"Question {i}", stream=True))
+    assert [call["content"] for call in model.calls] == ["Question 7", "Question 8", "Question 9"]
+    assert len(model.streams) == 3
+
+
+def test_closing_the_stream_cancels_upstream(app, fake_model):
+    service = app.extensions["ai_service"]
+    chunks = service.ask_question_stream("Is Base Set Charizard worth grading?")
+
+    next(chunks)
+    chunks.close()
+
+    assert fake_model.streams[-1].cancelled
+    assert len(service.default_session.turns) == 0
+
+
+def test_repeated_questions_are_answered_from_cache(app, fake_model):
+    first = app.test_client().post("/chat/ask", json={"question": "How many copies of a card can a deck have?"})
+    again = app.test_client().post("/chat/ask", json={"question": "how many copies of cards can a deck have"})
+    bypass = app.test_client().post("/chat/ask", json={"question": "How many copies of a card can a deck have?", "no_cache": True})
+
+    assert again.get_json() == {"response": first.get_json()["response"], "cached": True}
+    assert "cached" not in bypass.get_json()
+    assert len(fake_model.calls) == 2
+
+
+def test_negated_or_other_card_questions_miss_the_cache(app, fake_model):
+    ask = lambda question: app.test_client().post("/chat/ask", json={"question": question}).get_json()
+
+    ask("How many copies can a deck have?")
+    ask("Is Base Set Charizard worth grading?")
+    assert "cached" not in ask("how many copies can a deck not have")
+    assert "cached" not in ask("Is Base Set Charmeleon worth grading?")
+    # the same words in another order still match
+    assert ask("Is Charizard Base Set worth grading?")["cached"]
+    assert len(fake_model.calls) == 4
+
+
+def test_signed_in_questions_carry_a_cached_collection_digest(client, auth_headers, fake_model, count_queries):
+    db.session.add(Card(id="base1-4", name="Charizard", set_name="Base Set", energy_type="Fire", rarity="Rare Holo"))
+    db.session.commit()
+    client.post("/collection/create", json={"card_id": "base1-4", "quantity": 2}, headers=auth_headers)
+
+    client.post("/chat/ask", json={"question": "What should I build?"}, headers=auth_headers)
+    context = fake_model.calls[-1]["history"][0]["parts"][0]
+    assert "Collection: 2 cards, 1 unique" in context
+    assert "Charizard (Base Set) x2" in context
+
+    with count_queries() as queries:
+        client.post("/chat/ask", json={"question": "And after that?"}, headers=auth_headers)
+    # only the version lookup, the digest itself is cached
+    assert queries.count == 1
+    assert fake_model.calls[-1]["history"][0]["parts"][0] == context
+
+
+def test_signed_in_answers_are_cached_per_collection_digest(app, client, auth_headers, fake_model):
+    db.session.add(Card(id="base1-4", name="Charizard", set_name="Base Set", energy_type="Fire", rarity="Rare Holo"))
+    db.session.commit()
+    client.post("/collection/create", json={"card_id": "base1-4", "quantity": 1}, headers=auth_headers)
+    ask = lambda question, **extra: client.post(
+        "/chat/ask", json={"question": question, "chat_reset": True, **extra}, headers=auth_headers
+    ).get_json()
+
+    first = ask("Which deck suits my collection?")
+    assert ask("Which deck suits my collection?") == {"response": first["response"], "cached": True}
+    # a near duplicate is found through the LSH buckets
+    assert ask("Which deck suits my collections?")["cached"]
+    assert "cached" not in ask("Which deck suits my collection?", no_cache=True)
+    stats = app.extensions["answer_cache"].stats()
+    assert (stats["exact_hits"], stats["similar_hits"], stats["bypassed"]) == (1, 1, 1)
+
+    # a changed collection changes the digest, so the old answer no longer applies
+    client.post("/collection/create", json={"card_id": "base1-4", "quantity": 1}, headers=auth_headers)
+    assert "cached" not in ask("Which deck suits my collection?")
+    # and an anonymous user never sees answers given for someone's collection
+    assert "cached" not in app.test_client().post("/chat/ask", json={"question": "Which deck suits my collection?"}).get_json()
+    assert len(fake_model.calls) == 4
+
+
+def test_user_digest_text_and_budget(user):
+    db.session.add_all([
+        Card(id="base1-4", name="Charizard", set_name="Base Set", energy_type="Fire", rarity="Rare Holo"),
+        Card(id="jungle-60", name="Pikachu", set_name="Jungle", energy_type="Lightning", rarity="Common"),
+    ])
+    db.session.add_all([
+        Collection(user_id=user.id, card_id="base1-4", quantity=1),
+        Collection(user_id=user.id, card_id="jungle-60", quantity=3),
+    ])
+    deck = Deck(user_id=user.id, name="Sparks")
+    db.session.add(deck)
+    db.session.flush()
+    db.session.add(DeckCard(deck_id=deck.id, card_id="jungle-60", quantity=3))
+    db.session.commit()
+
+    assert build_user_digest(user.id).split("\n") == [
+        "Collection: 4 cards, 2 unique",
+        "By set: Jungle 3, Base Set 1",
+        "By energy type: Lightning 3, Fire 1",
+        "By rarity: Common 3, Rare Holo 1",
+        "Top cards: Pikachu (Jungle) x3, Charizard (Base Set) x1",
+        "Decks: 1",
+        "- Sparks (3 cards): 3x Pikachu",
+    ]
+    for budget in range(4, 60):
+        digest = build_user_digest(user.id, budget)
+        assert estimate_tokens(digest) <= budget
+        assert digest.endswith("(truncated)") or digest.endswith("3x Pikachu")
+    assert build_user_digest(user.id, 12).split("\n") == ["Collection: 4 cards, 2 unique", "(truncated)"]
+
+
+def test_client_disconnect_cancels_the_stream_and_frees_capacity(app, client, tmp_path):
+    model = FakeGenerativeModel(chunk_delay=0.01)
+    app.extensions["ai_service"] = PokemonAIService(model=model)
+    executor = app.extensions["ai_executor"] = AIExecutor(max_in_flight=1, max_queue=0, slot_dir=str(tmp_path))
+
+    response = client.post("/chat/ask/stream", json={"question": "Is Jungle worth opening?"}, buffered=False)
+    first = next(response.response)
+    assert first.startswith(b"data: ")
+    # the stream holds the only slot while it is open
+    assert client.post("/chat/ask/stream", json={"question": "Hello?"}).status_code == 503
+
+    # what the server does when the client goes away
+    response.close()
+    assert model.streams[-1].cancelled
+    executor.acquire().release()
+    # the unfinished answer is not part of the conversation
+    client.post("/chat/ask", json={"question": "Then what should I open?"})
+    assert model.calls[-1]["history"] == []
+
+
+def test_stream_on_a_busy_conversation_reports_an_error(app, client, user, auth_headers, fake_model):
+    app.config["AI_CALL_TIMEOUT"] = 0.1
+    sessions = app.extensions["chat_sessions"] = ChatSessionManager.from_config(app.config)
+    session = sessions.get(f"user:{user.id}")
+    with session.lock:
+        response = client.post("/chat/ask/stream", json={"question": "Best starter deck?"}, headers=auth_headers)
+        events = parse_events(response.get_data(as_text=True))
+
+    assert events == [("error", {"message": "The conversation is busy with another question"})]
+    assert not fake_model.streams
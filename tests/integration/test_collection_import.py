@@ -0,0 +1,96 @@
+import json
+
+from app.db import db
+from app.models import Card, Collection
+
+
+def seed_cards():
+    db.session.add_all([
+        Card(id="base1-4", name="Charizard", set_name="Base Set"),
+        Card(id="base1-58", name="Pikachu", set_name="Base Set"),
+    ])
+    db.session.commit()
+
+
+def owned(user):
+    return sorted(
+        (row.card_id, row.card_condition, row.quantity)
+        for row in db.session.query(Collection).filter_by(user_id=user.id)
+    )
+
+
+def import_ndjson(client, auth_headers, records):
+    body = "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records) + "\n"
+    return client.post("/collection/import", data=body, content_type="application/x-ndjson", headers=auth_headers)
+
+
+def test_ndjson_lines_fail_alone(client, user, auth_headers):
+    seed_cards()
+    response = import_ndjson(client, auth_headers, [
+        {"card_id": "base1-4", "quantity": 2},
+        '{"card_id": "base1-58", ',
+        {"card_id": "base1-58", "quantity": 1.7},
+        {"card_id": "base1-58", "quantity": True},
+        {"card_id": "base1-58", "quantity": 0},
+        {"card_id": ["base1-58"]},
+        {"card_id": "base1-58", "condition": "Mint-ish"},
+        {"card_id": "nope-1"},
+        [1, 2],
+        {"card_id": "base1-58", "quantity": "3", "condition": "Lightly Played"},
+    ])
+
+    assert response.status_code == 200
+    report = response.json
+    assert (report["lines"], report["created"], report["updated"], report["failed"]) == (10, 2, 0, 8)
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4, 5, 6, 7, 8, 9]
+    assert report["errors"][1]["error"] == "Quantity must be a whole number"
+    assert report["errors"][4]["error"] == "card_id must be a string"
+    assert report["errors"][6]["error"] == "Card with id 'nope-1' not found."
+    assert owned(user) == [("base1-4", "Near Mint", 2), ("base1-58", "Lightly Played", 3)]
+
+
+def test_rows_merge_by_card_and_condition(client, user, auth_headers):
+    seed_cards()
+    client.post("/collection/create", json={"card_id": "base1-4", "quantity": 1}, headers=auth_headers)
+
+    report = import_ndjson(client, auth_headers, [
+        {"card_id": "base1-4", "quantity": 2},
+        {"card_id": "base1-4", "quantity": 3, "condition": "Lightly Played"},
+        {"card_id": "base1-4", "condition": "Lightly Played"},
+        {"card_id": "base1-58"},
+    ]).json
+
+    # base1-4 Near Mint existed; base1-4 Played and base1-58 are new
+    assert (report["created"], report["updated"], report["failed"]) == (2, 1, 0)
+    assert owned(user) == [("base1-4", "Lightly Played", 4), ("base1-4", "Near Mint", 3), ("base1-58", "Near Mint", 1)]
+
+    report = import_ndjson(client, auth_headers, [{"card_id": "base1-58", "quantity": 2}]).json
+    assert (report["created"], report["updated"]) == (0, 1)
+    assert owned(user)[-1] == ("base1-58", "Near Mint", 3)
+
+
+def test_csv_import_reports_bad_rows(client, user, auth_headers):
+    seed_cards()
+    body = "\n".join([
+        "card_id,quantity,condition",
+        "base1-4,2,Lightly Played",
+        "base1-58,,",
+        'base1-58,"' + "x" * 200_000 + '",',
+        "base1-58,1.5,",
+        "base1-58,4,Near Mint",
+    ]) + "\n"
+
+    response = client.post("/collection/import?format=csv", data=body, content_type="text/plain", headers=auth_headers)
+    assert response.status_code == 200
+    report = response.json
+    assert (report["lines"], report["created"], report["updated"], report["failed"]) == (5, 2, 0, 2)
+    assert [error["line"] for error in report["errors"]] == [4, 5]
+    assert report["errors"][0]["error"].startswith("Invalid CSV")
+    assert owned(user) == [("base1-4", "Lightly Played", 2), ("base1-58", "Near Mint", 5)]
+
+
+def test_import_rejects_unknown_format_and_bad_header(client, user, auth_headers):
+    assert client.post("/collection/import", data="x", content_type="text/plain", headers=auth_headers).status_code == 400
+    response = client.post("/collection/import", data="id,quantity\nbase1-4,1\n", content_type="text/csv",
+                           headers=auth_headers)
+    assert (response.status_code, response.json) == (400, {"error": "CSV header must include a card_id column"})
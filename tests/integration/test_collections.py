@@ -0,0 +1,38 @@
+def test_collection_is_a_single_query(client, user, auth_headers, count_queries, seed_collection):
+    seed_collection(user, 50)
+
+    with count_queries() as queries:
+        response = client.get("/collection?limit=1000", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(response.json["collections"]) == 50
+    # cache version lookup plus one joined page query, regardless of collection size
+    assert queries.count == 2
+
+    with count_queries() as queries:
+        client.get("/collection?limit=1000", headers=auth_headers)
+    # served from the response cache
+    assert queries.count == 1
+
+
+def test_collection_sort_filter_and_paginate(client, user, auth_headers, seed_collection):
+    seed_collection(user, 30)
+
+    response = client.get(
+        "/collection?set_name=Base Set&sort=name&order=desc&limit=5",
+        headers=auth_headers
+    )
+    data = response.json
+    names = [c["card_name"] for c in data["collections"]]
+    assert names == sorted(names, reverse=True)
+    assert all(c["set_name"] == "Base Set" for c in data["collections"])
+    assert data["next_offset"] == 5
+
+    response = client.get("/collection?set_name=Base Set&limit=5&offset=10", headers=auth_headers)
+    assert len(response.json["collections"]) == 5
+    assert response.json["next_offset"] is None
+
+
+def test_collection_rejects_unknown_sort(client, auth_headers):
+    response = client.get("/collection?sort=price", headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,128 @@
+from sqlalchemy import event
+
+from app.db import db
+from app.models import Card, Collection, Deck, DeckCard, User
+
+
+def test_deck_list_pages_with_counts_and_next_offset(client, user, auth_headers):
+    other = User(username="gary", email="gary@pallet.town", password_hash="x")
+    db.session.add_all([
+        other,
+        Card(id="base1-58", name="Pikachu", set_name="Base Set", energy_type="Lightning"),
+        Card(id="base1-7", name="Hitmonchan", set_name="Base Set", energy_type="Fighting"),
+    ])
+    db.session.flush()
+    for i in range(5):
+        deck = Deck(user_id=user.id, name=f"Deck {i}")
+        db.session.add(deck)
+        db.session.flush()
+        db.session.add(DeckCard(deck_id=deck.id, card_id="base1-58", quantity=i + 1))
+    rival = Deck(user_id=other.id, name="Rival")
+    db.session.add(rival)
+    db.session.flush()
+    db.session.add(DeckCard(deck_id=rival.id, card_id="base1-7", quantity=4))
+    db.session.commit()
+
+    headers = {**auth_headers, "Origin": "https://example.com"}
+    response = client.get("/deck?limit=2&offset=2", headers=headers)
+    assert response.status_code == 200
+    assert [deck["name"] for deck in response.json] == ["Deck 2", "Deck 3"]
+    assert [deck["card_count"] for deck in response.json] == [3, 4]
+    assert response.json[0]["energy_types"] == {"Lightning": 3}
+    assert response.headers["X-Next-Offset"] == "4"
+    # browsers only let scripts read headers listed here
+    assert "X-Next-Offset" in response.headers["Access-Control-Expose-Headers"]
+
+    response = client.get("/deck?limit=2&offset=4", headers=auth_headers)
+    assert [deck["name"] for deck in response.json] == ["Deck 4"]
+    assert "X-Next-Offset" not in response.headers
+
+    assert client.get("/deck?offset=-1", headers=auth_headers).status_code == 400
+
+
+def seed_batch_deck(user, owned, in_deck):
+    db.session.add_all([
+        Card(id="base1-58", name="Pikachu", set_name="Base Set"),
+        Card(id="base1-14", name="Raichu", set_name="Base Set"),
+        Card(id="base1-4", name="Charizard", set_name="Base Set"),
+    ])
+    deck = Deck(user_id=user.id, name="Sparks")
+    db.session.add(deck)
+    db.session.flush()
+    for card_id, quantity in owned.items():
+        db.session.add(Collection(user_id=user.id, card_id=card_id, quantity=quantity))
+    for card_id, quantity in in_deck.items():
+        db.session.add(DeckCard(deck_id=deck.id, card_id=card_id, quantity=quantity))
+    db.session.commit()
+    return deck
+
+
+def deck_contents(deck):
+    return {row.card_id: row.quantity for row in db.session.query(DeckCard).filter_by(deck_id=deck.id)}
+
+
+def test_batch_edit_add_remove_set(client, user, auth_headers):
+    deck = seed_batch_deck(user, {"base1-58": 4, "base1-14": 3, "base1-4": 2}, {"base1-58": 2, "base1-4": 2})
+    response = client.post(f"/deck/{deck.id}/cards/batch", json={"operations": [
+        {"op": "add", "card_id": "base1-58", "quantity": 2},
+        {"op": "remove", "card_id": "base1-58"},
+        {"op": "add", "card_id": "base1-58"},
+        {"op": "add", "card_id": "base1-14", "quantity": 3},
+        {"op": "remove", "card_id": "base1-14", "quantity": 1},
+        {"op": "set", "card_id": "base1-4", "quantity": 0},
+    ]}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json["cards"] == {"base1-58": 1, "base1-14": 2, "base1-4": 0}
+    assert deck_contents(deck) == {"base1-58": 1, "base1-14": 2}
+
+
+def test_rejected_batch_writes_nothing(client, user, auth_headers):
+    deck = seed_batch_deck(user, {"base1-58": 4, "base1-14": 1}, {"base1-58": 2})
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement.split()[0].upper())
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = client.post(f"/deck/{deck.id}/cards/batch", json={"operations": [
+            {"op": "add", "card_id": "base1-58", "quantity": 1},
+            {"op": "remove", "card_id": "base1-58", "quantity": 5},
+            {"op": "add", "card_id": "base1-14", "quantity": 2},
+            {"op": "set", "card_id": "base1-4", "quantity": 1},
+        ]}, headers=auth_headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert response.status_code == 400
+    assert response.json["errors"] == [
+        {"index": 1, "card_id": "base1-58", "error": "Cannot remove more copies than are in the deck"},
+        {"index": 2, "card_id": "base1-14", "error": "Not enough cards in your collection"},
+        {"index": 3, "card_id": "base1-4", "error": "Card not in your collection"},
+    ]
+    assert set(statements) == {"SELECT"}
+    assert deck_contents(deck) == {"base1-58": 2}
+
+    response = client.post(f"/deck/{deck.id}/cards/batch", json={"operations": [
+        {"op": "add", "card_id": ["base1-58"]},
+        {"op": "swap", "card_id": "base1-58"},
+        {"op": "set", "card_id": "base1-58"},
+    ]}, headers=auth_headers)
+    assert [error["error"] for error in response.json["errors"]] == [
+        "card_id must be a string", "op must be one of: add, remove, set", "quantity is required for set"
+    ]
+    assert deck_contents(deck) == {"base1-58": 2}
+
+
+def test_copies_can_be_taken_out_after_the_collection_shrank(client, user, auth_headers):
+    deck = seed_batch_deck(user, {"base1-58": 1}, {"base1-58": 4, "base1-14": 2})
+    edit = lambda *operations: client.post(
+        f"/deck/{deck.id}/cards/batch", json={"operations": list(operations)}, headers=auth_headers
+    )
+
+    assert edit({"op": "remove", "card_id": "base1-58", "quantity": 1}).status_code == 200
+    assert edit({"op": "set", "card_id": "base1-58", "quantity": 2}).status_code == 200
+    assert edit({"op": "remove", "card_id": "base1-14"}).status_code == 200
+    assert deck_contents(deck) == {"base1-58": 2}
+    # going back up is still limited by the collection
+    assert edit({"op": "add", "card_id": "base1-58"}).json["errors"] == [
+        {"index": 0, "card_id": "base1-58", "error": "Not enough cards in your collection"}
+    ]
@@ -0,0 +1,45 @@
+from app.db import db
+from app.models import Card
+
+
+def seed_cards():
+    db.session.add_all([
+        Card(id="base1-4", name="Charizard", set_name="Base Set", rarity="Rare Holo", energy_type="Fire", hp=120, retreat_cost=3),
+        Card(id="base1-46", name="Charmander", set_name="Base Set", rarity="Common", energy_type="Fire", hp=50, retreat_cost=1),
+        Card(id="base1-63", name="Squirtle", set_name="Base Set", rarity="Common", energy_type="Water", hp=40, retreat_cost=1),
+        Card(id="base1-58", name="Pikachu", set_name="Base Set", rarity="Common", energy_type="Lightning", hp=40, retreat_cost=1),
+        Card(id="fossil-5", name="Magmar", set_name="Fossil", rarity="Uncommon", energy_type="Fire", hp=70, retreat_cost=2),
+        Card(id="base1-91", name="Bill", set_name="Base Set", rarity="Common", card_type="Trainer"),
+    ])
+    db.session.commit()
+
+
+def test_values_of_one_dimension_are_ored_and_dimensions_anded(client, auth_headers):
+    seed_cards()
+
+    data = client.get("/cards/filter?energy_type=Fire&energy_type=Water&set_name=Base Set", headers=auth_headers).json
+    assert [card["id"] for card in data["cards"]] == ["base1-4", "base1-46", "base1-63"]
+    assert data["total"] == 3
+    # a dimension's counts ignore its own filter, so they show what each alternative would give
+    assert data["facets"]["energy_type"] == {"Fire": 2, "Water": 1, "Lightning": 1}
+    assert data["facets"]["set_name"] == {"Base Set": 3, "Fossil": 1}
+    assert data["facets"]["rarity"] == {"Rare Holo": 1, "Common": 2}
+    assert data["facets"]["hp"] == {"120": 1, "50": 1, "40": 1}
+
+
+def test_range_filters_and_paging(client, auth_headers):
+    seed_cards()
+
+    data = client.get("/cards/filter?hp_min=50&hp_max=100", headers=auth_headers).json
+    assert [card["id"] for card in data["cards"]] == ["base1-46", "fossil-5"]
+    data = client.get("/cards/filter?retreat_cost_min=2", headers=auth_headers).json
+    assert [card["id"] for card in data["cards"]] == ["base1-4", "fossil-5"]
+    data = client.get("/cards/filter?hp=40", headers=auth_headers).json
+    assert data["total"] == 2
+
+    data = client.get("/cards/filter?limit=2&offset=3", headers=auth_headers).json
+    assert [card["id"] for card in data["cards"]] == ["base1-63", "base1-91"]
+    assert data["total"] == 6
+
+    assert client.get("/cards/filter?hp=40&hp_min=10", headers=auth_headers).status_code == 400
+    assert client.get("/cards/filter?hp=lots", headers=auth_headers).status_code == 400
@@ -0,0 +1,96 @@
+import io
+import json
+
+import pytest
+from app.db import db
+from app.models import Card
+from app.services import ingest_service
+from app.services.ingest_service import ingest_cards, iter_json_array
+
+
+def card(i, **extra):
+    return {"id": f"base1-{i}", "name": f"Card {i}", "set_name": "Base Set", **extra}
+
+
+def test_json_array_is_parsed_across_read_boundaries(monkeypatch):
+    monkeypatch.setattr(ingest_service, "READ_SIZE", 7)
+    cards = [card(i, description='brackets ] and, commas [ "quoted"', attacks=[{"name": "Zap"}]) for i in range(20)]
+    text = "  \n[" + ",\n ".join(json.dumps(c) for c in cards) + "\n]\n"
+
+    assert list(iter_json_array(io.StringIO(text))) == cards
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text[:-4])))
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('{"id": "base1-1"}')))
+
+
+def test_malformed_json_array_elements_fail_alone(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_service, "READ_SIZE", 7)
+    path = tmp_path / "cards.json"
+    path.write_text("[" + ",\n".join([
+        json.dumps(card(1)),
+        '{"id": "base1-2", "name": "Bad, \\"quoted\\" [name]" "set_name": "Base Set"}',
+        '{"id": "base1-3", "name": "Extra"} garbage',
+        json.dumps(card(4)),
+    ]) + "]")
+
+    stats = ingest_cards(str(path), log=lambda message: None)
+    assert (stats["records"], stats["upserted"], stats["failed"]) == (4, 2, 2)
+    assert [error["record"] for error in stats["errors"]] == [2, 3]
+    assert sorted(c.id for c in db.session.query(Card)) == ["base1-1", "base1-4"]
+
+    # an oversized (or never closed) element stops the load instead of buffering the rest of the file
+    monkeypatch.setattr(ingest_service, "MAX_RECORD_SIZE", 100)
+    oversized = '[{"id": "base1-1"}, {"name": "' + "x" * 1000 + '"}]'
+    records = iter_json_array(io.StringIO(oversized))
+    assert next(records) == {"id": "base1-1"}
+    with pytest.raises(ValueError, match="longer than 100"):
+        next(records)
+    assert list(iter_json_array(io.StringIO("[12345, 678]"))) == [12345, 678]
+
+
+def test_bad_ndjson_records_fail_alone(app, tmp_path):
+    path = tmp_path / "cards.ndjson"
+    path.write_text("\n".join([
+        json.dumps(card(1)),
+        '{"id": "base1-2", "name": ',
+        "[1, 2]",
+        json.dumps({"id": "base1-3", "name": "No set"}),
+        json.dumps(card(4, hp="sixty")),
+        json.dumps(card(5, attacks=["Zap", {"name": "Thunder"}])),
+    ]) + "\n")
+
+    stats = ingest_cards(str(path), log=lambda message: None)
+    assert (stats["records"], stats["upserted"], stats["failed"]) == (6, 2, 4)
+    assert [error["record"] for error in stats["errors"]] == [2, 3, 4, 5]
+    assert db.session.get(Card, "base1-5").attack_names == ["Thunder"]
+
+
+def test_interrupted_ingest_resumes_from_checkpoint(app, tmp_path, monkeypatch):
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps([card(i) for i in range(1, 6)]))
+    checkpoint = str(tmp_path / "cards.checkpoint")
+
+    upsert = ingest_service.upsert_cards
+    calls = []
+
+    def failing_upsert(rows):
+        calls.append([row["id"] for row in rows])
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        upsert(rows)
+
+    monkeypatch.setattr(ingest_service, "upsert_cards", failing_upsert)
+    with pytest.raises(RuntimeError):
+        ingest_cards(str(path), chunk_size=2, checkpoint_path=checkpoint, log=lambda message: None)
+    db.session.rollback()
+    assert json.loads((tmp_path / "cards.checkpoint").read_text())["records"] == 2
+
+    messages = []
+    stats = ingest_cards(str(path), chunk_size=2, checkpoint_path=checkpoint, log=messages.append)
+    assert messages[0] == "Resuming after 2 records"
+    assert calls[2:] == [["base1-3", "base1-4"], ["base1-5"]]
+    assert (stats["records"], stats["upserted"]) == (5, 3)
+    assert db.session.query(Card).count() == 5
+    # a finished run removes its checkpoint
+    assert not (tmp_path / "cards.checkpoint").exists()
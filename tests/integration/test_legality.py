@@ -0,0 +1,69 @@
+from app.db import db
+from app.models import Card, Collection, Deck, DeckCard
+
+
+def seed_deck(user, name, entries):
+    deck = Deck(user_id=user.id, name=name)
+    db.session.add(deck)
+    db.session.flush()
+    for card_id, quantity in entries:
+        db.session.add(DeckCard(deck_id=deck.id, card_id=card_id, quantity=quantity))
+    db.session.commit()
+    return deck
+
+
+def test_all_decks_validated_in_one_request(client, user, auth_headers, count_queries):
+    db.session.add_all([
+        Card(id="base1-58", name="Pikachu", set_name="Base Set", card_type="Pokémon", evolution_stage="Basic"),
+        Card(id="jungle-60", name="Pikachu", set_name="Jungle", card_type="Pokémon", evolution_stage="Basic"),
+        Card(id="base1-4", name="Charizard", set_name="Base Set", card_type="Pokémon", evolution_stage="Stage 2"),
+        Card(id="base1-100", name="Lightning Energy", set_name="Base Set", card_type="Energy", evolution_stage="Basic"),
+        Card(id="base1-91", name="Bill", set_name="Base Set", card_type="Trainer"),
+    ])
+    legal = seed_deck(user, "Legal", [("base1-58", 4), ("base1-91", 4), ("base1-100", 52)])
+    illegal = seed_deck(user, "Illegal", [("base1-58", 3), ("jungle-60", 2), ("base1-4", 4)])
+    no_basics = seed_deck(user, "No basics", [("base1-4", 4), ("base1-100", 56)])
+
+    with count_queries() as queries:
+        response = client.get("/deck/legality", headers=auth_headers)
+    assert response.status_code == 200
+    # one version lookup, the decks with their contents and one grouped query for all decks
+    assert queries.count == 3
+    results = {r["deck_id"]: r for r in response.json}
+
+    assert results[legal.id] == {"deck_id": legal.id, "legal": True, "card_count": 60, "violations": []}
+    assert [(v["rule"], v.get("card_name"), v["actual"]) for v in results[illegal.id]["violations"]] == [
+        ("deck_size", None, 9), ("max_copies", "Pikachu", 5)
+    ]
+    assert [v["rule"] for v in results[no_basics.id]["violations"]] == ["basic_pokemon"]
+
+    # a deck edit changes its contents, so the result is recomputed
+    db.session.add(Collection(user_id=user.id, card_id="base1-100", quantity=60))
+    db.session.commit()
+    response = client.post(f"/deck/{legal.id}/cards/batch", headers=auth_headers,
+                           json={"operations": [{"op": "remove", "card_id": "base1-100", "quantity": 1}]})
+    assert response.status_code == 200
+    response = client.get(f"/deck/{legal.id}/legality", headers=auth_headers)
+    assert response.json["legal"] is False
+    assert response.json["violations"][0]["rule"] == "deck_size"
+
+    response = client.get("/deck/999/legality", headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_collection_writes_keep_cached_results(client, user, auth_headers, count_queries):
+    db.session.add_all([
+        Card(id="base1-58", name="Pikachu", set_name="Base Set", card_type="Pokémon", evolution_stage="Basic"),
+        Card(id="base1-100", name="Lightning Energy", set_name="Base Set", card_type="Energy", evolution_stage="Basic"),
+    ])
+    deck = seed_deck(user, "Sparks", [("base1-58", 4), ("base1-100", 56)])
+    client.get(f"/deck/{deck.id}/legality", headers=auth_headers)
+
+    client.post("/collection/create", json={"card_id": "base1-58"}, headers=auth_headers)
+    copy = seed_deck(user, "Sparks copy", [("base1-58", 4), ("base1-100", 56)])
+    with count_queries() as queries:
+        response = client.get("/deck/legality", headers=auth_headers)
+    # legality only depends on the contents, so neither the collection write nor the
+    # identical second deck needs the grouped query
+    assert queries.count == 2
+    assert [(r["deck_id"], r["legal"]) for r in response.json] == [(deck.id, True), (copy.id, True)]
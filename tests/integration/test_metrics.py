@@ -0,0 +1,34 @@
+from app.services.metrics_service import redact_sql
+
+
+def test_metrics_record_latency_queries_and_size_per_endpoint(client, user, auth_headers, seed_collection):
+    seed_collection(user, 10)
+
+    response = client.get("/collection?limit=5", headers=auth_headers)
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]
+    client.get("/collection?limit=7", headers=auth_headers)
+
+    body = client.get("/metrics").get_data(as_text=True)
+    labels = 'method="GET",endpoint="/collection",status="2xx"'
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in body
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in body
+    assert f"http_request_queries_total{{{labels}}} 4" in body
+    assert 'cache_misses_total{cache="user"}' in body
+
+
+def test_slow_query_log_redacts_literals():
+    statement = "SELECT * FROM users WHERE email = 'ash@pallet.town' AND id = 25 LIMIT ?"
+
+    assert redact_sql(statement) == "SELECT * FROM users WHERE email = ? AND id = ? LIMIT ?"
+
+
+def test_metrics_are_limited_to_loopback_or_a_token(app, client):
+    remote = {"REMOTE_ADDR": "203.0.113.9"}
+    assert client.get("/metrics").status_code == 200
+    assert client.get("/metrics", environ_base=remote).status_code == 403
+
+    app.config["METRICS_TOKEN"] = "scrape-secret"
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
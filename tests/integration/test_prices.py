@@ -0,0 +1,95 @@
+import io
+import time
+from datetime import date, timedelta
+
+import pytest
+from app.db import db
+from app.models import Card, Collection, PriceKey
+from app.services.cache_service import LRUCache
+from app.services.price_service import ingest_price_snapshot, store_snapshot
+
+
+def csv(text):
+    return io.StringIO(text)
+
+
+def test_collection_value_by_condition_with_forward_fill(client, user, auth_headers):
+    db.session.add_all([
+        Card(id="base1-4", name="Charizard", set_name="Base Set"),
+        Card(id="base1-58", name="Pikachu", set_name="Base Set"),
+        Card(id="base1-91", name="Bill", set_name="Base Set"),
+    ])
+    db.session.add_all([
+        Collection(user_id=user.id, card_id="base1-4", quantity=1, card_condition="Near Mint"),
+        Collection(user_id=user.id, card_id="base1-58", quantity=3, card_condition="Lightly Played"),
+        Collection(user_id=user.id, card_id="base1-91", quantity=2, card_condition="Near Mint"),
+    ])
+    db.session.commit()
+
+    stats = ingest_price_snapshot(csv(
+        "card_id,condition,price\n"
+        "base1-4,Near Mint,300\n"
+        "base1-58,Lightly Played,2.5\n"
+        "base1-58,Lightly Played,2\n"
+        "base1-58,Mint,9\n"
+        "base9-1,Near Mint,1\n"
+    ), date(2025, 3, 1))
+    assert (stats["prices"], stats["unknown_cards"], stats["failed"]) == (2, 1, 1)
+    # Pikachu is missing from the second day and keeps its last price
+    ingest_price_snapshot(csv("card_id,price\nbase1-4,320\n"), date(2025, 3, 3))
+
+    data = client.get("/collection/value?date=2025-03-02", headers=auth_headers).json
+    assert data["total"] == 306.0
+    assert data["by_condition"] == {"Lightly Played": 6.0, "Near Mint": 300.0}
+    assert (data["price_date"], data["priced_copies"], data["unpriced_copies"]) == ("2025-03-01", 4, 2)
+
+    data = client.get("/collection/value/history?start=2025-03-02&end=2025-03-31", headers=auth_headers).json
+    assert data["points"] == [
+        {"date": "2025-03-03", "total": 326.0, "by_condition": {"Lightly Played": 6.0, "Near Mint": 320.0}}
+    ]
+
+    # re-ingesting a day replaces it and invalidates cached valuations
+    ingest_price_snapshot(csv("card_id,price\nbase1-4,310\nbase1-91,0.5\n"), date(2025, 3, 3))
+    data = client.get("/collection/value/history?start=2025-03-02&end=2025-03-31", headers=auth_headers).json
+    assert data["points"][0]["total"] == 317.0
+
+    assert client.get("/collection/value?date=2025-02-30", headers=auth_headers).status_code == 400
+    response = client.get("/collection/value/history?start=2025-03-02&end=2025-03-01", headers=auth_headers)
+    assert response.status_code == 400
+    with pytest.raises(ValueError):
+        ingest_price_snapshot(csv("name,price\nPikachu,1\n"), date(2025, 3, 4))
+
+
+def test_snapshot_cache_is_bounded_by_bytes():
+    import numpy as np
+
+    cache = LRUCache(max_entries=512, max_bytes=1000, sizeof=lambda arrays: sum(a.nbytes for a in arrays))
+    day = lambda n: (np.zeros(n, dtype="<i4"), np.zeros(n, dtype="<f4"))
+    for i in range(4):
+        cache.set(i, day(50))
+    # 400 bytes each, so only the last two fit
+    assert [cache.get(i) is not None for i in range(4)] == [False, False, True, True]
+    assert cache.stats()["bytes"] == 800
+    cache.set("huge", day(200))
+    assert cache.get("huge") is None and cache.stats()["bytes"] == 800
+
+
+def test_year_of_history_for_a_large_collection_is_fast(client, user, auth_headers):
+    cards = 10_000
+    db.session.add_all([Card(id=f"set-{i}", name=f"Card {i}", set_name="Set") for i in range(cards)])
+    db.session.add_all([PriceKey(id=i + 1, card_id=f"set-{i}", card_condition="Near Mint") for i in range(cards)])
+    db.session.add_all([Collection(user_id=user.id, card_id=f"set-{i}", quantity=1) for i in range(cards)])
+    start = date(2025, 1, 1)
+    key_ids = list(range(1, cards + 1))
+    for day in range(365):
+        store_snapshot(start + timedelta(days=day), key_ids, [1 + day / 100] * cards)
+    db.session.commit()
+
+    began = time.perf_counter()
+    response = client.get("/collection/value/history?start=2025-01-01&end=2025-12-31", headers=auth_headers)
+    elapsed = time.perf_counter() - began
+    assert response.status_code == 200
+    points = response.json["points"]
+    assert len(points) == 365
+    assert points[-1]["total"] == pytest.approx(cards * 4.64, rel=1e-5)
+    assert elapsed < 1.0
@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.db import db
+from app.services.rate_limit_service import SQLiteStorage
+from conftest import TestConfig
+
+
+def acquire_many(uri, attempts):
+    storage = SQLiteStorage(uri)
+    return sum(storage.acquire_sliding_window_entry("shared", limit=100, expiry=60) for _ in range(attempts))
+
+
+def test_sqlite_storage_is_shared_by_worker_processes(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'ratelimit.db'}"
+
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        granted = sum(pool.map(acquire_many, [uri] * 4, [50] * 4))
+
+    # 200 attempts across 4 processes, exactly the limit gets through
+    assert granted == 100
+    assert SQLiteStorage(uri).get_sliding_window("shared", 60)[2] == 100
+
+
+@pytest.fixture
+def limited_app(tmp_path):
+    class LimitedConfig(TestConfig):
+        RATELIMIT_ENABLED = True
+        RATELIMIT_STORAGE_URI = f"sqlite:///{tmp_path / 'ratelimit.db'}"
+        RATELIMIT_ROUTE_LIMITS = {"collections": "2 per minute", "cards": "50 per minute"}
+
+    app = create_app(LimitedConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_route_limits_apply_per_jwt_identity(limited_app):
+    client = limited_app.test_client()
+    ash = {"Authorization": create_access_token(identity="1")}
+    misty = {"Authorization": create_access_token(identity="2")}
+
+    statuses = [client.get("/collection", headers=ash).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    # another user from the same address has their own budget
+    assert client.get("/collection", headers=misty).status_code == 200
+    # and other blueprints have theirs
+    assert client.get("/cards", headers=ash).status_code == 200
@@ -0,0 +1,35 @@
+from app.db import db
+from app.models import Card
+
+
+def test_catalog_etag_changes_with_catalog_writes(client, auth_headers):
+    db.session.add_all([
+        Card(id="base1-4", name="Charizard", set_name="Base Set"),
+        Card(id="base1-58", name="Pikachu", set_name="Base Set"),
+    ])
+    db.session.commit()
+
+    etag = client.get("/cards", headers=auth_headers).headers["ETag"]
+    assert client.get("/cards", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+    # query arguments are part of the tag
+    assert client.get("/cards?limit=1", headers=auth_headers).headers["ETag"] != etag
+
+    assert client.delete("/cards/base1-58", headers=auth_headers).status_code == 200
+    response = client.get("/cards", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [card["id"] for card in response.json["cards"]] == ["base1-4"]
+
+
+def test_user_etag_changes_with_the_users_writes(client, auth_headers):
+    db.session.add(Card(id="base1-4", name="Charizard", set_name="Base Set"))
+    db.session.commit()
+
+    etag = client.get("/collection", headers=auth_headers).headers["ETag"]
+    assert client.get("/collection", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+    client.post("/collection/create", json={"card_id": "base1-4"}, headers=auth_headers)
+    response = client.get("/collection", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [entry["card_id"] for entry in response.json["collections"]] == ["base1-4"]
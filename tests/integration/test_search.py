@@ -0,0 +1,51 @@
+from app.db import db
+from app.models import Card
+from app.services.search_service import tokenize
+
+
+def seed_cards():
+    db.session.add_all([
+        Card(id="base1-4", name="Charizard", set_name="Base Set", attack_names=["Fire Spin"],
+             description="Spits fire that is hot enough to melt boulders."),
+        Card(id="base1-24", name="Charmeleon", set_name="Base Set", attack_names=["Slash", "Flamethrower"]),
+        Card(id="base1-46", name="Charmander", set_name="Base Set", attack_names=["Scratch", "Ember"]),
+        Card(id="base1-36", name="Magmar", set_name="Base Set", attack_names=["Fire Punch", "Flamethrower"]),
+        Card(id="fossil-5", name="Flareon", set_name="Fossil", attack_names=["Quick Attack"],
+             description="A Pokémon charred by fire."),
+    ])
+    db.session.commit()
+
+
+def search(client, auth_headers, query):
+    response = client.get("/cards/search", query_string={"q": query}, headers=auth_headers)
+    assert response.status_code == 200
+    return [card["id"] for card in response.json["cards"]]
+
+
+def test_tokenize_folds_case_accents_and_punctuation():
+    assert tokenize("Pokémon-EX: Mewtwo's  Psychic!") == ["pokemon", "ex", "mewtwo", "s", "psychic"]
+    assert tokenize(None) == [] and tokenize("") == []
+
+
+def test_search_ranks_names_and_exact_terms_first(client, auth_headers):
+    seed_cards()
+
+    # "char" completes to charizard, charmeleon, charmander and the description word charred
+    assert search(client, auth_headers, "char")[-1] == "fossil-5"
+    assert set(search(client, auth_headers, "char")[:3]) == {"base1-4", "base1-24", "base1-46"}
+    # every term must match; name and attack matches outrank descriptions
+    assert search(client, auth_headers, "fire sp") == ["base1-4"]
+    assert search(client, auth_headers, "fire")[:2] == ["base1-4", "base1-36"]
+    assert search(client, auth_headers, "flamethrower") == ["base1-24", "base1-36"]
+    assert search(client, auth_headers, "pokemon") == ["fossil-5"]
+    # without prefix matching only whole words count
+    response = client.get("/cards/search?q=char&prefix=false", headers=auth_headers)
+    assert response.json["cards"] == []
+    assert client.get("/cards/search", headers=auth_headers).status_code == 400
+
+
+def test_search_index_follows_card_deletes(client, auth_headers):
+    seed_cards()
+    assert "base1-4" in search(client, auth_headers, "charizard")
+    assert client.delete("/cards/base1-4", headers=auth_headers).status_code == 200
+    assert search(client, auth_headers, "charizard") == []
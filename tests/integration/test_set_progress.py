@@ -0,0 +1,88 @@
+import threading
+import time
+
+from sqlalchemy import select
+from app import create_app
+from app.db import db
+from app.models import Card, SetProgress, User
+from app.services.import_service import add_to_collection
+from app.services.set_progress_service import rebuild_set_progress
+from conftest import TestConfig
+
+
+def summary(user):
+    return sorted(db.session.execute(
+        select(SetProgress.set_name, SetProgress.distinct_cards, SetProgress.total_copies)
+        .where(SetProgress.user_id == user.id)
+    ).tuples())
+
+
+def test_set_progress_is_maintained_by_collection_writes(client, user, auth_headers, count_queries):
+    db.session.add_all(
+        [Card(id=f"base1-{i}", name=f"Base {i}", set_name="Base Set") for i in range(1, 5)]
+        + [Card(id=f"jungle-{i}", name=f"Jungle {i}", set_name="Jungle") for i in range(1, 3)]
+    )
+    db.session.commit()
+
+    created = client.post("/collection/create", json={"card_id": "base1-1", "quantity": 2}, headers=auth_headers).json
+    client.post("/collection/create", json={"card_id": "base1-1", "card_condition": "Damaged"}, headers=auth_headers)
+    response = client.post("/collection/import?format=csv", headers=auth_headers,
+                           data="card_id,quantity\nbase1-2,1\njungle-1,3\njungle-1,1\n")
+    assert response.status_code == 200
+    assert summary(user) == [("Base Set", 2, 4), ("Jungle", 1, 4)]
+
+    with count_queries() as queries:
+        response = client.get("/collection/sets", headers=auth_headers)
+    assert response.json == [
+        {"set_name": "Base Set", "owned_cards": 2, "total_cards": 4, "copies": 4, "percent_complete": 50.0},
+        {"set_name": "Jungle", "owned_cards": 1, "total_cards": 2, "copies": 4, "percent_complete": 50.0},
+    ]
+    # versions, the summary rows and the (then cached) set sizes
+    assert queries.count == 4
+
+    # another condition of the card is still owned, so only copies drop
+    client.delete(f"/collection/{created['collection_id']}", headers=auth_headers)
+    assert summary(user) == [("Base Set", 2, 2), ("Jungle", 1, 4)]
+
+    client.delete("/cards/jungle-1", headers=auth_headers)
+    assert summary(user) == [("Base Set", 2, 2)]
+
+    expected = summary(user)
+    db.session.execute(SetProgress.__table__.delete())
+    rebuild_set_progress()
+    assert summary(user) == expected
+
+
+def test_concurrent_first_adds_count_a_card_once(tmp_path):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'progress.db'}"
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username="misty", email="misty@cerulean.city", password_hash="x")
+        db.session.add_all([user, Card(id="base1-58", name="Pikachu", set_name="Base Set")])
+        db.session.commit()
+        user_id = user.id
+
+    barrier = threading.Barrier(2)
+
+    def add(condition):
+        with app.app_context():
+            barrier.wait()
+            add_to_collection(user_id, {("base1-58", condition): 1})
+            # both threads read ownership before either commits unless the user lock serializes them
+            time.sleep(0.2)
+            db.session.commit()
+
+    threads = [threading.Thread(target=add, args=(condition,)) for condition in ("Near Mint", "Damaged")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        row = db.session.get(SetProgress, (user_id, "Base Set"))
+        assert (row.distinct_cards, row.total_copies) == (1, 2)
+        db.session.remove()
+        db.engine.dispose()
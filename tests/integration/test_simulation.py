@@ -0,0 +1,61 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+
+from app.db import db
+from app.models import Card, Deck, DeckCard
+from app.services.simulation_service import run_simulation
+
+
+def test_simulated_setup_matches_exact_odds(app, client, user, auth_headers):
+    app.config["SIMULATION_WORKERS"] = 1
+    db.session.add_all([
+        Card(id="base1-58", name="Pikachu", set_name="Base Set", card_type="Pokémon", evolution_stage="Basic"),
+        Card(id="base1-14", name="Raichu", set_name="Base Set", card_type="Pokémon", evolution_stage="Stage 1"),
+        Card(id="base1-100", name="Lightning Energy", set_name="Base Set", card_type="Energy", evolution_stage="Basic"),
+        Card(id="base1-91", name="Bill", set_name="Base Set", card_type="Trainer"),
+    ])
+    deck = Deck(user_id=user.id, name="Sparks")
+    db.session.add(deck)
+    db.session.flush()
+    for card_id, quantity in (("base1-58", 4), ("base1-14", 4), ("base1-100", 12), ("base1-91", 40)):
+        db.session.add(DeckCard(deck_id=deck.id, card_id=card_id, quantity=quantity))
+    db.session.commit()
+
+    body = {"trials": 200_000, "seed": 7, "turn": 2, "conditions": [{"card_type": "Energy", "min": 2}, {"name": "raichu"}]}
+    response = client.post(f"/deck/{deck.id}/simulate", json=body, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json
+
+    # no mulligan needed: 1 - C(56, 7) / C(60, 7)
+    exact = 1 - comb(56, 7) / comb(60, 7)
+    low, high = data["opening_basic"]["ci"]
+    assert low - 0.005 <= exact <= high + 0.005
+    assert data["mulligan"]["probability"] == round(1 - data["opening_basic"]["probability"], 6)
+    assert data["conditions"][0]["condition"] == {"card_type": "Energy", "min": 2}
+    assert 0 < data["all_conditions"]["probability"] < data["conditions"][1]["probability"]
+
+    # the same seed replays the same games
+    assert client.post(f"/deck/{deck.id}/simulate", json=body, headers=auth_headers).json == data
+
+    body.update(trials=2_000_000, tolerance=0.01)
+    data = client.post(f"/deck/{deck.id}/simulate", json=body, headers=auth_headers).json
+    assert data["stopped_early"] and data["trials"] < 2_000_000
+
+    response = client.post(f"/deck/{deck.id}/simulate", json={"conditions": [{"hp": 60}]}, headers=auth_headers)
+    assert response.status_code == 400
+
+    # oversized decks would make every batch proportionally larger
+    DeckCard.query.filter_by(deck_id=deck.id, card_id="base1-91").one().quantity = 10_000
+    db.session.commit()
+    response = client.post(f"/deck/{deck.id}/simulate", json={"trials": 10}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_pool_gives_the_same_result_as_inline():
+    deck = [0] * 8 + [1] * 12 + [2] * 40
+    args = (deck, [True, False, False], [False, True, False], [1], 300_000, 42)
+
+    inline = run_simulation(*args, turn=1, batch_size=20_000)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert run_simulation(*args, turn=1, batch_size=20_000, pool=pool) == inline
@@ -0,0 +1,63 @@
+import os
+import sys
+
+from sqlalchemy import text
+from app.db import db
+from app.models import Card, Collection, Deck, DeckCard
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "scripts"))
+
+from migrate_unique_indexes import migrate_unique_indexes
+
+
+def test_adds_merge_into_one_row(client, user, auth_headers):
+    db.session.add(Card(id="base1-4", name="Charizard", set_name="Base Set"))
+    deck = Deck(user_id=user.id, name="Fire")
+    db.session.add(deck)
+    db.session.commit()
+
+    for _ in range(2):
+        response = client.post("/collection/create", json={"card_id": "base1-4", "quantity": 2}, headers=auth_headers)
+        assert response.status_code == 201
+    assert [c.quantity for c in Collection.query.all()] == [4]
+
+    for _ in range(2):
+        response = client.post(f"/deck/{deck.id}/add-card", json={"card_id": "base1-4", "quantity": 2}, headers=auth_headers)
+        assert response.status_code == 201
+    assert [c.quantity for c in DeckCard.query.all()] == [4]
+
+    # the owned copies are checked in the same statement, so nothing is written past them
+    response = client.post(f"/deck/{deck.id}/add-card", json={"card_id": "base1-4"}, headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json["error"] == "Not enough cards in your collection"
+    response = client.post(f"/deck/{deck.id}/add-card", json={"card_id": "base1-4", "quantity": 0}, headers=auth_headers)
+    assert response.status_code == 400
+    assert [c.quantity for c in DeckCard.query.all()] == [4]
+
+
+def test_migration_merges_duplicates_before_indexing(app, user):
+    db.session.add(Card(id="base1-4", name="Charizard", set_name="Base Set"))
+    deck = Deck(user_id=user.id, name="Fire")
+    db.session.add(deck)
+    db.session.commit()
+    for name in ("uq_collections_user_card_condition", "uq_deck_cards_deck_card"):
+        db.session.execute(text(f"DROP INDEX {name}"))
+    for quantity in (1, 2, 3):
+        db.session.execute(text(
+            "INSERT INTO collections (user_id, card_id, quantity, card_condition) VALUES (:u, 'base1-4', :q, NULL)"
+        ), {"u": user.id, "q": quantity})
+        db.session.execute(text(
+            "INSERT INTO deck_cards (deck_id, card_id, quantity) VALUES (:d, 'base1-4', :q)"
+        ), {"d": deck.id, "q": quantity})
+    db.session.commit()
+
+    report = migrate_unique_indexes(dry_run=True)
+    assert report["rows_merged"] == {"collections": 2, "deck_cards": 2}
+    assert Collection.query.count() == 3
+
+    report = migrate_unique_indexes()
+    assert report["users"] == 1
+    assert [(c.quantity, c.card_condition) for c in Collection.query.all()] == [(6, "Near Mint")]
+    assert [c.quantity for c in DeckCard.query.all()] == [6]
+    indexes = {row[0] for row in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    assert {"uq_collections_user_card_condition", "uq_deck_cards_deck_card"} <= indexes